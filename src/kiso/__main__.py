@@ -96,6 +96,12 @@ def up(
     default=False,
     help="Disregard previous run results and rerun the experiment.",
 )
+@click.option(
+    "--copy-inputs-ahead/--no-copy-inputs-ahead",
+    default=False,
+    help="Copy the inputs of the next experiment while an experiment runs. Only use "
+    "it when setup and post scripts do not remove the inputs of later experiments.",
+)
 @click.option(
     "--output",
     "-o",
@@ -110,11 +116,20 @@ def up(
     type=click.Path(file_okay=True, dir_okay=False, readable=True, exists=True),
 )
 def run(
-    ctx: click.Context, force: bool, output: os.PathLike, experiment_config: os.PathLike
+    ctx: click.Context,
+    force: bool,
+    copy_inputs_ahead: bool,
+    output: os.PathLike,
+    experiment_config: os.PathLike,
 ) -> None:
     """Run the defined experiments."""
     try:
-        task.run(experiment_config=Path(experiment_config), force=force, env=output)
+        task.run(
+            experiment_config=Path(experiment_config),
+            force=force,
+            copy_inputs_ahead=copy_inputs_ahead,
+            env=output,
+        )
         click.secho("✨ Success", fg="green")
     except Exception as e:
         _error(ctx, e)
@@ -8,6 +8,9 @@ settings, and HTCondor-related configurations.
 #: Default maximum number of processes to use when distributing tasks across processes.
 MAX_PROCESSES: int = 5
 
+#: Number of hosts Ansible runs a task on in parallel, Ansible's default is 5.
+ANSIBLE_FORKS: int = 20
+
 #: Default root user.
 ROOT_USER: str = "root"
 
@@ -20,9 +23,24 @@ KISO_USER: str = "kiso"
 #: Default polling interval.
 POLL_INTERVAL: int = 3
 
+#: Maximum interval a workflow's status is polled at while it makes no progress.
+MAX_POLL_INTERVAL: int = 60
+
+#: SSH arguments Ansible connects to virtual machines with. The SSH connection is kept
+#: open for longer than Ansible's default of 60s, so it outlives the pauses between
+#: polls and between the steps of an experiment.
+SSH_ARGS: str = "-C -o ControlMaster=auto -o ControlPersist=600s"
+
 #: Default command timeout.
 COMMAND_TIMEOUT: int = 300
 
+#: Maximum time a single ChameleonEdge request waits for a command to finish.
+EDGE_WAIT_TIMEOUT: int = 30
+
+#: Maximum size of the tarballs a directory is split into when uploaded to
+#: ChameleonEdge.
+EDGE_UPLOAD_CHUNK_SIZE: int = 16 * 1024 * 1024
+
 #: Default workflow timeout.
 WORKFLOW_TIMEOUT: int = 600
 
@@ -5,8 +5,9 @@ from __future__ import annotations
 import itertools
 import logging
 import re
+import tempfile
 from collections import defaultdict
-from concurrent.futures import as_completed
+from concurrent.futures import Executor, Future, as_completed
 from ipaddress import ip_address
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -37,6 +38,70 @@ log = logging.getLogger("kiso.deployment.htcondor")
 
 console = Console()
 
+#: Ansible playbook that installs HTCondor on virtual machines
+_PLAYBOOK = Path(__file__).parent / "main.yml"
+
+#: Scripts that install HTCondor and Pegasus on Chameleon Edge containers
+_HTCONDOR_SH = Path(__file__).parent / "htcondor.sh"
+_PEGASUS_SH = Path(__file__).parent / "pegasus.sh"
+
+#: Bit flags, stored in ``node.extra[DAEMON_FLAGS_KEY]``, identifying the HTCondor
+#: daemons that will run on a node
+CENTRAL_MANAGER = 1
+SUBMIT = 2
+EXECUTE = 4
+PERSONAL = 8
+
+#: Key in ``node.extra`` holding the daemon bit flags OR-ed together. It replaces the
+#: ``is_central_manager``, ``is_submit``, ``is_execute``, and ``is_personal`` keys
+DAEMON_FLAGS_KEY = "htcondor_daemon_flags"
+
+#: HTCondor ``ROLE`` configuration template for each daemon kind
+_DAEMON_TITLE = {
+    "central-manager": "CentralManager",
+    "submit": "Submit",
+    "execute": "Execute",
+    "personal": "Personal",
+}
+
+#: Derives the ``ROLE`` template for daemon kinds missing in ``_DAEMON_TITLE``
+_DAEMON_STRIP_RE = re.compile(r"[-\d]")
+
+#: Order HTCondor daemons are installed in, keyed by the first letter of their kind:
+#: personal, central-manager, execute, and submit
+_INSTALL_ORDER = {"p": 0, "c": 1, "e": 2, "s": 3}
+
+
+def _has_daemon(node: Host | ChameleonDevice, flag: int) -> bool:
+    """Check if any of the HTCondor daemons in ``flag`` will run on the node.
+
+    :param node: Node annotated by ``HTCondorInstaller._map_daemon_to_sites``
+    :type node: Host | ChameleonDevice
+    :param flag: One or more of the daemon bit flags, OR-ed together
+    :type flag: int
+    :return: True if the node hosts any of the daemons, False otherwise
+    :rtype: bool
+    """
+    return bool(node.extra.get(DAEMON_FLAGS_KEY, 0) & flag)
+
+
+def _last_result_per_host(results: list[CommandResult]) -> list[CommandResult]:
+    """Keep the result of the last task run on each host.
+
+    An installation runs several tasks on one or more hosts, and the last task run on
+    a host is the one that failed, if any.
+
+    :param results: Results of the tasks, in the order they ran
+    :type results: list[CommandResult]
+    :return: The last result of each host, in the order the hosts first appear
+    :rtype: list[CommandResult]
+    """
+    last_results = {}
+    for result in results:
+        last_results[result.host] = result
+
+    return list(last_results.values())
+
 
 class HTCondorInstaller:
     """HTCondor software deployment."""
@@ -58,6 +123,9 @@ class HTCondorInstaller:
         :type config: list[HTCondorDaemon]
         """
         self.config = config
+        self._daemon_labels: (
+            tuple[frozenset[str], frozenset[str], frozenset[str], frozenset[str]] | None
+        ) = None
 
     def check(self, label_to_machines: Roles) -> None:
         """Check if the HTCondor configuration is valid."""
@@ -202,13 +270,14 @@ class HTCondorInstaller:
         is_public_ip_required = self._is_public_ip_required(daemon_to_site)
         env["is_public_ip_required"] = is_public_ip_required
 
-        for node in labels.all():
-            if (
-                is_public_ip_required
-                and node.extra["is_kiso_preferred_ip_private"]
-                and (node.extra["is_central_manager"] or node.extra["is_submit"])
-            ):
-                preferred_ip = ip.associate_floating_ip(node)
+        if is_public_ip_required:
+            nodes = [
+                node
+                for node in labels.all()
+                if node.extra["is_kiso_preferred_ip_private"]
+                and _has_daemon(node, CENTRAL_MANAGER | SUBMIT)
+            ]
+            for node, preferred_ip in ip.associate_floating_ips(nodes).items():
                 node.extra["kiso_preferred_ip"] = str(preferred_ip)
 
         _condor_hosts = [c for c in self.config if c.kind[0] == "c"]
@@ -230,64 +299,100 @@ class HTCondorInstaller:
         if condor_host_ip is not None:
             log.debug("HTCondor Central Manager IP <%s>", condor_host_ip)
 
-        with get_process_pool_executor() as executor:
-            results = []
-            futures = []
-            machine_to_daemons = self._get_label_daemon_machine_map(self.config, labels)
-            for machine, daemons in machine_to_daemons.items():
-                log.debug(
-                    "Install HTCondor Daemons <%s> on Machine <%s>",
-                    daemons,
-                    machine.address
-                    if isinstance(machine, ChameleonDevice)
-                    else machine.alias,
-                )
-                htcondor_config, config_files = self._get_condor_config(
-                    daemons, condor_host_ip, machine, env
-                )
+        # Group the machines so Ansible runs once per group, instead of once per
+        # machine, with the machine specific configuration set as host variables
+        groups: dict[str, tuple[list, list]] = defaultdict(lambda: ([], []))
+        machine_to_daemons = self._get_label_daemon_machine_map(self.config, labels)
+        for machine, daemons in machine_to_daemons.items():
+            log.debug(
+                "Install HTCondor Daemons <%s> on Machine <%s>",
+                daemons,
+                machine.address
+                if isinstance(machine, ChameleonDevice)
+                else machine.alias,
+            )
+            htcondor_config, config_files = self._get_condor_config(
+                daemons, condor_host_ip, machine, env
+            )
 
-                extra_vars = dict(extra_vars)
-                extra_vars["htcondor_daemons"] = daemons
-                extra_vars["htcondor_config"] = htcondor_config
-                extra_vars["config_files"] = config_files
-
-                if isinstance(machine, ChameleonDevice):
-                    future = executor.submit(
-                        self._install_condor_on_edge,
-                        machine,
-                        htcondor_config,
-                        extra_vars,
-                    )
-                else:
-                    future = executor.submit(
-                        utils.run_ansible,
-                        [Path(__file__).parent / "main.yml"],
-                        roles=machine,
-                        extra_vars=extra_vars,
-                    )
+            kinds = {daemon.kind[0] for daemon in daemons}
+            vms, containers = groups[
+                "c" if "c" in kinds else "p" if "p" in kinds else ""
+            ]
+            if isinstance(machine, ChameleonDevice):
+                _extra_vars = dict(extra_vars)
+                _extra_vars["htcondor_daemons"] = daemons
+                _extra_vars["htcondor_config"] = htcondor_config
+                _extra_vars["htcondor_config_files"] = config_files
+                containers.append((machine, htcondor_config, _extra_vars))
+            else:
+                machine.extra["htcondor_config"] = htcondor_config
+                machine.extra["htcondor_config_files"] = config_files
+                vms.append(machine)
+
+            # To each node we add a flag to identify if HTCondor is installed on
+            # the node
+            machine.extra[self.HAS_SOFTWARE_KEY] = True
 
-                # To each node we add a flag to identify if HTCondor is installed on
-                # the node
-                machine.extra[self.HAS_SOFTWARE_KEY] = True
+        with get_process_pool_executor() as executor:
+            results = []
 
-                # Wait for HTCondor Central Manager to be installed and started before
-                # installing in on any other machine
-                if any(d.kind[0] == "c" for d in daemons):
-                    results.append(future.result()[-1])
-                else:
-                    futures.append(future)
+            # Personal daemons do not depend on the HTCondor Central Manager, but
+            # wait for the Central Manager to be installed and started before
+            # installing HTCondor on any other machine
+            futures = self._submit_install(executor, *groups["p"], extra_vars)
+            for future in self._submit_install(executor, *groups["c"], extra_vars):
+                results.extend(_last_result_per_host(future.result()))
 
+            futures.extend(self._submit_install(executor, *groups[""], extra_vars))
             for future in as_completed(futures):
-                results.append(future.result()[-1])
+                results.extend(_last_result_per_host(future.result()))
 
             display._render(console, results)
 
+    def _submit_install(
+        self,
+        executor: Executor,
+        vms: list[Host],
+        containers: list[tuple[ChameleonDevice, list[str], dict]],
+        extra_vars: dict,
+    ) -> list[Future]:
+        """Submit the installation of HTCondor on a group of machines.
+
+        :param executor: Executor to submit the installation to
+        :type executor: Executor
+        :param vms: Virtual machines, with their configuration set in ``extra``
+        :type vms: list[Host]
+        :param containers: Chameleon Edge containers, with their HTCondor
+            configuration and Ansible variables
+        :type containers: list[tuple[ChameleonDevice, list[str], dict]]
+        :param extra_vars: Ansible variables shared by all virtual machines
+        :type extra_vars: dict
+        :return: Futures returning the results of each installation
+        :rtype: list[Future]
+        """
+        futures = [
+            executor.submit(self._install_condor_on_edge, *container)
+            for container in containers
+        ]
+        if vms:
+            futures.append(
+                executor.submit(
+                    utils.run_ansible,
+                    [_PLAYBOOK],
+                    roles=vms,
+                    extra_vars=extra_vars,
+                )
+            )
+
+        return futures
+
     def _map_daemon_to_sites(self, labels: Roles) -> dict[str, set]:
         """Map HTCondor daemon types to the sites they are deployed on.
 
-        Iterates over all labels and nodes, annotates each node with flags indicating
-        which HTCondor daemon types it hosts (central-manager, submit, execute,
-        personal), and records which sites each daemon type spans.
+        Iterates over all labels and nodes, annotates each node with a bitmask of the
+        HTCondor daemon types it hosts (central-manager, submit, execute, personal),
+        and records which sites each daemon type spans.
 
         :param labels: Mapping of labels to their associated nodes
         :type labels: Roles
@@ -300,72 +405,75 @@ class HTCondorInstaller:
         )
 
         for label, nodes in labels.items():
-            is_central_manager = label in central_manager_labels
-            is_submit = label in submit_labels
-            is_execute = label in execute_labels
-            is_personal = label in personal_labels
+            mask = (
+                (CENTRAL_MANAGER if label in central_manager_labels else 0)
+                | (SUBMIT if label in submit_labels else 0)
+                | (EXECUTE if label in execute_labels else 0)
+                | (PERSONAL if label in personal_labels else 0)
+            )
+            if not mask:
+                continue
+
             for node in nodes:
                 # To each node we add flags to identify what HTCondor daemons will run
                 # on the node
-                node.extra["is_central_manager"] = (
-                    node.extra.get("is_central_manager", False) or is_central_manager
-                )
-                node.extra["is_submit"] = (
-                    node.extra.get("is_submit", False) or is_submit
-                )
-                node.extra["is_execute"] = (
-                    node.extra.get("is_execute", False) or is_execute
-                )
-                node.extra["is_personal"] = (
-                    node.extra.get("is_personal", False) or is_personal
+                node.extra[DAEMON_FLAGS_KEY] = (
+                    node.extra.get(DAEMON_FLAGS_KEY, 0) | mask
                 )
 
-                site = [
+                site = (
                     "fabric" if node.extra["kind"] == "fabric" else node.extra["site"]
-                ]
-                if is_execute:
-                    daemon_to_site["execute"].update(site)
-                if is_submit:
-                    daemon_to_site["submit"].update(site)
-                if is_central_manager:
-                    daemon_to_site["central-manager"].update(site)
+                )
+                if mask & EXECUTE:
+                    daemon_to_site["execute"].add(site)
+                if mask & SUBMIT:
+                    daemon_to_site["submit"].add(site)
+                if mask & CENTRAL_MANAGER:
+                    daemon_to_site["central-manager"].add(site)
 
         return daemon_to_site
 
     def _get_condor_daemon_labels(
         self,
-    ) -> tuple[set[str], set[str], set[str], set[str]]:
+    ) -> tuple[frozenset[str], frozenset[str], frozenset[str], frozenset[str]]:
         """Get labels for different HTCondor daemon types from an experiment configuration.
 
         Parses the HTCondor configuration to extract labels for central manager, submit,
         execute, and personal daemon types. Validates daemon types and raises an error
-        for invalid types.
+        for invalid types. The label sets are computed once and cached on the
+        installer.
 
         :raises ValueError: If an invalid HTCondor daemon type is encountered
         :return: Tuple of label sets for central manager, submit, execute, and personal
         daemons
-        :rtype: tuple[set[str], set[str], set[str], set[str]]
+        :rtype: tuple[frozenset[str], frozenset[str], frozenset[str], frozenset[str]]
         """  # noqa: E501
-        central_manager_labels = set()
-        submit_labels = set()
-        execute_labels = set()
-        personal_labels = set()
-
+        if self._daemon_labels is not None:
+            return self._daemon_labels
+
+        # central-manager, submit, execute, and personal, keyed by the first letter
+        daemon_labels: dict[str, set[str]] = {
+            "c": set(),
+            "s": set(),
+            "e": set(),
+            "p": set(),
+        }
         for config in self.config:
-            if config.kind[0] == "c":  # central-manager
-                central_manager_labels.update(config.labels)
-            elif config.kind[0] == "s":  # submit
-                submit_labels.update(config.labels)
-            elif config.kind[0] == "e":  # execute
-                execute_labels.update(config.labels)
-            elif config.kind[0] == "p":  # personal
-                personal_labels.update(config.labels)
-            else:
+            labels = daemon_labels.get(config.kind[0])
+            if labels is None:
                 raise ValueError(
                     f"Invalid HTCondor daemon <{config.kind}> in configuration"
                 )
-
-        return central_manager_labels, submit_labels, execute_labels, personal_labels
+            labels.update(config.labels)
+
+        central_manager, submit, execute, personal = daemon_labels.values()
+        self._daemon_labels = (
+            frozenset(central_manager),
+            frozenset(submit),
+            frozenset(execute),
+            frozenset(personal),
+        )
+        return self._daemon_labels
 
     def _is_public_ip_required(self, daemon_to_site: dict[str, set]) -> bool:
         """Determine if a public IP address is required for the HTCondor cluster configuration.
@@ -383,25 +491,22 @@ class HTCondorInstaller:
         :return: True if a public IP is required, False otherwise
         :rtype: bool
         """  # noqa: E501
-        is_public_ip_required = False
         central_manager = daemon_to_site["central-manager"]
         submit = daemon_to_site["submit"]
         execute = daemon_to_site["execute"]
 
+        if not (central_manager or submit or execute):
+            return False
+
         # A public IP is required if,
         # 1. If execute nodes are on multiple sites
         # 2. If submit nodes are on multiple sites
         # 3. If all execute nodes and submit nodes are on one site, but not the same one
-        # 4. If submit nodes are on one site, but not same one as the central manager
-        if (central_manager or submit or execute) and (
-            len(execute) > 1
-            or len(submit) > 1
-            or execute != submit
-            or submit - central_manager
-        ):
-            is_public_ip_required = True
+        if len(execute) > 1 or len(submit) > 1 or execute != submit:
+            return True
 
-        return is_public_ip_required
+        # 4. If submit nodes are on one site, but not same one as the central manager
+        return not submit <= central_manager
 
     def _get_label_daemon_machine_map(
         self, condor_config: list, labels: Roles
@@ -452,20 +557,13 @@ class HTCondorInstaller:
         :return: Integer sort key; lower values are installed first
         :rtype: int
         """
-        rv = 10
-        for daemon in item[1]:
-            if daemon.kind[0] == "p":  # personal
-                rv = min(rv, 0)
-            elif daemon.kind[0] == "c":  # central-manager
-                rv = min(rv, 1)
-            elif daemon.kind[0] == "e":  # execute
-                rv = min(rv, 2)
-            elif daemon.kind[0] == "s":  # submit
-                rv = min(rv, 3)
-            else:
-                raise ValueError(f"Daemon <{daemon.kind}> is not valid")
-
-        return rv
+        try:
+            return min(
+                (_INSTALL_ORDER[daemon.kind[0]] for daemon in item[1]), default=10
+            )
+        except KeyError:
+            kind = next(d.kind for d in item[1] if d.kind[0] not in _INSTALL_ORDER)
+            raise ValueError(f"Daemon <{kind}> is not valid") from None
 
     def _get_condor_config(
         self,
@@ -512,7 +610,9 @@ class HTCondorInstaller:
                     "use ROLE: Execute",
                 ]
             else:
-                _daemon = re.sub(r"[-\d]", "", kind.title())
+                _daemon = _DAEMON_TITLE.get(kind) or _DAEMON_STRIP_RE.sub(
+                    "", kind.title()
+                )
                 htcondor_config.append(f"use ROLE: {_daemon}")
 
                 # Execute nodes without public IPs need these configuration
@@ -528,10 +628,7 @@ class HTCondorInstaller:
         if (
             is_public_ip_required is True
             and machine.extra["kind"] == "chameleon-edge"
-            and (
-                machine.extra["is_central_manager"] is True
-                or machine.extra["is_submit"] is True
-            )
+            and _has_daemon(machine, CENTRAL_MANAGER | SUBMIT)
         ):
             # In a multi site setup, when the central manager and/or submit daemon
             # run on Chameleon Edge containers, they would require
@@ -554,7 +651,7 @@ class HTCondorInstaller:
 
         return htcondor_config, config_files
 
-    def _install_condor_on_edge(  # noqa: C901
+    def _install_condor_on_edge(
         self, machine: ChameleonDevice, htcondor_config: list[str], extra_vars: dict
     ) -> list[CommandResult]:
         """Install and configure HTCondor on a Chameleon Edge machine.
@@ -578,7 +675,7 @@ class HTCondorInstaller:
         results.append(
             edge.run_script(
                 machine,
-                Path(__file__).parent / "htcondor.sh",
+                _HTCONDOR_SH,
                 "--no-dry-run",
                 timeout=-1,
             )
@@ -587,7 +684,7 @@ class HTCondorInstaller:
         results.append(
             edge.run_script(
                 machine,
-                Path(__file__).parent / "pegasus.sh",
+                _PEGASUS_SH,
                 "--no-dry-run",
                 timeout=-1,
             )
@@ -595,14 +692,28 @@ class HTCondorInstaller:
         if results[-1].rc != 0:
             return results
 
-        config_root = edge._execute(machine, "condor_config_val CONFIG_ROOT")
-        results.append(config_root)
+        is_personal = any(
+            daemon.kind[0] == "p" for daemon in extra_vars.get("htcondor_daemons", ())
+        )
+        config_files = extra_vars.get("htcondor_config_files")
+        # Personal daemons keep the minicondor configuration installed by
+        # htcondor.sh, so without configuration files there is nothing left to do
+        if is_personal and not config_files:
+            return results
+
+        # Look up all the HTCondor directories needed in a single round-trip
+        config_vars = ["CONFIG_ROOT"]
+        if not is_personal:
+            config_vars += ["SEC_PASSWORD_DIRECTORY", "SEC_TOKEN_SYSTEM_DIRECTORY"]
+        config_dirs = edge._execute(
+            machine, f"condor_config_val {' '.join(config_vars)}"
+        )
+        results.append(config_dirs)
         if results[-1].rc != 0:
             return results
-        config_root = config_root.stdout
+        config_root, *sec_dirs = (_.strip() for _ in config_dirs.stdout.splitlines())
         config_root = f"{config_root}/config.d"
 
-        config_files = extra_vars.get("config_files")
         if config_files:
             # User may change the experiment configuration and rerun the up command, so
             # we remove old configuration files before configuring HTCondor
@@ -612,102 +723,52 @@ class HTCondorInstaller:
             if results[-1].rc != 0:
                 return results
 
+            commands = []
             for fname, config_file in config_files.items():
                 edge._upload_file(machine, config_file, f"{config_root}")
-                results.append(
-                    edge._execute(
-                        machine,
-                        f"mv {config_root}/{Path(config_file).name} "
-                        f"{config_root}/{fname}",
-                    )
-                )
-                if results[-1].rc != 0:
-                    return results
-            results.append(
-                edge._execute(
-                    machine,
-                    f"chown root:root {config_root}/* ; chmod 644 {config_root}/*",
+                commands.append(
+                    f"mv {config_root}/{Path(config_file).name} {config_root}/{fname}"
                 )
+            commands.append(
+                f"chown root:root {config_root}/* ; chmod 644 {config_root}/*"
             )
+            results.append(edge._execute(machine, " && ".join(commands)))
             if results[-1].rc != 0:
                 return results
 
-        for daemon in extra_vars.get("htcondor_daemons", set()):
-            if daemon.kind[0] == "p":
-                return results
-
-        sec_password_directory = edge._execute(
-            machine, "condor_config_val SEC_PASSWORD_DIRECTORY"
-        )
-        results.append(sec_password_directory)
-        if results[-1].rc != 0:
-            return results
-        sec_password_directory = sec_password_directory.stdout
-
-        sec_token_system_directory = edge._execute(
-            machine, "condor_config_val SEC_TOKEN_SYSTEM_DIRECTORY"
-        )
-        results.append(sec_token_system_directory)
-        if results[-1].rc != 0:
-            return results
-        sec_token_system_directory = sec_token_system_directory.stdout
-
-        NL = "\n"
-        DOLLAR = "\\$"
-        results.append(
-            edge._execute(
-                machine,
-                f"""cat > "{config_root}/01-kiso" << EOF
-{NL.join(htcondor_config).replace("$", DOLLAR)}
-EOF
-""",
-            )
-        )
-        if results[-1].rc != 0:
+        if is_personal:
             return results
 
+        sec_password_directory, sec_token_system_directory = sec_dirs
         edge._upload_file(
             machine, extra_vars["pool_passwd_file"], f"{sec_password_directory}/"
         )
-        results.append(
-            edge._execute(
-                machine,
-                f"mv {sec_password_directory}/"
-                f"{Path(extra_vars['pool_passwd_file']).name} "
-                f"{sec_password_directory}/POOL",
-            )
-        )
-        if results[-1].rc != 0:
-            return results
 
-        results.append(
-            edge._execute(
-                machine,
-                f"chown root:root {sec_password_directory}/POOL ; "
-                f"chmod 600 {sec_password_directory}/POOL ; "
-                f"rm -f {config_root}/00-minicondor",
-            )
-        )
-        if results[-1].rc != 0:
-            return results
+        # Upload the configuration as a file, so it needs no escaping to get through
+        # the shell
+        with tempfile.TemporaryDirectory() as tmpdir:
+            kiso_config = Path(tmpdir) / "01-kiso"
+            kiso_config.write_text("\n".join(htcondor_config) + "\n")
+            edge._upload_file(machine, kiso_config, config_root)
 
+        pool_passwd_file = Path(extra_vars["pool_passwd_file"]).name
+        # Install the configuration, pool password and token, and restart HTCondor in
+        # a single round-trip
         results.append(
             edge._execute(
                 machine,
-                "condor_token_create -key POOL "
-                f"-identity {extra_vars['token_identity']} "
-                f"-file {sec_token_system_directory}/POOL.token",
+                f"""set -e
+chown root:root {config_root}/01-kiso
+chmod 644 {config_root}/01-kiso
+mv {sec_password_directory}/{pool_passwd_file} {sec_password_directory}/POOL
+chown root:root {sec_password_directory}/POOL
+chmod 600 {sec_password_directory}/POOL
+rm -f {config_root}/00-minicondor
+condor_token_create -key POOL -identity {extra_vars["token_identity"]} \
+-file {sec_token_system_directory}/POOL.token
+condor_restart
+""",
             )
         )
-        if results[-1].rc != 0:
-            return results
-
-        # Restart HTCondor
-        # machine.execute(
-        #     "sh -c 'ps aux | grep condor | grep -v condor | awk \\'{print $2}\\' | "
-        #     "xargs kill -9'"
-        # )
-        # machine.execute("condor_master")
-        results.append(edge._execute(machine, "condor_restart"))
 
         return results
@@ -5,19 +5,25 @@ from __future__ import annotations
 import logging
 import os
 import shlex
+import shutil
+import tarfile
 import tempfile
 import time
-from contextlib import redirect_stdout
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from functools import lru_cache
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
 
 import enoslib as en
 from enoslib.api import CommandResult
 
 from kiso import constants as const
 from kiso import utils
+from kiso.log import get_process_pool_executor
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
     from enoslib.infra.enos_chameleonedge.objects import ChameleonDevice
 
 if hasattr(en, "ChameleonEdge"):
@@ -27,6 +33,86 @@ else:
 
 log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+#: Home directories on each container, keyed by the container's UUID and the ~ or
+#: ~user prefix, since they don't change during a run. ``map_containers`` hands them
+#: to its worker processes, and merges back the ones the workers look up
+_homes: dict[tuple[str, str], str] = {}
+
+
+def map_containers(
+    func: Callable[..., T],
+    containers: Iterable[ChameleonDevice],
+    *args: Any,  # noqa: ANN401
+    **kwargs: Any,  # noqa: ANN401
+) -> list[T]:
+    """Call a function for each Chameleon device, in parallel.
+
+    Each call sources the device's RC file into the process wide ``os.environ``, so
+    the calls are run in separate processes rather than threads. A single device is
+    handled in the current process, to avoid starting a process pool for it. The
+    home directories looked up so far are shared with, and collected from, the
+    separate processes.
+
+    :param func: Module level function to call, with the device as first argument
+    :type func: Callable[..., T]
+    :param containers: Chameleon devices to call the function for
+    :type containers: Iterable[ChameleonDevice]
+    :param args: Additional positional arguments passed to the function
+    :type args: Any
+    :param kwargs: Additional keyword arguments passed to the function
+    :type kwargs: Any
+    :return: Results of each call, in the order of the devices
+    :rtype: list[T]
+    """
+    containers = list(containers)
+    if len(containers) < 2:
+        return [func(container, *args, **kwargs) for container in containers]
+
+    with get_process_pool_executor(
+        max_workers=min(len(containers), const.MAX_PROCESSES)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _call_with_homes, dict(_homes), func, container, *args, **kwargs
+            )
+            for container in containers
+        ]
+        results = []
+        for future in futures:
+            result, homes = future.result()
+            _homes.update(homes)
+            results.append(result)
+
+        return results
+
+
+def _call_with_homes(
+    homes: dict[tuple[str, str], str],
+    func: Callable[..., T],
+    container: ChameleonDevice,
+    *args: Any,  # noqa: ANN401
+    **kwargs: Any,  # noqa: ANN401
+) -> tuple[T, dict[tuple[str, str], str]]:
+    """Call a function for a Chameleon device in a ``map_containers`` worker process.
+
+    :param homes: Home directories looked up by the parent process
+    :type homes: dict[tuple[str, str], str]
+    :param func: Module level function to call, with the device as first argument
+    :type func: Callable[..., T]
+    :param container: Chameleon device to call the function for
+    :type container: ChameleonDevice
+    :param args: Additional positional arguments passed to the function
+    :type args: Any
+    :param kwargs: Additional keyword arguments passed to the function
+    :type kwargs: Any
+    :return: The result of the call, and the home directories known to the worker
+    :rtype: tuple[T, dict[tuple[str, str], str]]
+    """
+    _homes.update(homes)
+    return func(container, *args, **kwargs), dict(_homes)
+
 
 def upload(
     container: ChameleonDevice,
@@ -66,17 +152,17 @@ def upload(
         raise ValueError(f"Source {src} doesn't exist", src)
 
     # The Chameleon Edge API does not resolve destinations with a ~, i.e., ~kiso is not
-    # resolved to /home/kiso, so we need to expand and resolve it
-    dst = _resolve_remotely(container, dst)
-    log.debug("Resolved destination directory is <%s>", dst)
-
-    # The upload method of the Chameleon Edge API requires the destination to be a
-    # directory.
-    if _is_dir_remote(container, dst) is False:
+    # resolved to /home/kiso, so we need to expand and resolve it. The upload method of
+    # the Chameleon Edge API also requires the destination to be a directory.
+    resolved_dst = _resolve_dir_remotely(container, dst)
+    if resolved_dst is None:
         raise ValueError(
             f"Destination {dst} is either not a directory or can't be accessed", dst
         )
 
+    dst = resolved_dst
+    log.debug("Resolved destination directory is <%s>", dst)
+
     try:
         _upload_file(container, src, dst)
     except (Exception, GatewayTimeout):
@@ -92,7 +178,9 @@ def upload(
                 src,
                 dst,
             )
-            _upload_directory(container, src, dst)
+            # The ownership is set along with extracting the last tarball
+            _upload_directory(container, src, dst, user=user)
+            return status
 
     _ch_perms_remotely(container, dst, user)
 
@@ -131,11 +219,10 @@ def download(
 
     # The download method of the Chameleon Edge API requires the source to be a
     # directory. Also, it does not resolve destinations with a ~, i.e., ~kiso is not
-    # resolved to /home/kiso, so we need to check directory exists and resolve it
-    _resolve_remotely(container, src)
-
+    # resolved to /home/kiso, so we need to resolve it, check it exists, and check
+    # whether it is a file
     log.debug("Check source <%s> exists", src)
-    _exists_remotely(container, src)
+    src, is_file = _resolve_file_remotely(container, src)
 
     log.debug("Check destination <%s> exists and is a directory", dst)
     if not _exists_locally(dst) or not _is_dir_locally(dst):
@@ -145,7 +232,7 @@ def download(
 
     dst = _resolve_locally(dst)
 
-    if _is_file_remote(container, src):
+    if is_file:
         _download_file(container, src, dst, mktemp=True)
     else:
         try:
@@ -204,6 +291,7 @@ def execute(
         cmd.extend([shlex.quote(arg) for arg in args])
 
     status_file = f"{const.TMP_DIR}/{utils.get_random_string(length=5)}"
+    done_file = f"{status_file}.done"
 
     # Check if the command already has a redirect to stdout
     stdout = len({">", ">>", "&>", "&>>", "2>&1"}.intersection(set(args))) == 0
@@ -222,44 +310,88 @@ def execute(
             "echo",
             "$?",
             ">",
-            f"{status_file}.done",
+            done_file,
             ";",
             "exit",
             "`",
             "cat",
-            f"{status_file}.done",
+            done_file,
             "`",
         ]
     )
 
-    start_time = time.time()
     result = _execute(container, " ".join(cmd), user=user)
     if result.rc is None:
-        while timeout == -1 or time.time() - start_time <= timeout:
-            is_done = _execute(container, f"cat {status_file}.done", user=user)
-            if is_done.rc == 0:
-                result.rc = is_done.rc
-                break
-
-            time.sleep(poll_interval)
-        else:
-            result.rc = -1
-            result.status = const.STATUS_TIMEOUT
-            log.debug("Command did not finish within the timeout <%d>", timeout)
+        result.rc = _wait_for_exit_code(
+            container, done_file, timeout, poll_interval, user=user
+        )
 
     result.status = const.STATUS_OK if result.rc == 0 else const.STATUS_FAILED
 
-    if stdout:
-        result.stdout = _execute(container, f"cat {status_file}.out", user=user).stdout
+    # Fetch the output and clean up the status files in a single round-trip
+    marker = f"--{Path(status_file).name}--"
+    cleanup = f"rm -f {status_file}.out {status_file}.log {done_file}"
+    if stdout or stderr:
+        output = _execute(
+            container,
+            f"cat {status_file}.out 2>/dev/null; echo {marker}; "
+            f"cat {status_file}.log 2>/dev/null; {cleanup}",
+            user=user,
+        ).stdout
+        out, _, err = output.partition(marker)
+        if stdout:
+            result.stdout = out.strip()
+        if stderr:
+            result.stderr = err.strip()
+    else:
+        _execute(container, cleanup)
 
-    if stderr:
-        result.stderr = _execute(container, f"cat {status_file}.log", user=user).stderr
+    return result
 
-    _rm_remotely(
-        container, f"{status_file}.out", f"{status_file}.log", f"{status_file}.done"
-    )
 
-    return result
+def _wait_for_exit_code(
+    container: ChameleonDevice,
+    done_file: str,
+    timeout: int,
+    poll_interval: int,
+    user: str | None = None,
+) -> int:
+    """Wait for a command started by :func:`execute` to finish.
+
+    The wait happens on the container itself, so each request covers many polls of
+    the status file, but returns before the API gateway times out the request.
+
+    :param container: The Chameleon device the command runs on
+    :type container: ChameleonDevice
+    :param done_file: File the command's exit code is written to
+    :type done_file: str
+    :param timeout: Maximum time to wait for the command, -1 to wait forever
+    :type timeout: int
+    :param poll_interval: Time between command execution status checks
+    :type poll_interval: int
+    :param user: User to check the status file as, defaults to None
+    :type user: str | None, optional
+    :return: Exit code of the command, or -1 if it did not finish within the timeout
+    :rtype: int
+    """
+    deadline = None if timeout == -1 else time.time() + timeout
+    while True:
+        wait = const.EDGE_WAIT_TIMEOUT
+        if deadline is not None:
+            wait = min(wait, deadline - time.time())
+            if wait <= 0:
+                log.debug("Command did not finish within the timeout <%d>", timeout)
+                return -1
+
+        polls = max(1, int(wait // poll_interval))
+        is_done = _execute(
+            container,
+            f"i=0; while [ ! -s {done_file} ] && [ $i -lt {polls} ]; do "
+            f"sleep {poll_interval}; i=$((i+1)); done; cat {done_file}",
+            user=user,
+        )
+        if is_done.rc == 0 and is_done.stdout:
+            return int(is_done.stdout)
 
 
 def _upload_file(
@@ -289,7 +421,9 @@ def _upload_file(
                 log.warning("File <%s> was not uploaded", dst / src.name)
 
 
-def _upload_directory(container: ChameleonDevice, src: Path, dst: Path) -> None:
+def _upload_directory(
+    container: ChameleonDevice, src: Path, dst: Path, user: str | None = None
+) -> None:
     """Upload a directory to a Chameleon device.
 
     This function uploads a directory to a Chameleon device using the ChameleonEdge
@@ -302,37 +436,92 @@ def _upload_directory(container: ChameleonDevice, src: Path, dst: Path) -> None:
     :type src: Path
     :param dst: Destination path on the container
     :type dst: Path
+    :param user: User to set as owner of the destination, defaults to None
+    :type user: str | None, optional
     :raises ValueError: If source does not exist or destination is invalid
     """
-    # If the source is a directory, create a destination directory with the
-    # same name
-    log.debug("Create directory <%s> on edge", dst / src.name)
-    _mkdir_remotely(container, dst / src.name)
-
     # The Chameleon Edge API's upload method times out after ~60 seconds.
-    # Uploading  an entire directory is less likely to time out. To minimize the
-    # chances of time outs, we walk over the source directory. We create directories
-    # as necessary and upload files one at a time. If the file is itself too large
-    # and the method times out, then there is no work around for it
-    first = True
-    for file in Path(src).rglob("**"):
-        _dst = dst / file.relative_to(src.parent)
-        if file.is_dir():
-            log.debug("Create directory <%s> on edge", _dst)
-            _mkdir_remotely(container, _dst)
-        elif file.is_file():
-            try:
-                log.debug("Upload file <%s> to <%s>", file, _dst.parent)
-                _upload_file(container, file, _dst.parent, check=first)
-                first = False
-            except GatewayTimeout:
-                log.error("Failed to upload file <%s> to <%s>", file, _dst.parent)
-                log.debug(
-                    "Failed to upload file <%s> to <%s>",
-                    file,
-                    _dst.parent,
-                    exc_info=True,
-                )
+    # Uploading an entire directory is likely to time out. To minimize the chances of
+    # time outs, we pack the source directory into tarballs of about
+    # EDGE_UPLOAD_CHUNK_SIZE bytes, and upload and extract them one at a time.
+    # Directories are packed too, so empty ones are created as well. If a single file
+    # is itself too large and the upload times out, then there is no work around for
+    # it. Symbolic links are followed, and what they point to is packed, as links
+    # would point to nothing on the container
+    chunk: list[Path] = []
+    size = 0
+    for root, dirs, files in os.walk(src, followlinks=True):
+        # Links to a parent directory are not followed, they would be walked forever
+        real_root = Path(root).resolve()
+        dirs[:] = [
+            name
+            for name in dirs
+            if not real_root.is_relative_to((Path(root) / name).resolve())
+        ]
+        chunk.append(Path(root))
+        for name in files:
+            file = Path(root) / name
+            # Skip broken links, and anything else that is not a regular file
+            if not file.is_file():
+                continue
+
+            file_size = file.stat().st_size
+            if size and size + file_size > const.EDGE_UPLOAD_CHUNK_SIZE:
+                _upload_tarball(container, src, dst, chunk)
+                chunk, size = [], 0
+
+            chunk.append(file)
+            size += file_size
+
+    _upload_tarball(container, src, dst, chunk, user=user)
+
+
+def _upload_tarball(
+    container: ChameleonDevice,
+    src: Path,
+    dst: Path,
+    paths: list[Path],
+    user: str | None = None,
+) -> None:
+    """Upload files and directories to a Chameleon device as a single tarball.
+
+    :param container: The Chameleon device to upload files to
+    :type container: ChameleonDevice
+    :param src: Source directory the paths belong to
+    :type src: Path
+    :param dst: Destination path on the container, where ``src`` is recreated
+    :type dst: Path
+    :param paths: Files and directories to upload, directories are not recursed into
+    :type paths: list[Path]
+    :param user: User to set as owner of the destination, in the same call that
+        extracts the tarball, defaults to None
+    :type user: str | None, optional
+    """
+    commands = []
+    _dst = shlex.quote(str(dst))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tarball = Path(tmpdir) / f"kiso-{utils.get_random_string(length=8)}.tar"
+        with tarfile.open(tarball, "w", dereference=True) as tar:
+            for path in paths:
+                tar.add(path, arcname=path.relative_to(src.parent), recursive=False)
+
+        try:
+            log.debug("Upload <%d> files and directories to <%s>", len(paths), dst)
+            _upload_file(container, tarball, dst)
+        except GatewayTimeout:
+            log.error("Failed to upload files <%s> to <%s>", paths, dst)
+            log.debug("Failed to upload files <%s> to <%s>", paths, dst, exc_info=True)
+        else:
+            remote_tarball = shlex.quote(str(dst / tarball.name))
+            commands.append(
+                f"tar -xpf {remote_tarball} -C {_dst} ; rm -f {remote_tarball}"
+            )
+
+    if user:
+        commands.append(f"chown -R {user}:{user} {_dst}")
+
+    if commands:
+        _execute(container, " ; ".join(commands))
 
 
 def _download_file(
@@ -397,20 +586,81 @@ def _download_directory(container: ChameleonDevice, src: Path, dst: Path) -> Non
     :type user: str, optional
     :raises ValueError: If source does not exist or destination is invalid
     """
-    # Fetch all files in the source directory
-    cmd = f"find {src} -type f"
-    ls_files = _execute(container, cmd)
-
     # Make a temp directory on the container
     tmpdir = Path(const.TMP_DIR) / utils.get_random_string(5)
     _mkdir_remotely(container, tmpdir)
 
     # The Chameleon Edge API's download method times out after ~60 seconds.
-    # Downloading an entire directory is more likely to time out. To minimize the
-    # chances of time outs, we walk over the source directory. We create
-    # directories as necessary and download files one at a time. If the file is
-    # itself too large and the method times out, then there is no work around for it
-    for file in ls_files.splitlines():
+    # Downloading an entire directory is more likely to time out, so we first try to
+    # download it as a single compressed tarball, which takes one request instead of
+    # one per file
+    try:
+        _download_tarball(container, src, dst, tmpdir)
+    except (Exception, GatewayTimeout):
+        log.debug("Failed to download <%s> as a tarball", src, exc_info=True)
+        _download_files(container, src, dst, tmpdir)
+
+    # Remove the temporary directory
+    _rm_remotely(container, tmpdir)
+
+
+def _download_tarball(
+    container: ChameleonDevice, src: Path, dst: Path, tmpdir: Path
+) -> None:
+    """Download a directory from a Chameleon device as a single compressed tarball.
+
+    :param container: The Chameleon device to download files from
+    :type container: ChameleonDevice
+    :param src: Source path of directory to download
+    :type src: Path
+    :param dst: Destination path on the host, where the contents of ``src`` are
+        extracted
+    :type dst: Path
+    :param tmpdir: Empty temporary directory on the Chameleon device
+    :type tmpdir: Path
+    :raises ValueError: If the directory can't be packed into a tarball
+    """
+    tarball = tmpdir / f"kiso-{utils.get_random_string(length=8)}.tar.gz"
+    result = _execute(
+        container,
+        f"tar -czf {shlex.quote(str(tarball))} -C {shlex.quote(str(src))} .",
+    )
+    try:
+        if result.rc != 0:
+            raise ValueError(f"Failed to pack directory <{src}>", result.stderr)
+
+        with tempfile.TemporaryDirectory() as _tmpdir:
+            _download_file(container, tmpdir, Path(_tmpdir), mktemp=False)
+            with tarfile.open(Path(_tmpdir) / tarball.name) as tar:
+                tar.extractall(dst, filter="data")
+    finally:
+        # Remove the tarball, so it is not downloaded again with individual files
+        _rm_remotely(container, tarball)
+
+
+def _download_files(
+    container: ChameleonDevice, src: Path, dst: Path, tmpdir: Path
+) -> None:
+    """Download the files in a directory from a Chameleon device one at a time.
+
+    :param container: The Chameleon device to download files from
+    :type container: ChameleonDevice
+    :param src: Source path of directory to download
+    :type src: Path
+    :param dst: Destination path on the host
+    :type dst: Path
+    :param tmpdir: Empty temporary directory on the Chameleon device
+    :type tmpdir: Path
+    """
+    # Fetch all files in the source directory
+    cmd = f"find {shlex.quote(str(src))} -type f"
+    ls_files = _execute(container, cmd)
+
+    # To minimize the chances of time outs, we walk over the source directory. We
+    # create directories as necessary and download files one at a time. If the file
+    # is itself too large and the method times out, then there is no work around for
+    # it
+    for file in ls_files.stdout.splitlines():
         file = Path(file)
         _dst = dst / file.parent.relative_to(src)
         # Make the destination directory if it does not exist
@@ -429,9 +679,6 @@ def _download_directory(container: ChameleonDevice, src: Path, dst: Path) -> Non
         # Remove the file from the temporary directory
         _rm_remotely(container, tmpdir / file.name)
 
-    # Remove the temporary directory
-    _rm_remotely(container, tmpdir)
-
 
 def _exists_locally(src: Path) -> bool:
     """Check if the source file or directory exists.
@@ -511,44 +758,65 @@ def _resolve_remotely(container: ChameleonDevice, dst: Path) -> Path:
     if dst.is_absolute() or str(dst)[0] != "~":
         return dst
 
-    expand_user = _execute(container, f"echo {dst.parts[0]}")
-    if expand_user.rc == 0:
-        expand_user = expand_user.stdout
-    else:
-        log.error("Can't expand user <%s>", dst.parts[0])
-        expand_user = dst.parts[0]
-
+    expand_user = _expand_home(container, dst.parts[0])
     return Path(expand_user) / dst.relative_to(dst.parts[0])
 
 
-def _is_dir_remote(container: ChameleonDevice, dst: Path) -> bool:
-    """Check if a path is a directory on the ChameleonEdge host.
+def _resolve_dir_remotely(container: ChameleonDevice, dst: Path) -> Path | None:
+    """Resolve a directory on the ChameleonEdge host and check it is a directory.
+
+    A destination starting with a ~ is expanded by the same command that checks it is a
+    directory, so it takes a single round-trip.
 
     :param container: ChameleonEdge host
     :type container: ChameleonDevice
     :param dst: Destination path on the ChameleonEdge host
     :type dst: Path
-    :return: True if the path is a directory, False otherwise
-    :rtype: bool
+    :return: The resolved directory, or None if the path is not a directory
+    :rtype: Path | None
     """
-    cmd = f"cd {shlex.quote(str(dst))} && pwd"
-    is_dir = _execute(container, cmd)
-    return is_dir.rc == 0
+    is_dir = _execute(container, f"cd {_quote_remote_path(dst)} && pwd")
+    return Path(is_dir.stdout) if is_dir.rc == 0 else None
 
 
-def _is_file_remote(container: ChameleonDevice, dst: Path) -> bool:
-    """Check if a path is a file on the ChameleonEdge host.
+def _resolve_file_remotely(container: ChameleonDevice, dst: Path) -> tuple[Path, bool]:
+    """Resolve a path on the ChameleonEdge host and check if it is a file.
+
+    A path starting with a ~ is expanded by the same command that checks it exists and
+    is a file, so it takes a single round-trip.
 
     :param container: ChameleonEdge host
     :type container: ChameleonDevice
     :param dst: Destination path on the ChameleonEdge host
     :type dst: Path
-    :return: True if the path is a file, False otherwise
-    :rtype: bool
+    :raises ValueError: If the path does not exist
+    :return: The resolved path, and True if the path is a file, False otherwise
+    :rtype: tuple[Path, bool]
     """
-    cmd = f"[ -f {shlex.quote(str(dst))} ]"
-    is_dir = _execute(container, cmd)
-    return is_dir.rc == 0
+    cmd = (
+        f'p={_quote_remote_path(dst)} ; echo "$p" ; [ -e "$p" ] || exit 2 ; [ -f "$p" ]'
+    )
+    is_file = _execute(container, cmd)
+    if is_file.rc == 2:
+        raise ValueError(f"Source {dst} does not exist", dst)
+
+    return Path(is_file.stdout or dst), is_file.rc == 0
+
+
+def _quote_remote_path(dst: Path) -> str:
+    """Quote a path for a shell on the ChameleonEdge host, except for a ~ prefix.
+
+    The ~ or ~user prefix is left unquoted, so the shell expands it.
+
+    :param dst: Path on the ChameleonEdge host
+    :type dst: Path
+    :return: The quoted path
+    :rtype: str
+    """
+    if dst.is_absolute() or str(dst)[0] != "~":
+        return shlex.quote(str(dst))
+
+    return f"{dst.parts[0]}/{shlex.quote(str(dst.relative_to(dst.parts[0])))}"
 
 
 def _ch_perms_remotely(
@@ -649,6 +917,7 @@ def run_script(
     timeout: int = const.COMMAND_TIMEOUT,
     poll_interval: int = const.POLL_INTERVAL,
     task_name: str | None = None,  # noqa: ARG001
+    staging_dir: Path | None = None,
 ) -> CommandResult:
     """Run a script on a container with specified parameters.
 
@@ -672,42 +941,99 @@ def run_script(
     :type poll_interval: int, optional
     :param task_name: name for the task, defaults to None
     :type task_name: str | None, optional
+    :param staging_dir: Directory owned by the caller, where the script was staged
+        with :func:`stage_script` or :func:`write_script` so it is not copied again,
+        defaults to a temporary directory removed once the script has run
+    :type staging_dir: Path | None, optional
     :return: CommandResult from executing the script on the container
     :rtype: CommandResult
     """
     workdir = shlex.quote(str(expanduser(container, workdir or const.TMP_DIR)))
 
-    with (
-        tempfile.NamedTemporaryFile(mode="w") as file,
-        script.open() as script_file,
-    ):
-        file.write(script_file.read())
-        file.seek(0)
-
-        remote_script = f"{workdir}/{Path(file.name).name}"
-        _upload_file(container, Path(file.name), Path(workdir))
-        _ch_perms_remotely(container, Path(remote_script), user=user, perms="+x")
+    with ExitStack() as stack:
+        if staging_dir is None:
+            staging_dir = stack.enter_context(get_staging_dir())
 
-        status = execute(
-            container,
-            remote_script,
-            *args,
-            user=user,
-            workdir=workdir,
-            timeout=timeout,
-            poll_interval=poll_interval,
-        )
-        log.debug(
-            "Script <%s> executed on container <%s>, status <%d> <%s> <%s>",
-            script,
-            container.address,
-            status.rc,
-            status.stdout,
-            status.stderr,
+        staged_script = (
+            script
+            if script.parent == staging_dir
+            else stage_script(script, staging_dir)
         )
+        remote_script = f"{workdir}/{staged_script.name}"
+        _upload_file(container, staged_script, Path(workdir))
+
+    _ch_perms_remotely(container, Path(remote_script), user=user, perms="+x")
+
+    status = execute(
+        container,
+        remote_script,
+        *args,
+        user=user,
+        workdir=workdir,
+        timeout=timeout,
+        poll_interval=poll_interval,
+    )
+    log.debug(
+        "Script <%s> executed on container <%s>, status <%d> <%s> <%s>",
+        script,
+        container.address,
+        status.rc,
+        status.stdout,
+        status.stderr,
+    )
 
-        _rm_remotely(container, Path(remote_script))
-        return status
+    _rm_remotely(container, Path(remote_script))
+    return status
+
+
+@contextmanager
+def get_staging_dir() -> Iterator[Path]:
+    """Create a directory scripts are staged in before being uploaded.
+
+    Scripts run on many devices at once are staged once by the caller, and the
+    directory is passed to :func:`run_script` in the worker processes, which exit
+    without running finalizers.
+
+    :yield: Path to the directory, removed on exit
+    :rtype: Iterator[Path]
+    """
+    with tempfile.TemporaryDirectory(prefix="kiso-") as staging_dir:
+        yield Path(staging_dir)
+
+
+def stage_script(script: Path, staging_dir: Path) -> Path:
+    """Copy a script to a uniquely named file in a staging directory.
+
+    The copy gives the uploaded script a name that cannot clash with files in the
+    remote working directory.
+
+    :param script: Path of the script
+    :type script: Path
+    :param staging_dir: Directory to copy the script to
+    :type staging_dir: Path
+    :return: Path to the copy of the script
+    :rtype: Path
+    """
+    staged_script = staging_dir / f"{utils.get_random_string(length=8)}-{script.name}"
+    shutil.copyfile(script, staged_script)
+    return staged_script
+
+
+def write_script(content: str, staging_dir: Path) -> Path:
+    """Write a script to a uniquely named file in a staging directory.
+
+    Allows scripts held in memory to be run with :func:`run_script`.
+
+    :param content: Content of the script
+    :type content: str
+    :param staging_dir: Directory to write the script to
+    :type staging_dir: Path
+    :return: Path to the script
+    :rtype: Path
+    """
+    script = staging_dir / f"{utils.get_random_string(length=8)}-script"
+    script.write_text(content)
+    return script
 
 
 def expanduser(container: ChameleonDevice, path: str | Path) -> str | Path:
@@ -731,17 +1057,35 @@ def expanduser(container: ChameleonDevice, path: str | Path) -> str | Path:
 
     path_p = Path(path)
 
-    expand_user = _execute(container, f"echo {path_p.parts[0]}")
-    if expand_user.rc == 0:
-        expand_user = expand_user.stdout
-    else:
-        log.error("Can't expand user <%s>", path_p.parts[0])
-        expand_user = path_p.parts[0]
-
+    expand_user = _expand_home(container, path_p.parts[0])
     resolved_path = Path(expand_user) / path_p.relative_to(path_p.parts[0])
     return resolved_path if isinstance(path, Path) else str(resolved_path)
 
 
+def _expand_home(container: ChameleonDevice, prefix: str) -> str:
+    """Expand a ~ or ~user prefix to the home directory it refers to on a container.
+
+    The home directory is looked up on the container once, and cached for later calls.
+
+    :param container: The Chameleon device (container) to execute the path expansion in
+    :type container: ChameleonDevice
+    :param prefix: The ~ or ~user prefix to expand
+    :type prefix: str
+    :return: The home directory, or the prefix itself if it can't be expanded
+    :rtype: str
+    """
+    key = (container.uuid, prefix)
+    if key not in _homes:
+        expand_user = _execute(container, f"echo {prefix}")
+        if expand_user.rc != 0:
+            log.error("Can't expand user <%s>", prefix)
+            return prefix
+
+        _homes[key] = expand_user.stdout
+
+    return _homes[key]
+
+
 def _execute(
     container: ChameleonDevice,
     command: str,
@@ -765,12 +1109,7 @@ def _execute(
     :rtype: CommandResult
     """
     with Path(os.devnull).open("w") as devnull, redirect_stdout(devnull):
-        cmd = f"sh -c {shlex.quote(command)}"
-
-        # Check if the command is to be executed as a specific user
-        if user:
-            cmd = f"sudo -u {shlex.quote(user)} {cmd}"
-
+        cmd = _shell_command(command, user)
         result = container.execute(cmd)
         result = command_result(container, result, task_name=task_name)
         log.debug(
@@ -784,6 +1123,29 @@ def _execute(
         return result
 
 
+@lru_cache(maxsize=128)
+def _shell_command(command: str, user: str | None = None) -> str:
+    """Build the shell command to execute a command on a Chameleon device.
+
+    Commands like the workflow status are executed on every poll, so the quoted shell
+    command is built once.
+
+    :param command: The command to execute
+    :type command: str
+    :param user: User to execute the command as, defaults to None
+    :type user: str | None, optional
+    :return: The shell command
+    :rtype: str
+    """
+    cmd = f"sh -c {shlex.quote(command)}"
+
+    # Check if the command is to be executed as a specific user
+    if user:
+        cmd = f"sudo -u {shlex.quote(user)} {cmd}"
+
+    return cmd
+
+
 def command_result(
     container: ChameleonDevice, status: dict[str, Any], task_name: str | None
 ) -> CommandResult:
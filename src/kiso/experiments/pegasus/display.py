@@ -5,6 +5,7 @@ from __future__ import annotations
 from typing import TYPE_CHECKING, Any
 
 from rich.console import ConsoleRenderable, Group, RichCast
+from rich.measure import Measurement
 from rich.progress import Progress
 from rich.spinner import Spinner
 from rich.table import Table
@@ -12,8 +13,10 @@ from rich.table import Table
 import kiso.constants as const
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
+
     from enoslib.api import CommandResult, CustomCommandResult
-    from rich.console import Console
+    from rich.console import Console, ConsoleOptions
 
 
 def inputs(
@@ -112,6 +115,42 @@ def _generate_table(status: dict[tuple[int, str], str], col_name: str) -> Table:
     return table
 
 
+class _Cell:
+    """Table cell whose content can be replaced after it is added to a table."""
+
+    def __init__(self) -> None:
+        """Initialize an empty cell."""
+        self.renderable: str | Spinner = ""
+
+    def __rich_console__(
+        self, console: Console, options: ConsoleOptions
+    ) -> Iterator[str | Spinner]:
+        """Render the current content of the cell.
+
+        :param console: Console the cell is rendered to
+        :type console: Console
+        :param options: Options to render the cell with
+        :type options: ConsoleOptions
+        :yield: Content of the cell
+        :rtype: Iterator[str | Spinner]
+        """
+        yield self.renderable
+
+    def __rich_measure__(
+        self, console: Console, options: ConsoleOptions
+    ) -> Measurement:
+        """Measure the current content of the cell, so the column fits it.
+
+        :param console: Console the cell is rendered to
+        :type console: Console
+        :param options: Options to render the cell with
+        :type options: ConsoleOptions
+        :return: Minimum and maximum width of the content
+        :rtype: Measurement
+        """
+        return Measurement.get(console, options, self.renderable)
+
+
 class PegasusWorkflowProgress(Progress):
     """A custom Progress subclass for tracking Pegasus workflow progress.
 
@@ -150,6 +189,10 @@ class PegasusWorkflowProgress(Progress):
         """
         self.table = Table()
         self.cols = cols
+        # The table is built on the first status, after which only the content of its
+        # cells changes, and the spinner keeps animating rather than restarting
+        self._cells: list[_Cell] = []
+        self._spinner = Spinner("moon")
         super().__init__(*args, **kwargs)
         self.update_table()
 
@@ -166,12 +209,14 @@ class PegasusWorkflowProgress(Progress):
         if status is None:
             return
 
+        if not self._cells:
+            self._cells = [_Cell() for _ in self.cols]
+            self.table = Table(*self.cols)
+            self.table.add_row(*self._cells)
+
         result = status["dags"]["root"]
-        self.table = table = Table()
-        row = []
         is_failing = False
-        for name, column in self.cols.items():
-            table.add_column(name)
+        for cell, (name, column) in zip(self._cells, self.cols.items()):
             text: str | Spinner = str(result[column])
             if (
                 name == "Failed"
@@ -188,11 +233,10 @@ class PegasusWorkflowProgress(Progress):
                 text = f"[bold green]{text}[/bold green]"
             elif name == "State" and result[self.cols["State"]] == "Running":
                 style = "bold blue" if is_failing else "bold yellow"
-                text = Spinner("moon", text=f"[{style}]Running...[/{style}]")
-
-            row.append(text)
+                self._spinner.update(text=f"[{style}]Running...[/{style}]")
+                text = self._spinner
 
-        table.add_row(*row)
+            cell.renderable = text
 
     def get_renderable(self) -> ConsoleRenderable | RichCast | str:
         """get_renderable _summary_.
@@ -3,14 +3,14 @@
 from __future__ import annotations
 
 import copy
+import itertools
 import json
 import logging
+import math
 import re
 import shlex
-import tempfile
 import time
 from collections import defaultdict
-from datetime import datetime, timezone
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -45,6 +45,64 @@ log = logging.getLogger("kiso.experiment.pegasus")
 
 console = Console()
 
+#: Separates pegasus-status's output from the monitord.done check.
+_STATUS_MARKER = "--kiso-status--"
+
+#: Locates the submit dir in the output of the experiment's main script. The submit
+#: dir is not matched past a closing quote or the end of the line.
+_SUBMIT_DIR_RE = re.compile(r'(pegasus-run|pegasus-remove|submit_dir:)\s+"?([^"\n]+)')
+
+
+#: Looks up the latest state and the submit dir of the workflows that changed state
+#: since a given timestamp, in Pegasus' master workflow database.
+_WORKFLOW_STATE_QUERY = """SELECT ws.state, w.submit_dir
+FROM    master_workflow w
+        JOIN master_workflowstate ws ON w.wf_id = ws.wf_id
+        JOIN (SELECT wf_id, max(timestamp) timestamp
+            FROM   master_workflowstate
+            WHERE timestamp >= {ts}
+            GROUP  BY wf_id) t ON ws.wf_id = t.wf_id
+            AND ws.timestamp = t.timestamp
+;"""
+
+
+def _find_submit_dir(*streams: str) -> tuple[str, str] | None:
+    """Find the last mention of a workflow's submit dir in the output of a command.
+
+    The streams are searched separately, from the last one to the first one, rather
+    than copied into a single string.
+
+    :param streams: The output streams of the command, in order
+    :type streams: str
+    :return: The command the submit dir was mentioned with, and the submit dir
+    :rtype: tuple[str, str] | None
+    """
+    for stream in reversed(streams):
+        matches = _SUBMIT_DIR_RE.findall(stream)
+        if matches:
+            return matches[-1]
+
+    return None
+
+
+def _workflow_state_query(ts: float) -> str:
+    """Build the query that looks up the workflows that changed state since a time.
+
+    sqlite3 runs on the remote machine, so the timestamp cannot be bound as a query
+    parameter. It is validated as a finite number and inlined as a numeric literal.
+
+    :param ts: Timestamp of workflow submission, in seconds since the epoch
+    :type ts: float
+    :raises ValueError: If the timestamp is not a finite number
+    :return: The query to pass to sqlite3
+    :rtype: str
+    """
+    ts = float(ts)
+    if not math.isfinite(ts):
+        raise ValueError("Invalid workflow submission timestamp", ts)
+
+    return _WORKFLOW_STATE_QUERY.format(ts=f"{ts:.6f}")
+
 
 class PegasusRunner:
     """Runner that executes a Pegasus workflow on provisioned infrastructure.
@@ -96,6 +154,9 @@ class PegasusRunner:
         self.poll_interval = experiment.poll_interval or const.POLL_INTERVAL
         self.timeout = experiment.timeout or const.WORKFLOW_TIMEOUT
 
+        # Virtual machines and containers each set of labels resolves to
+        self._split_labels_cache: dict[frozenset[str], tuple[Roles, Roles]] = {}
+
     def check(self, config: Kiso, label_to_machines: Roles) -> None:
         """Validate the Pegasus experiment configuration against the Kiso config.
 
@@ -187,49 +248,24 @@ class PegasusRunner:
             if experiment.kind != "pegasus":
                 continue
 
-            for index, setup in enumerate(experiment.setup or []):
-                unlabel_to_machines[experiment.name].update(
-                    [
-                        (f"setup[{index}]", label)
-                        for label in setup.labels
-                        if label not in label_to_machines
-                    ]
-                )
-
-            for index, location in enumerate(experiment.inputs or []):
-                unlabel_to_machines[experiment.name].update(
-                    [
-                        (f"inputs[{index}]", label)
-                        for label in location.labels
-                        if label not in label_to_machines
-                    ]
-                )
-
-            for index, location in enumerate(experiment.outputs or []):
-                unlabel_to_machines[experiment.name].update(
-                    [
-                        (f"outputs[{index}]", label)
-                        for label in location.labels
-                        if label not in label_to_machines
-                    ]
-                )
-            for index, setup in enumerate(experiment.post_scripts or []):
-                unlabel_to_machines[experiment.name].update(
-                    [
-                        (f"post_scripts[{index}]", label)
-                        for label in setup.labels
-                        if label not in label_to_machines
-                    ]
-                )
-
-            if not unlabel_to_machines[experiment.name]:
-                del unlabel_to_machines[experiment.name]
-        else:
-            if unlabel_to_machines:
-                raise ValueError(
-                    "Undefined labels referenced in experiments section",
-                    unlabel_to_machines,
-                )
+            for section, items in (
+                ("setup", experiment.setup),
+                ("inputs", experiment.inputs),
+                ("outputs", experiment.outputs),
+                ("post_scripts", experiment.post_scripts),
+            ):
+                for index, item in enumerate(items or []):
+                    for label in item.labels:
+                        if label not in label_to_machines:
+                            unlabel_to_machines[experiment.name].add(
+                                (f"{section}[{index}]", label)
+                            )
+
+        if unlabel_to_machines:
+            raise ValueError(
+                "Undefined labels referenced in experiments section",
+                unlabel_to_machines,
+            )
 
     def _check_missing_input_files(self, experiment_config: Kiso) -> None:
         """Check for missing input files in experiment configurations.
@@ -242,15 +278,29 @@ class PegasusRunner:
         :type experiment_config: Kiso
         :raises ValueError: If any specified input files do not exist
         """
-        missing_files = []
-        for experiment in experiment_config.experiments:
-            if experiment.kind != "pegasus":
-                continue
+        inputs = [
+            (experiment.name, Path(location.src))
+            for experiment in experiment_config.experiments
+            if experiment.kind == "pegasus"
+            for location in experiment.inputs or []
+        ]
 
-            for location in experiment.inputs or []:
-                src = Path(location.src)
-                if not src.exists():
-                    missing_files.append((experiment.name, src))
+        # List each parent directory once, instead of a stat call per input file,
+        # which is slow when there are many inputs or the inputs are on NFS
+        listings: dict[Path, set[str]] = {}
+        for parent in {src.parent for _, src in inputs}:
+            try:
+                listings[parent] = {entry.name for entry in parent.iterdir()}
+            except OSError:
+                listings[parent] = set()
+
+        # Paths like `.` or unreadable parent directories are not in the listing, so
+        # fall back to a stat call for those
+        missing_files = [
+            (exp, src)
+            for exp, src in inputs
+            if src.name not in listings[src.parent] and not src.exists()
+        ]
 
         if missing_files:
             raise ValueError(
@@ -286,6 +336,7 @@ class PegasusRunner:
         self.resultdir = resultdir
         self.labels = labels
         self.env = env
+        self._split_labels_cache.clear()
 
         # Resolve labels
         self._labels = utils.resolve_labels(labels, self.submit_node_labels)
@@ -307,6 +358,67 @@ class PegasusRunner:
         self._run_post_scripts()
         self._fetch_outputs()
 
+    def copy_inputs(
+        self, wd: str, remote_wd: str, labels: Roles, env: Environment
+    ) -> tuple[Environment, list]:
+        """Copy the inputs of the experiment ahead of running it.
+
+        Inputs that were copied successfully are skipped when the experiment runs.
+        Inputs that failed to copy to any machine are recorded as failed, so they are
+        copied again when the experiment runs.
+
+        :param wd: Local experiment working directory
+        :type wd: str
+        :param remote_wd: Remote working directory on provisioned resources
+        :type remote_wd: str
+        :param labels: All provisioned resources keyed by label
+        :type labels: Roles
+        :param env: EnOSlib task environment used to persist step state
+        :type env: Environment
+        :return: The updated state of the experiment, and the results of each copy,
+            to display with ``show_inputs``
+        :rtype: tuple[Environment, list]
+        """
+        self.wd = wd
+        self.remote_wd = remote_wd
+        self.labels = labels
+        self.env = env
+        self._split_labels_cache.clear()
+
+        self.env.setdefault("copy-input", {})
+        results = []
+        for instance, location in enumerate(self.inputs):
+            result = self._copy_input(instance, location)
+            if any(r.status == const.STATUS_FAILED for r in result):
+                self.env["copy-input"][instance] = const.STATUS_FAILED
+            results.append((instance, location, result))
+
+        return self.env, results
+
+    def show_inputs(self, results: list) -> None:
+        """Display the results of the inputs copied ahead of running the experiment.
+
+        :param results: The results of each copy, returned by ``copy_inputs``
+        :type results: list
+        """
+        console.print(rf"\[{self.name}] Copied inputs to the destination")
+        display.inputs(console, results)
+
+    def _split_labels(self, label_names: list[str]) -> tuple[Roles, Roles]:
+        """Resolve labels into the virtual machines and containers they refer to.
+
+        Inputs, scripts and outputs often reference the same labels, so the result is
+        cached for the duration of a run.
+
+        :param label_names: Names of the labels to resolve
+        :type label_names: list[str]
+        :return: A tuple containing (non-edge VMs, edge containers)
+        :rtype: tuple[Roles, Roles]
+        """
+        return utils.resolve_and_split_labels(
+            self.labels, label_names, self._split_labels_cache
+        )
+
     def _copy_inputs(self) -> None:
         """Copy input files to specified destinations across virtual machines and containers.
 
@@ -347,9 +459,7 @@ class PegasusRunner:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, input.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = self._split_labels(input.labels)
         src = Path(input.src)
 
         dst = Path(input.dst)
@@ -365,24 +475,37 @@ class PegasusRunner:
                 log.debug("Input file <%s> does not exist, skipping copy", src)
                 return results
             if vms:
+                # Directories are copied with rsync, which runs locally, so only a
+                # single file is copied as the kiso user
+                is_dir = src.is_dir()
                 with utils.actions(
                     roles=vms,
-                    run_as=const.KISO_USER,
+                    run_as=None if is_dir else const.KISO_USER,
                     on_error_continue=True,
                     strategy="free",
                 ) as p:
-                    p.copy(
-                        src=str(src),
-                        dest=str(dst),
-                        mode="preserve",
-                        task_name=f"Copy input file {instance}",
-                    )
+                    if is_dir:
+                        utils.rsync(
+                            p,
+                            src,
+                            dst,
+                            task_name=f"Copy input file {instance}",
+                            mkdir=True,
+                        )
+                    else:
+                        p.copy(
+                            src=str(src),
+                            dest=str(dst),
+                            mode="preserve",
+                            task_name=f"Copy input file {instance}",
+                        )
                 results.extend(p.results)
             if containers:
-                for container in containers:
-                    results.append(
-                        edge.upload(container, src, dst, user=const.KISO_USER)
+                results.extend(
+                    edge.map_containers(
+                        edge.upload, containers, src, dst, user=const.KISO_USER
                     )
+                )
 
         return results
 
@@ -403,78 +526,153 @@ class PegasusRunner:
 
         self.env.setdefault("run-setup-script", {})
         results = []
-        for instance, setup_script in enumerate(setup_scripts):
-            result = self._run_setup_script(instance, setup_script)
-            results.append((instance, setup_script, result))
+        # Consecutive setup scripts for the same labels are run together, so their
+        # order is preserved
+        for _, batch in itertools.groupby(
+            enumerate(setup_scripts), key=lambda item: frozenset(item[1].labels)
+        ):
+            results.extend(self._run_setup_script_batch(list(batch)))
 
         display.setup_scripts(console, results)
 
-    def _run_setup_script(
-        self, instance: int, setup_script: Script
-    ) -> list[CommandResult | CustomCommandResult]:
-        """Run setup scripts for an experiment across specified labels.
-
-        Executes setup scripts defined in the experiment configuration on virtual
-        machines and containers. Handles script preparation, copying, and execution
-        while tracking the status of each script run.
-
-        :param instance: The specific instance number of the setup_script
-        :type index: int
-        :param index: The overall experiment index
-        :type index: int
-        :param setup_script: Configuration dictionary containing setup_script details
-        :type setup_script: dict
-        :return: List of CommandResult or CustomCommandResult objects
-        :rtype: list[CommandResult | CustomCommandResult]
+    def _run_setup_script_batch(
+        self, setup_scripts: list[tuple[int, Script]]
+    ) -> list[tuple[int, Script, list[CommandResult | CustomCommandResult]]]:
+        """Run a batch of setup scripts that target the same labels, in order.
+
+        On virtual machines all the setup scripts are copied, run and removed in a
+        single Ansible play, instead of one play per setup script. A virtual machine or
+        container on which a setup script fails does not run the remaining setup
+        scripts of the batch, while the others do. The status of each setup script is
+        recorded from its own results, so it fails if it failed, or did not run, on any
+        of them. Setup scripts that already ran successfully are skipped.
+
+        :param setup_scripts: Instance numbers and configurations of the setup scripts,
+            all with the same labels
+        :type setup_scripts: list[tuple[int, Script]]
+        :return: Instance number, configuration and results of each setup script
+        :rtype: list[tuple[int, Script, list[CommandResult | CustomCommandResult]]]
         """
-        results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, setup_script.labels)
-        vms, containers = utils.split_labels(_labels, labels)
-        executable = setup_script.executable
+        results: dict[int, list[CommandResult | CustomCommandResult]] = {
+            instance: [] for instance, _ in setup_scripts
+        }
+        vms, containers = self._split_labels(setup_scripts[0][1].labels)
 
         kiso_state_key = "run-setup-script"
-        with (
-            experiment_state(self.env, kiso_state_key, instance) as state,
-            tempfile.NamedTemporaryFile() as script,
-        ):
-            if state.status == const.STATUS_OK:
-                return results
+        done = self.env.setdefault(kiso_state_key, {})
+        scripts = [
+            (
+                instance,
+                setup_script.executable,
+                f"#!{setup_script.executable}\n{setup_script.script}",
+            )
+            for instance, setup_script in setup_scripts
+            if done.get(instance) != const.STATUS_OK
+        ]
+        if not scripts:
+            return [
+                (instance, setup_script, []) for instance, setup_script in setup_scripts
+            ]
+
+        # Hosts on which a setup script of the batch failed, or was not run
+        failed_hosts: set[str] = set()
+        vms_failed = False
+        if vms:
+            try:
+                for instance, result in self._run_setup_scripts_on_vms(vms, scripts):
+                    results[instance].append(result)
+            except Exception:
+                # The setup scripts did not run on the virtual machines, but still run
+                # on the containers
+                log.exception("Failed to run setup scripts for <%s>", self.name)
+                vms_failed = True
+
+        for instance, _, script in scripts:
+            with experiment_state(self.env, kiso_state_key, instance):
+                _containers = [
+                    container
+                    for container in containers
+                    if container.address not in failed_hosts
+                ]
+                if _containers:
+                    try:
+                        with edge.get_staging_dir() as staging_dir:
+                            results[instance].extend(
+                                edge.map_containers(
+                                    edge.run_script,
+                                    _containers,
+                                    edge.write_script(script, staging_dir),
+                                    user=const.KISO_USER,
+                                    workdir=self.remote_wd,
+                                    staging_dir=staging_dir,
+                                )
+                            )
+                    except Exception:
+                        # It is not known which containers ran the setup script
+                        failed_hosts.update(
+                            container.address for container in _containers
+                        )
+                        raise
 
-            dst = str(Path(const.TMP_DIR) / Path(script.name).name)
+            failed_hosts.update(
+                result.host
+                for result in results[instance]
+                if result.status != const.STATUS_OK
+            )
+            if vms_failed or failed_hosts:
+                done[instance] = const.STATUS_FAILED
 
-            script.write(f"#!{executable}\n".encode())
-            script.write(setup_script.script.encode())
-            script.seek(0)
+        return [
+            (instance, setup_script, results[instance])
+            for instance, setup_script in setup_scripts
+        ]
 
-            if vms:
-                with utils.actions(
-                    roles=vms,
-                    run_as=const.KISO_USER,
-                    on_error_continue=True,
-                    strategy="free",
-                ) as p:
-                    p.copy(
-                        src=script.name,
-                        dest=dst,
-                        mode="preserve",
-                        task_name=f"Copy script {instance}",
-                    )
-                    p.shell(f"{executable} {dst}", chdir=self.remote_wd)
-                    p.shell(f"rm -rf {dst}", chdir=self.remote_wd)
-                results.extend(p.results)
-            if containers:
-                for container in containers:
-                    results.append(
-                        edge.run_script(
-                            container,
-                            Path(script.name),
-                            user=const.KISO_USER,
-                            workdir=self.remote_wd,
-                        )
-                    )
+    def _run_setup_scripts_on_vms(
+        self, vms: Roles, scripts: list[tuple[int, str, str]]
+    ) -> list[tuple[int, CommandResult]]:
+        """Copy, run and remove setup scripts on virtual machines in one Ansible play.
 
-        return results
+        A virtual machine on which a task fails does not run the remaining tasks of
+        the play.
+
+        :param vms: Virtual machines to run the setup scripts on
+        :type vms: Roles
+        :param scripts: Instance number, executable and content of each setup script
+        :type scripts: list[tuple[int, str, str]]
+        :return: Instance number of the setup script and result of each task
+        :rtype: list[tuple[int, CommandResult]]
+        """
+        task_instances = {}
+        with utils.actions(
+            roles=vms,
+            run_as=const.KISO_USER,
+            on_error_continue=True,
+            strategy="free",
+        ) as p:
+            for instance, executable, script in scripts:
+                dst = str(
+                    Path(const.TMP_DIR)
+                    / f"kiso-{utils.get_random_string(length=8)}-setup"
+                )
+                copy_task, run_task = (
+                    f"{action} script {instance}" for action in ("Copy", "Run")
+                )
+                task_instances.update(dict.fromkeys((copy_task, run_task), instance))
+                p.copy(
+                    content=utils.ansible_raw(script),
+                    dest=dst,
+                    mode="0700",
+                    task_name=copy_task,
+                )
+                # The script is removed when the shell running it exits, rather than
+                # by another task
+                p.shell(
+                    f"trap 'rm -f {dst}' EXIT ; {executable} {dst}",
+                    chdir=self.remote_wd,
+                    task_name=run_task,
+                )
+
+        return [(task_instances[result.task], result) for result in p.results]
 
     def _run_post_scripts(self) -> None:
         """Run post-execution scripts for an experiment.
@@ -517,24 +715,20 @@ class PegasusRunner:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, post_script.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = self._split_labels(post_script.labels)
         executable = post_script.executable
 
         kiso_state_key = "run-post-script"
-        with (
-            experiment_state(self.env, kiso_state_key, instance) as state,
-            tempfile.NamedTemporaryFile() as script,
-        ):
+        with experiment_state(self.env, kiso_state_key, instance) as state:
             if state.status == const.STATUS_OK:
                 return results
 
-            dst = str(Path(const.TMP_DIR) / Path(script.name).name)
-
-            script.write(f"#!{executable}\n".encode())
-            script.write(post_script.script.encode())
-            script.seek(0)
+            # The script is built in memory and sent as the content of the copy,
+            # rather than written to a temporary file first
+            script = f"#!{executable}\n{post_script.script}"
+            dst = str(
+                Path(const.TMP_DIR) / f"kiso-{utils.get_random_string(length=8)}-script"
+            )
 
             if vms:
                 with utils.actions(
@@ -544,22 +738,26 @@ class PegasusRunner:
                     strategy="free",
                 ) as p:
                     p.copy(
-                        src=script.name,
+                        content=utils.ansible_raw(script),
                         dest=dst,
-                        mode="preserve",
+                        mode="0700",
                         task_name=f"Copy script {instance}",
                     )
-                    p.shell(f"{executable} {dst}", chdir=self.remote_wd)
-                    p.shell(f"rm -rf {dst}", chdir=self.remote_wd)
+                    p.shell(
+                        f"trap 'rm -f {dst}' EXIT ; {executable} {dst}",
+                        chdir=self.remote_wd,
+                    )
                 results.extend(p.results)
             if containers:
-                for container in containers:
-                    results.append(
-                        edge.run_script(
-                            container,
-                            Path(script.name),
+                with edge.get_staging_dir() as staging_dir:
+                    results.extend(
+                        edge.map_containers(
+                            edge.run_script,
+                            containers,
+                            edge.write_script(script, staging_dir),
                             user=const.KISO_USER,
                             workdir=self.remote_wd,
+                            staging_dir=staging_dir,
                         )
                     )
 
@@ -607,18 +805,14 @@ class PegasusRunner:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, output.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = self._split_labels(output.labels)
 
         src = Path(output.src)
         if not src.is_absolute() and output.src[0] != "~":
             src = Path(self.remote_wd) / src
 
         dst = Path(output.dst)
-        if not dst.exists():
-            log.debug("Destination directory <%s> does not exist, creating it", dst)
-            dst.mkdir(parents=True)
+        dst.mkdir(parents=True, exist_ok=True)
 
         kiso_state_key = "fetch-output"
         with experiment_state(self.env, kiso_state_key, instance) as state:
@@ -626,7 +820,9 @@ class PegasusRunner:
                 return results
 
             if vms:
-                with utils.actions(roles=vms, run_as=const.KISO_USER) as p:
+                with utils.actions(
+                    roles=vms, run_as=const.KISO_USER, strategy="free"
+                ) as p:
                     p.synchronize(
                         mode="pull",
                         src=str(src),
@@ -636,8 +832,7 @@ class PegasusRunner:
                     )
                 results.extend(p.results)
             if containers:
-                for container in containers:
-                    results.append(edge.download(container, src, dst))
+                results.extend(edge.map_containers(edge.download, containers, src, dst))
 
         return results
 
@@ -693,43 +888,41 @@ class PegasusRunner:
         console.print(rf"\[{name}-{instance + 1}] Generating workflow")
 
         kiso_state_key = "workflow-generate"
-        with (
-            experiment_state(self.env, instance, kiso_state_key) as state,
-            tempfile.NamedTemporaryFile() as script,
-        ):
+        with experiment_state(self.env, instance, kiso_state_key) as state:
             if state.status == const.STATUS_OK:
                 return None
 
-            ts = datetime.now(timezone.utc)
-
-            dst = Path(self.remote_wd) / Path(script.name).name
-            script.write(main.encode())
-            script.seek(0)
+            ts = time.time()
 
             if vms:
                 vm = vms[0]
+                dst = (
+                    Path(self.remote_wd)
+                    / f"kiso-{utils.get_random_string(length=8)}-main"
+                )
                 with utils.actions(roles=vm, run_as=const.KISO_USER) as p:
                     p.copy(
-                        src=script.name,
-                        dest=str(dst.parent),
-                        mode="preserve",
+                        content=utils.ansible_raw(main),
+                        dest=str(dst),
+                        mode="0700",
                         task_name="Copy main script",
                     )
                     p.shell(
-                        f"{bash} {dst}",
+                        f"trap 'rm -f {dst}' EXIT ; {bash} {dst}",
                         chdir=str(dst.parent),
                         task_name="Generate workflow",
                     )
-                    p.shell(f"rm -rf {dst}", chdir=str(dst.parent))
                 submit_dir = self._get_submit_dir(p.results[1], vm, ts)
             elif containers:
                 container = containers[0]
-                status = edge.run_script(
-                    container,
-                    Path(script.name),
-                    user=const.KISO_USER,
-                    workdir=str(dst.parent),
-                )
+                with edge.get_staging_dir() as staging_dir:
+                    status = edge.run_script(
+                        container,
+                        edge.write_script(main, staging_dir),
+                        user=const.KISO_USER,
+                        workdir=self.remote_wd,
+                        staging_dir=staging_dir,
+                    )
                 submit_dir = self._get_submit_dir(status, container, ts)
 
         if state.status == const.STATUS_OK:
@@ -758,14 +951,10 @@ class PegasusRunner:
         if isinstance(machine, Host):
             with utils.actions(roles=machine, run_as=const.KISO_USER) as p:
                 p.shell(f"pegasus-run {submit_dir}", task_name="Run workflow")
-            submit_dir = self._get_submit_dir(
-                p.results[0], machine, datetime.fromtimestamp(0)
-            )
+            submit_dir = self._get_submit_dir(p.results[0], machine, 0.0)
         else:
             status = self._pegasus_run(machine, Path(submit_dir), user=const.KISO_USER)
-            submit_dir = self._get_submit_dir(
-                status, machine, datetime.fromtimestamp(0)
-            )
+            submit_dir = self._get_submit_dir(status, machine, 0.0)
 
     def _pegasus_run(
         self, container: ChameleonDevice, submit_dir: Path, user: str
@@ -788,7 +977,7 @@ class PegasusRunner:
         return edge._execute(container, " ".join(cmd), user=user)
 
     def _get_submit_dir(
-        self, result: CommandResult, machine: Host | ChameleonDevice, ts: datetime
+        self, result: CommandResult, machine: Host | ChameleonDevice, ts: float
     ) -> Path:
         """Get the submit directory for a Pegasus workflow.
 
@@ -800,17 +989,14 @@ class PegasusRunner:
         :type result: CommandResult
         :param machine: Machine or device where the workflow was submitted
         :type machine: Host | ChameleonDevice
-        :param ts: Timestamp of workflow submission
-        :type ts: datetime
+        :param ts: Timestamp of workflow submission, in seconds since the epoch
+        :type ts: float
         :return: Path to the workflow submit directory
         :rtype: Path
         :raises ValueError: If workflow submit directory cannot be determined or
         workflow fails
         """
         ec = result.rc
-        output1 = f"""{result.stdout}
-    {result.stderr}
-    """
         log.debug(
             "Generate workflow, status <%s> stdout <%s> stderr <%s>",
             result.rc,
@@ -818,18 +1004,19 @@ class PegasusRunner:
             result.stderr,
         )
         if ec != 0:
+            output1 = f"""{result.stdout}
+    {result.stderr}
+    """
             raise ValueError("Workflow generation failed", output1, ec)
 
         # Locate the submit dir from the logs,
         #   Workflow was planned, pegasus-run  <submit-dir>
         #   Workflow was run, pegasus-remove  <submit-dir>
         #   Workflow was planned and/or run with Python API, submit_dir: "<submit-dir>"
-        matches = re.findall(
-            r'.*(pegasus-run|pegasus-remove|submit_dir:)\s+"?(.*)"?.*', output1
-        )
-        if matches:
-            submit_dir = matches[-1][-1]
-            if matches[-1][0] == "pegasus-run":
+        match = _find_submit_dir(result.stdout, result.stderr)
+        if match:
+            submit_dir = match[-1]
+            if match[0] == "pegasus-run":
                 # Workflow was only planned
                 try:
                     self.pegasus_run(machine, submit_dir)
@@ -839,16 +1026,10 @@ class PegasusRunner:
                     ) from e
         else:
             # If the experiment's main script does not generate any logs
-            cmd = f"""echo 'SELECT ws.state, w.submit_dir
-    FROM    master_workflow w
-            JOIN master_workflowstate ws ON w.wf_id = ws.wf_id
-            JOIN (SELECT wf_id, max(timestamp) timestamp
-                FROM   master_workflowstate
-                WHERE timestamp >= {ts.timestamp()}
-                GROUP  BY wf_id) t ON ws.wf_id = t.wf_id
-                AND ws.timestamp = t.timestamp
-    ;' | sqlite3 -list ~{const.KISO_USER}/.pegasus/workflow.db
-    """  # noqa: S608
+            # The query is passed to sqlite3 as a single argument, rather than piped
+            # through echo, so it needs no escaping other than quoting
+            query = shlex.quote(_workflow_state_query(ts))
+            cmd = f"sqlite3 -list ~{const.KISO_USER}/.pegasus/workflow.db {query}"
 
             if isinstance(machine, Host):
                 result = en.run_command(cmd, roles=machine, run_as=const.KISO_USER)[0]
@@ -924,10 +1105,8 @@ class PegasusRunner:
                     instance,
                 )
                 console.print(rf"\[{name}-{instance + 1}] Computing Pegasus statistics")
-                self.pegasus_statistics(vms[0] if vms else containers[0], submit_dir)
-
                 console.print(rf"\[{name}-{instance + 1}] Running Pegasus analyzer")
-                self.pegasus_analyzer(vms[0] if vms else containers[0], submit_dir)
+                self._analyze_workflow(vms[0] if vms else containers[0], submit_dir)
 
     def _wait_for_workflow_2(
         self,
@@ -938,7 +1117,8 @@ class PegasusRunner:
     ) -> None:
         """Wait for a Pegasus workflow to complete on a given machine.
 
-        Polls the workflow status periodically and checks for completion. Supports both
+        Polls the workflow status periodically and checks for completion. The polling
+        interval backs off while the workflow's status does not change. Supports both
         Host and ChameleonDevice machine types. Handles workflow timeout by stopping
         the workflow if it exceeds the specified time limit.
 
@@ -953,8 +1133,12 @@ class PegasusRunner:
         const.WORKFLOW_TIMEOUT
         :type timeout: int, optional
         """
-        status_cmd = f"pegasus-status --jsonrv {submit_dir}"
-        done_file = Path(submit_dir) / "monitord.done"
+        # Get the workflow's status and check whether it is done in a single call
+        done_file = shlex.quote(str(Path(submit_dir) / "monitord.done"))
+        status_cmd = (
+            f"pegasus-status --jsonrv {shlex.quote(str(submit_dir))} ; rc=$? ; echo ; "
+            f"echo {_STATUS_MARKER} $rc ; test -e {done_file} && echo done ; true"
+        )
         start_time = time.time()
         cols = {
             "Unready": "unready",
@@ -968,34 +1152,37 @@ class PegasusRunner:
             "Total": "total",
             "State": "state",
         }
+        interval = poll_interval
+        max_interval = max(poll_interval, const.MAX_POLL_INTERVAL)
+        last_output = None
         with PegasusWorkflowProgress(cols=cols) as progress:
             while timeout == -1 or time.time() - start_time <= timeout:
                 if isinstance(machine, Host):
                     with utils.actions(roles=machine, run_as=const.KISO_USER) as p:
                         p.shell(status_cmd, task_name="Wait for workflow")
-                        p.shell(f"cat {done_file}")
-
-                    pegasus_status = p.results[0]
-                    monitord_status = p.results[1]
 
-                    self._render_status(progress, pegasus_status)
-
-                    if monitord_status.status == const.STATUS_OK:
-                        break
+                    status = p.results[0]
                 else:
-                    pegasus_status = self.pegasus_status(
-                        machine, Path(submit_dir), user=const.KISO_USER
-                    )
+                    status = edge._execute(machine, status_cmd, user=const.KISO_USER)
 
-                    self._render_status(progress, pegasus_status)
+                output, done = self._parse_status(status)
+                # pegasus-status reports the same JSON while the workflow makes no
+                # progress, so only parse it and redraw the table when it changes
+                if output is not None and output != last_output:
+                    progress.update_table(json.loads(output))
 
-                    monitord_status = edge._execute(
-                        machine, f"cat {done_file}", user=const.KISO_USER
-                    )
-                    if monitord_status.rc == 0:
-                        break
+                if done:
+                    break
 
-                time.sleep(poll_interval)
+                # Back off while the workflow makes no progress, and poll at the
+                # configured interval again as soon as it does
+                interval = (
+                    min(interval * 1.5, max_interval)
+                    if output == last_output
+                    else poll_interval
+                )
+                last_output = output
+                time.sleep(interval)
             else:
                 # Workflow ran for too long
                 log.debug("Workflow did not finish within the timeout <%d>", timeout)
@@ -1006,44 +1193,25 @@ class PegasusRunner:
                     timeout,
                 )
 
-    def _render_status(
-        self, progress: PegasusWorkflowProgress, status: CommandResult
-    ) -> None:
-        """Render the status of a Pegasus workflow command execution.
-
-        Parses and prints the output of a Pegasus workflow command result,
-        handling both CommandResult and dictionary input types.
+    def _parse_status(self, status: CommandResult) -> tuple[str | None, bool]:
+        """Parse the output of the workflow status command.
 
-        :param progress: _description_
-        :type progress: PegasusWorkflowProgress
-        :param status: The command execution result to render
+        :param status: The result of the workflow status command
         :type status: CommandResult
+        :return: The workflow's status JSON reported by pegasus-status, if available,
+            and whether the workflow is done
+        :rtype: tuple[str | None, bool]
         """
         if status.status != const.STATUS_OK:
-            return
+            return None, False
 
-        output = json.loads(status.payload["stdout"])
-        progress.update_table(output)
+        output, marker, tail = status.payload["stdout"].rpartition(_STATUS_MARKER)
+        if not marker:
+            return None, False
 
-    def pegasus_status(
-        self, container: ChameleonDevice, submit_dir: Path, user: str
-    ) -> CommandResult:
-        """Get status of a Pegasus workflow on a Chameleon device.
-
-        This function gets the status of a Pegasus workflow on a Chameleon device
-        using the ChameleonEdge API.
-
-        :param container: The Chameleon device to execute the command on
-        :type container: ChameleonDevice
-        :param submit_dir: Directory where the workflow is submitted
-        :type submit_dir: str
-        :param user: User to execute the command as, defaults to None
-        :type user: str, optional
-        :return: CommandResult containing execution status and output
-        :rtype: CommandResult
-        """
-        cmd = ["pegasus-status", "--jsonrv", shlex.quote(str(submit_dir))]
-        return edge._execute(container, " ".join(cmd), user=user)
+        rc, *done = tail.split()
+        output = output.strip() if rc == "0" and output.strip() else None
+        return output, done == ["done"]
 
     def pegasus_remove(
         self, machine: Host | ChameleonDevice, submit_dir: str | Path
@@ -1092,16 +1260,16 @@ class PegasusRunner:
         cmd = ["pegasus-remove", shlex.quote(str(submit_dir))]
         return edge._execute(container, " ".join(cmd), user=user)
 
-    def pegasus_statistics(
+    def _analyze_workflow(
         self, machine: Host | ChameleonDevice, submit_dir: str | Path
     ) -> None:
-        """Execute Pegasus workflow statistics computation.
+        """Compute the statistics of a Pegasus workflow and analyze it.
 
-        Computes workflow statistics for a given submit directory using
-        pegasus-statistics. Supports execution on both Host and ChameleonDevice
-        machine types.
+        Runs pegasus-statistics and pegasus-analyzer together, in a single Ansible play
+        on a Host and in a single command on a ChameleonDevice, instead of one
+        round-trip each.
 
-        :param machine: The machine on which to run pegasus-statistics
+        :param machine: The machine running the Pegasus workflow
         :type machine: Host | ChameleonDevice
         :param submit_dir: Directory containing the Pegasus workflow submit information
         :type submit_dir: str | Path
@@ -1112,77 +1280,18 @@ class PegasusRunner:
                     f"pegasus-statistics -s all {submit_dir}",
                     task_name="Compute workflow statistics",
                 )
-        else:
-            self._pegasus_statistics(machine, Path(submit_dir), user=const.KISO_USER)
-
-    def _pegasus_statistics(
-        self, container: ChameleonDevice, submit_dir: Path, user: str
-    ) -> CommandResult:
-        """Compute Pegasus workflow statistics on a Chameleon device.
-
-        This function computes statistics for a Pegasus workflow on a Chameleon device
-        using the ChameleonEdge API.
-
-        :param container: The Chameleon device to execute the command on
-        :type container: ChameleonDevice
-        :param submit_dir: Directory where the workflow is submitted
-        :type submit_dir: str
-        :param user: User to execute the command as, defaults to None
-        :type user: str, optional
-        :return: CommandResult containing execution status and output
-        :rtype: CommandResult
-        """
-        cmd = ["pegasus-statistics", "-s", "all", shlex.quote(str(submit_dir))]
-        return edge._execute(container, " ".join(cmd), user=user)
-
-    def pegasus_analyzer(
-        self, machine: Host | ChameleonDevice, submit_dir: str | Path
-    ) -> None:
-        """Execute Pegasus workflow analyzer.
-
-        Analyzes workflow using pegasus-analyzer. The analyzer is commonly run on
-        workflow failures. Supports execution on both Host and ChameleonDevice machine
-        types.
-
-        :param machine: The machine on which to run pegasus-statistics
-        :type machine: Host | ChameleonDevice
-        :param submit_dir: Directory containing the Pegasus workflow submit information
-        :type submit_dir: str | Path
-        """
-        if isinstance(machine, Host):
-            with utils.actions(roles=machine, run_as=const.KISO_USER) as p:
                 p.shell(
                     f"pegasus-analyzer {submit_dir} >{submit_dir}/analyzer.log",
                     task_name="Analyze workflow",
                 )
         else:
-            self._pegasus_analyzer(machine, Path(submit_dir), user=const.KISO_USER)
-
-    def _pegasus_analyzer(
-        self, container: ChameleonDevice, submit_dir: Path, user: str
-    ) -> CommandResult:
-        """Analyze a Pegasus workflow on a Chameleon device.
-
-        This function analyzes a Pegasus workflow on a Chameleon device using the
-        ChameleonEdge API. The analyzer is commonly run on workflow failures.
-
-        :param container: The Chameleon device to execute the command on
-        :type container: ChameleonDevice
-        :param submit_dir: Directory where the workflow is submitted
-        :type submit_dir: str
-        :param user: User to execute the command as, defaults to None
-        :type user: str, optional
-        :return: CommandResult containing execution status and output
-        :rtype: CommandResult
-        """
-        _submit_dir = shlex.quote(str(submit_dir))
-        cmd = [
-            "pegasus-analyzer",
-            shlex.quote(str(submit_dir)),
-            ">",
-            f"{_submit_dir}/analyzer.log",
-        ]
-        return edge._execute(container, " ".join(cmd), user=user)
+            _submit_dir = shlex.quote(str(submit_dir))
+            edge._execute(
+                machine,
+                f"pegasus-statistics -s all {_submit_dir} ; "
+                f"pegasus-analyzer {_submit_dir} > {_submit_dir}/analyzer.log",
+                user=const.KISO_USER,
+            )
 
     def _fetch_submit_dir(self, instance: int) -> None:
         """Copy output files from remote machines and containers to a local destination.
@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import copy
 import logging
-import tempfile
 from collections import defaultdict
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -79,6 +78,9 @@ class ShellRunner:
         self.poll_interval = const.POLL_INTERVAL
         self.timeout = const.WORKFLOW_TIMEOUT
 
+        # Virtual machines and containers each set of labels resolves to
+        self._split_labels_cache: dict[frozenset[str], tuple[Roles, Roles]] = {}
+
     def check(self, config: Kiso, label_to_machines: Roles) -> None:
         """Validate the shell experiment configuration against the overall Kiso config.
 
@@ -112,32 +114,22 @@ class ShellRunner:
             if experiment.kind != "shell":
                 continue
 
-            for index, script in enumerate(experiment.scripts or []):
-                unlabel_to_machines[experiment.name].update(
-                    [
-                        (f"scripts[{index}]", label)
-                        for label in script.labels
-                        if label not in label_to_machines
-                    ]
-                )
-
-            for index, location in enumerate(experiment.outputs or []):
-                unlabel_to_machines[experiment.name].update(
-                    [
-                        (f"outputs[{index}]", label)
-                        for label in location.labels
-                        if label not in label_to_machines
-                    ]
-                )
-
-            if not unlabel_to_machines[experiment.name]:
-                del unlabel_to_machines[experiment.name]
-        else:
-            if unlabel_to_machines:
-                raise ValueError(
-                    "Undefined labels referenced in experiments section",
-                    unlabel_to_machines,
-                )
+            for section, items in (
+                ("scripts", experiment.scripts),
+                ("outputs", experiment.outputs),
+            ):
+                for index, item in enumerate(items or []):
+                    for label in item.labels:
+                        if label not in label_to_machines:
+                            unlabel_to_machines[experiment.name].add(
+                                (f"{section}[{index}]", label)
+                            )
+
+        if unlabel_to_machines:
+            raise ValueError(
+                "Undefined labels referenced in experiments section",
+                unlabel_to_machines,
+            )
 
     def __call__(
         self, wd: str, remote_wd: str, resultdir: str, labels: Roles, env: Environment
@@ -160,11 +152,73 @@ class ShellRunner:
         self.resultdir = resultdir
         self.labels = labels
         self.env = env
+        self._split_labels_cache.clear()
 
         self._copy_inputs()
         self._run_scripts()
         self._fetch_outputs()
 
+    def copy_inputs(
+        self, wd: str, remote_wd: str, labels: Roles, env: Environment
+    ) -> tuple[Environment, list]:
+        """Copy the inputs of the experiment ahead of running it.
+
+        Inputs that were copied successfully are skipped when the experiment runs.
+        Inputs that failed to copy to any machine are recorded as failed, so they are
+        copied again when the experiment runs.
+
+        :param wd: Local experiment working directory
+        :type wd: str
+        :param remote_wd: Remote working directory on provisioned resources
+        :type remote_wd: str
+        :param labels: All provisioned resources keyed by label
+        :type labels: Roles
+        :param env: EnOSlib task environment used to persist step state
+        :type env: Environment
+        :return: The updated state of the experiment, and the results of each copy,
+            to display with ``show_inputs``
+        :rtype: tuple[Environment, list]
+        """
+        self.wd = wd
+        self.remote_wd = remote_wd
+        self.labels = labels
+        self.env = env
+        self._split_labels_cache.clear()
+
+        self.env.setdefault("copy-input", {})
+        results = []
+        for instance, location in enumerate(self.inputs):
+            result = self._copy_input(instance, location)
+            if any(r.status == const.STATUS_FAILED for r in result):
+                self.env["copy-input"][instance] = const.STATUS_FAILED
+            results.append((instance, location, result))
+
+        return self.env, results
+
+    def show_inputs(self, results: list) -> None:
+        """Display the results of the inputs copied ahead of running the experiment.
+
+        :param results: The results of each copy, returned by ``copy_inputs``
+        :type results: list
+        """
+        console.print(rf"\[{self.name}] Copied inputs to the destination")
+        display.inputs(console, results)
+
+    def _split_labels(self, label_names: list[str]) -> tuple[Roles, Roles]:
+        """Resolve labels into the virtual machines and containers they refer to.
+
+        Inputs, scripts and outputs often reference the same labels, so the result is
+        cached for the duration of a run.
+
+        :param label_names: Names of the labels to resolve
+        :type label_names: list[str]
+        :return: A tuple containing (non-edge VMs, edge containers)
+        :rtype: tuple[Roles, Roles]
+        """
+        return utils.resolve_and_split_labels(
+            self.labels, label_names, self._split_labels_cache
+        )
+
     def _copy_inputs(self) -> None:
         """Copy input files to specified destinations across virtual machines and containers.
 
@@ -205,9 +259,7 @@ class ShellRunner:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, input.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = self._split_labels(input.labels)
         src = Path(input.src)
 
         dst = Path(input.dst)
@@ -223,24 +275,37 @@ class ShellRunner:
                 log.debug("Input file <%s> does not exist, skipping copy", src)
                 return results
             if vms:
+                # Directories are copied with rsync, which runs locally, so only a
+                # single file is copied as the kiso user
+                is_dir = src.is_dir()
                 with utils.actions(
                     roles=vms,
-                    run_as=const.KISO_USER,
+                    run_as=None if is_dir else const.KISO_USER,
                     on_error_continue=True,
                     strategy="free",
                 ) as p:
-                    p.copy(
-                        src=str(src),
-                        dest=str(dst),
-                        mode="preserve",
-                        task_name=f"Copy input file {instance}",
-                    )
+                    if is_dir:
+                        utils.rsync(
+                            p,
+                            src,
+                            dst,
+                            task_name=f"Copy input file {instance}",
+                            mkdir=True,
+                        )
+                    else:
+                        p.copy(
+                            src=str(src),
+                            dest=str(dst),
+                            mode="preserve",
+                            task_name=f"Copy input file {instance}",
+                        )
                 results.extend(p.results)
             if containers:
-                for container in containers:
-                    results.append(
-                        edge.upload(container, src, dst, user=const.KISO_USER)
+                results.extend(
+                    edge.map_containers(
+                        edge.upload, containers, src, dst, user=const.KISO_USER
                     )
+                )
 
         return results
 
@@ -286,24 +351,20 @@ class ShellRunner:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, setup_script.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = self._split_labels(setup_script.labels)
         executable = setup_script.executable
 
         kiso_state_key = "run-script"
-        with (
-            experiment_state(self.env, kiso_state_key, instance) as state,
-            tempfile.NamedTemporaryFile() as script,
-        ):
+        with experiment_state(self.env, kiso_state_key, instance) as state:
             if state.status == const.STATUS_OK:
                 return results
 
-            dst = str(Path(const.TMP_DIR) / Path(script.name).name)
-
-            script.write(f"#!{executable}\n".encode())
-            script.write(setup_script.script.encode())
-            script.seek(0)
+            # The script is built in memory and sent as the content of the copy,
+            # rather than written to a temporary file first
+            script = f"#!{executable}\n{setup_script.script}"
+            dst = str(
+                Path(const.TMP_DIR) / f"kiso-{utils.get_random_string(length=8)}-script"
+            )
 
             if vms:
                 with utils.actions(
@@ -313,22 +374,26 @@ class ShellRunner:
                     strategy="free",
                 ) as p:
                     p.copy(
-                        src=script.name,
+                        content=utils.ansible_raw(script),
                         dest=dst,
-                        mode="preserve",
+                        mode="0700",
                         task_name=f"Copy script {instance}",
                     )
-                    p.shell(f"{executable} {dst}", chdir=self.remote_wd)
-                    p.shell(f"rm -rf {dst}", chdir=self.remote_wd)
+                    p.shell(
+                        f"trap 'rm -f {dst}' EXIT ; {executable} {dst}",
+                        chdir=self.remote_wd,
+                    )
                 results.extend(p.results)
             if containers:
-                for container in containers:
-                    results.append(
-                        edge.run_script(
-                            container,
-                            Path(script.name),
+                with edge.get_staging_dir() as staging_dir:
+                    results.extend(
+                        edge.map_containers(
+                            edge.run_script,
+                            containers,
+                            edge.write_script(script, staging_dir),
                             user=const.KISO_USER,
                             workdir=self.remote_wd,
+                            staging_dir=staging_dir,
                         )
                     )
 
@@ -372,18 +437,14 @@ class ShellRunner:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, output.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = self._split_labels(output.labels)
 
         src = Path(output.src)
         if not src.is_absolute() and output.src[0] != "~":
             src = Path(self.remote_wd) / src
 
         dst = Path(output.dst)
-        if not dst.exists():
-            log.debug("Destination directory <%s> does not exist, creating it", dst)
-            dst.mkdir(parents=True)
+        dst.mkdir(parents=True, exist_ok=True)
 
         kiso_state_key = "fetch-output"
         with experiment_state(self.env, kiso_state_key, instance) as state:
@@ -391,7 +452,9 @@ class ShellRunner:
                 return results
 
             if vms:
-                with utils.actions(roles=vms, run_as=const.KISO_USER) as p:
+                with utils.actions(
+                    roles=vms, run_as=const.KISO_USER, strategy="free"
+                ) as p:
                     p.synchronize(
                         mode="pull",
                         src=str(src),
@@ -401,7 +464,6 @@ class ShellRunner:
                     )
                 results.extend(p.results)
             if containers:
-                for container in containers:
-                    results.append(edge.download(container, src, dst))
+                results.extend(edge.map_containers(edge.download, containers, src, dst))
 
         return results
@@ -4,11 +4,12 @@
 from __future__ import annotations
 
 import inspect
-import json
 import logging
-import shutil
-import subprocess
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import cache
 from ipaddress import IPv4Address, IPv6Address, ip_address
 from pathlib import Path
 from typing import TYPE_CHECKING, Callable
@@ -22,11 +23,29 @@ from kiso.errors import KisoError
 if TYPE_CHECKING:
     from enoslib.infra.enos_chameleonedge.objects import ChameleonDevice
     from enoslib.objects import Host
+    from openstack.connection import Connection
 
 log = logging.getLogger("kiso")
 
+#: Maximum number of nodes associated with a floating IP concurrently
+MAX_FLOATING_IP_WORKERS = 16
+
+#: Guards the lazy listing of unused floating IPs in ``_free_floating_ips``
+_FLOATING_IP_LOCK = threading.Lock()
+
+#: Unused floating IPs, per RC file, listed once per ``associate_floating_ips`` call
+#: and handed out to nodes
+_free_floating_ips: dict[str, deque] = {}
+
+#: Guards the lazy creation of connections in ``_openstack_connections``
+_CONNECTION_LOCK = threading.Lock()
+
+#: OpenStack connections, per RC file, shared by all the nodes of a site
+_openstack_connections: dict[str, Connection] = {}
+
 if hasattr(en, "CBM"):
     log.debug("Chameleon Bare Metal provider is available")
+    import openstack
     from enoslib.infra.enos_openstack.utils import source_credentials_from_rc_file
 if hasattr(en, "Fabric"):
     log.debug("FABRIC provider is available")
@@ -57,15 +76,126 @@ def associate_floating_ip(node: Host | ChameleonDevice) -> IPv4Address | IPv6Add
     return IP_PROVIDER_MAP[kind](node)
 
 
+def associate_floating_ips(
+    nodes: list[Host | ChameleonDevice],
+) -> dict[Host | ChameleonDevice, IPv4Address | IPv6Address]:
+    """Associate floating IP addresses to several nodes.
+
+    Chameleon nodes are handled concurrently in a thread pool. Nodes of other kinds
+    are handled one at a time, as their clients source credentials into
+    ``os.environ`` or modify a shared slice. A failure for one node does not stop
+    the others; all failures are logged and reported together. The unused floating
+    IPs are listed again by each call, as other nodes may have taken them since.
+
+    :param nodes: The nodes to assign a floating IP to
+    :type nodes: list[Host | ChameleonDevice]
+    :return: A mapping of each node to its associated floating IP address
+    :rtype: dict[Host | ChameleonDevice, IPv4Address | IPv6Address]
+    :raises KisoError: If a floating IP could not be associated with any of the nodes
+    """
+    ips = {}
+    errors = {}
+    chameleon_nodes = [node for node in nodes if node.extra["kind"] == "chameleon"]
+    other_nodes = [node for node in nodes if node.extra["kind"] != "chameleon"]
+
+    if chameleon_nodes:
+        # Creating a connection sources the RC file into os.environ, so connections
+        # are created before the threads are started
+        for rc_file in {node.extra["rc_file"] for node in chameleon_nodes}:
+            _get_openstack_connection(rc_file)
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_FLOATING_IP_WORKERS, len(chameleon_nodes))
+            ) as executor:
+                futures = {
+                    executor.submit(associate_floating_ip, node): node
+                    for node in chameleon_nodes
+                }
+                for future in as_completed(futures):
+                    node = futures[future]
+                    error = future.exception()
+                    if error is None:
+                        ips[node] = future.result()
+                    else:
+                        errors[node] = error
+        finally:
+            with _FLOATING_IP_LOCK:
+                _free_floating_ips.clear()
+
+    for node in other_nodes:
+        try:
+            ips[node] = associate_floating_ip(node)
+        except Exception as e:  # noqa: BLE001
+            errors[node] = e
+
+    if errors:
+        for node, error in errors.items():
+            log.error("Failed to associate a floating IP with <%s>: %s", node, error)
+        raise KisoError(
+            f"Failed to associate floating IPs with {len(errors)} node(s)"
+        ) from next(iter(errors.values()))
+
+    return ips
+
+
 def _associate_floating_ip_vagrant(node: Host) -> IPv4Address | IPv6Address:
     """Associate a floating IP address with a Vagrant node."""
     raise KisoError("Assigning public IPs to Vagrant VMs is not supported")
 
 
+def _get_openstack_connection(rc_file: str) -> Connection:
+    """Get an OpenStack connection for the credentials in an RC file.
+
+    The RC file is sourced once, and the connection, which reuses its Keystone token
+    and HTTP session across requests, is cached per RC file. Creating the connection
+    is serialized, as sourcing the RC file modifies ``os.environ``, and so threads
+    associating floating IPs share a single connection.
+
+    :param rc_file: Path to the OpenStack RC file
+    :type rc_file: str
+    :return: A connection to the OpenStack cloud
+    :rtype: Connection
+    """
+    with _CONNECTION_LOCK:
+        if rc_file not in _openstack_connections:
+            with source_credentials_from_rc_file(rc_file):
+                _openstack_connections[rc_file] = openstack.connect(
+                    load_yaml_config=False, load_envvars=True
+                )
+
+        return _openstack_connections[rc_file]
+
+
+def _get_free_floating_ips(rc_file: str) -> deque:
+    """Get the unused floating IPs of the OpenStack project in an RC file.
+
+    The floating IPs are listed once per RC file, until ``associate_floating_ips``
+    returns. Callers pop the IPs they use from the returned queue, so it only holds
+    IPs not yet handed out.
+
+    :param rc_file: Path to the OpenStack RC file
+    :type rc_file: str
+    :return: A queue of unused floating IPs
+    :rtype: deque
+    """
+    with _FLOATING_IP_LOCK:
+        if rc_file not in _free_floating_ips:
+            log.debug("Check for any unused floating ips")
+            conn = _get_openstack_connection(rc_file)
+            _free_floating_ips[rc_file] = deque(
+                floating_ip
+                for floating_ip in conn.network.ips()
+                if floating_ip.fixed_ip_address is None and floating_ip.port_id is None
+            )
+
+        return _free_floating_ips[rc_file]
+
+
 def _associate_floating_ip_chameleon(node: Host) -> IPv4Address | IPv6Address:
     """Associate a floating IP address with a Chameleon node.
 
-    Retrieves or creates a floating IP for a Chameleon node using the OpenStack CLI.
+    Retrieves or creates a floating IP for a Chameleon node using the OpenStack SDK.
     Handles cases where a node may already have a floating IP or requires a new one.
     Logs debug information during the IP association process.
 
@@ -73,92 +203,67 @@ def _associate_floating_ip_chameleon(node: Host) -> IPv4Address | IPv6Address:
     :type node: Host
     :return: The associated floating IP address
     :rtype: IPv4Address | IPv6Address
-    :raises ValueError: If the OpenStack CLI is not found or the server cannot be
-    located
+    :raises ValueError: If the server cannot be located or the floating IP cannot be
+    associated
     """
-    with source_credentials_from_rc_file(node.extra["rc_file"]):
-        ip = None
-        cli = shutil.which("openstack")
-        if cli is None:
-            raise ValueError("Could not locate the openstack client")
-
-        try:
-            cli = str(cli)
-
-            log.debug("Get the Chameleon node's id")
-            # Get the node information so we can extract the server id
-            server = subprocess.run(  # noqa: S603
-                [cli, "server", "show", node.alias, "-f", "json"],
-                capture_output=True,
-                check=True,
-            )
-            _server = json.loads(server.stdout.decode("utf-8"))
-
-            log.debug("Check if the node already has a floating IP")
-            # Determine if the node has a floating IP
-            for _, addresses in _server["addresses"].items():
-                for address in addresses:
-                    if not ip_address(address).is_private:
-                        ip = address
-
-            if ip is None:
-                log.debug("Check for any unused floating ips")
-                # Check for any unused floating ip
-                all_floating_ips = subprocess.run(  # noqa: S603
-                    [cli, "floating", "ip", "list", "-f", "json"],
-                    capture_output=True,
-                    check=True,
-                )
-                _floating_ips = json.loads(all_floating_ips.stdout.decode("utf-8"))
-                for floating_ip in _floating_ips:
-                    # If an unused floating ip is available, use it
-                    if (
-                        floating_ip["Fixed IP Address"] is None
-                        and floating_ip["Port"] is None
-                    ):
-                        _floating_ip = {"name": floating_ip["Floating IP Address"]}
-                        break
-                else:
-                    log.debug("Request a new floating ip")
-                    # Request a new floating ip
-                    floating_ip = subprocess.run(  # noqa: S603
-                        [cli, "floating", "ip", "create", "public", "-f", "json"],
-                        capture_output=True,
-                        check=True,
-                    )
-                    _floating_ip = json.loads(floating_ip.stdout.decode("utf-8"))
-
-                log.debug("Associate the floating ip with the node")
-                # Associate the floating ip with the node
-                _associate_floating_ip = subprocess.run(  # noqa: S603
-                    [
-                        cli,
-                        "server",
-                        "add",
-                        "floating",
-                        "ip",
-                        _server["id"],
-                        _floating_ip["name"],
-                    ],
-                    capture_output=True,
-                    check=True,
-                )
-                ip = _floating_ip["name"]
-                log.debug(
-                    "Floating IP <%s> associated with the node <%s>, status <%d>",
-                    ip,
-                    node.alias,
-                    _associate_floating_ip,
-                )
-
-                floating_ips = node.extra.get("floating-ips", [])
-                floating_ips.append(ip)
-                node.extra["floating-ips"] = floating_ips
-                log.debug("Floating IPs <%s>", floating_ips)
-        except Exception as e:
-            raise ValueError(f"Server <{node.alias}> not found") from e
+    try:
+        conn = _get_openstack_connection(node.extra["rc_file"])
+
+        log.debug("Get the Chameleon node's server")
+        # The server id is kept on the node, so later calls fetch the server directly
+        # instead of searching for it by name
+        server_id = node.extra.get("server_id")
+        if server_id is None:
+            server = conn.compute.find_server(node.alias, ignore_missing=False)
+            node.extra["server_id"] = server.id
+        else:
+            server = conn.compute.get_server(server_id)
+
+        log.debug("Check if the node already has a floating IP")
+        # Determine if the node has a floating IP. The SDK returns the addresses as
+        # dicts, keyed by network, that are used as is
+        ip = next(
+            (
+                address["addr"]
+                for addresses in server.addresses.values()
+                for address in addresses
+                if not ip_address(address["addr"]).is_private
+            ),
+            None,
+        )
+
+        if ip is None:
+            port = next(conn.network.ports(device_id=server.id))
+            free_floating_ips = _get_free_floating_ips(node.extra["rc_file"])
+            try:
+                # If an unused floating ip is available, use it. popleft is atomic, so
+                # each one is handed to a single node
+                floating_ip = free_floating_ips.popleft()
+            except IndexError:
+                log.debug("Request a new floating ip")
+                # Request a new floating ip
+                network = conn.network.find_network("public", ignore_missing=False)
+                floating_ip = conn.network.create_ip(floating_network_id=network.id)
+
+            log.debug("Associate the floating ip with the node")
+            # Associate the floating ip with the node's port
+            try:
+                conn.network.update_ip(floating_ip, port_id=port.id)
+            except Exception:
+                # The floating ip is still unused, so hand it to another node
+                free_floating_ips.appendleft(floating_ip)
+                raise
+            ip = floating_ip.floating_ip_address
+            log.debug("Floating IP <%s> associated with the node <%s>", ip, node.alias)
+
+            floating_ips = node.extra.get("floating-ips", [])
+            floating_ips.append(ip)
+            node.extra["floating-ips"] = floating_ips
+            log.debug("Floating IPs <%s>", floating_ips)
+    except Exception as e:
+        raise ValueError(f"Server <{node.alias}> not found") from e
 
-        return ip_address(ip)
+    return ip_address(ip)
 
 
 def _associate_floating_ip_chameleon_edge(
@@ -196,6 +301,20 @@ def _associate_floating_ip_chameleon_edge(
     return ip_address(ip)
 
 
+@cache
+def _get_fablib_manager(rc_file: str) -> fablib_manager:
+    """Get a FABRIC library manager for the credentials in an RC file.
+
+    The RC file is parsed once, and the manager is cached per RC file.
+
+    :param rc_file: Path to the FABRIC RC file
+    :type rc_file: str
+    :return: A FABRIC library manager
+    :rtype: fablib_manager
+    """
+    return fablib_manager(fabric_rc=rc_file, log_propagate=True)
+
+
 def _associate_floating_ip_fabric(node: Host) -> IPv4Address | IPv6Address:
     """Associate a public IP address with a FABRIC node.
 
@@ -211,7 +330,7 @@ def _associate_floating_ip_fabric(node: Host) -> IPv4Address | IPv6Address:
     :raises ValueError: If an error occurs while assigning the public IP
     """
     try:
-        fablib = fablib_manager(fabric_rc=node.extra["rc_file"], log_propagate=True)
+        fablib = _get_fablib_manager(node.extra["rc_file"])
         fabric_slice = fablib.get_slice(name=node.extra["slice"])
         fabric_node = fabric_slice.get_node(name=node.extra["name"])
         stdout, _stderr = fabric_node.execute("cat /etc/floating-ip")
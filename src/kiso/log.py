@@ -6,7 +6,7 @@ import contextlib
 import logging
 from concurrent.futures import ProcessPoolExecutor
 from logging.handlers import QueueHandler, QueueListener
-from multiprocessing import Manager, get_context
+from multiprocessing import get_context
 from typing import TYPE_CHECKING, Any
 
 import enoslib as en
@@ -15,8 +15,7 @@ from kiso import constants as const
 
 if TYPE_CHECKING:
     from collections.abc import Generator
-    from multiprocessing.managers import SyncManager
-    from queue import Queue
+    from multiprocessing.queues import Queue
 
 
 def init_logging(level: int = logging.INFO, **kwargs: Any) -> None:  # noqa: ANN401
@@ -32,7 +31,7 @@ def init_logging(level: int = logging.INFO, **kwargs: Any) -> None:  # noqa: ANN
     """
     # Initialize basic logging using EnOSlib's init_logging method.
     en.init_logging(level=level, **kwargs)
-    en.set_config(ansible_stdout="noop")
+    en.set_config(ansible_stdout="noop", ansible_forks=const.ANSIBLE_FORKS)
 
     #  Create a logging filter to only include logs from kiso.*, enoslib.infra.*,
     # and fablib.*
@@ -69,8 +68,11 @@ def get_process_pool_executor(
     :yield: Configured ProcessPoolExecutor
     :rtype: Generator[ProcessPoolExecutor, None, None]
     """
-    manager: SyncManager = Manager()
-    queue: Queue = manager.Queue()
+    # A plain multiprocessing queue is handed to the workers when they start, so
+    # unlike a Manager queue it needs no extra server process, and log records
+    # are not proxied through one
+    mp_context = get_context("forkserver")
+    queue: Queue = mp_context.Queue()
 
     root = logging.getLogger()
     if not root.handlers:
@@ -85,13 +87,14 @@ def get_process_pool_executor(
             max_workers=max_workers,
             initializer=_init_worker,
             initargs=(queue, root.level),
-            mp_context=get_context("forkserver"),
+            mp_context=mp_context,
             **kwargs,
         ) as executor:
             yield executor
     finally:
         listener.stop()
-        manager.shutdown()
+        queue.close()
+        queue.join_thread()
 
 
 def _init_worker(queue: Queue, level: int) -> None:
@@ -110,4 +113,4 @@ def _init_worker(queue: Queue, level: int) -> None:
     logger.setLevel(level)
     handler = QueueHandler(queue)
     logger.handlers = [handler]
-    en.set_config(ansible_stdout="noop")
+    en.set_config(ansible_stdout="noop", ansible_forks=const.ANSIBLE_FORKS)
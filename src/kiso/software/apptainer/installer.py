@@ -23,6 +23,12 @@ log = logging.getLogger("kiso.software.apptainer")
 
 console = Console()
 
+#: Ansible playbook that installs Apptainer on virtual machines
+_PLAYBOOK = Path(__file__).parent / "main.yml"
+
+#: Script that installs Apptainer on Chameleon Edge containers
+_SCRIPT = Path(__file__).parent / "apptainer.sh"
+
 
 class ApptainerInstaller:
     """Apptainer software installation."""
@@ -89,29 +95,29 @@ class ApptainerInstaller:
         console.rule("[bold green]Installing Apptainer[/bold green]")
 
         labels = env["labels"]
-        _labels = utils.resolve_labels(labels, self.config.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = utils.resolve_and_split_labels(labels, self.config.labels)
         results = []
 
         if vms:
-            results.extend(
-                utils.run_ansible([Path(__file__).parent / "main.yml"], roles=vms)
-            )
+            results.extend(utils.run_ansible([_PLAYBOOK], roles=vms))
             for node in vms:
                 # To each node we add a flag to identify if Apptainer is installed on
                 # the node
                 node.extra[self.HAS_SOFTWARE_KEY] = True
 
         if containers:
-            for container in containers:
-                results.append(
-                    edge.run_script(
-                        container,
-                        Path(__file__).parent / "apptainer.sh",
+            with edge.get_staging_dir() as staging_dir:
+                results.extend(
+                    edge.map_containers(
+                        edge.run_script,
+                        containers,
+                        edge.stage_script(_SCRIPT, staging_dir),
                         "--no-dry-run",
                         timeout=-1,
+                        staging_dir=staging_dir,
                     )
                 )
+            for container in containers:
                 # To each node we add a flag to identify if Apptainer is installed on
                 # the node
                 container.extra[self.HAS_SOFTWARE_KEY] = True
@@ -23,6 +23,9 @@ log = logging.getLogger("kiso.software.docker")
 
 console = Console()
 
+#: Ansible playbook that installs Docker on virtual machines
+_PLAYBOOK = Path(__file__).parent / "main.yml"
+
 
 class DockerInstaller:
     """Docker software installation."""
@@ -62,20 +65,17 @@ class DockerInstaller:
         :type label_to_machines: Roles
         :raises ValueError: If Docker labels are found on Chameleon Edge devices
         """
-        labels = set(self.config.labels) if self.config.labels else set()
+        labels = self.config.labels
         if not labels:
             return
 
-        machines: set = set()
-        machines.update(_ for label in labels for _ in label_to_machines[label])
-
+        machines = {
+            machine for label in set(labels) for machine in label_to_machines[label]
+        }
         if not machines:
             raise ValueError("No machines found to install Docker")
 
-        docker_edge_machines = machines.intersection(
-            label_to_machines["chameleon-edge"]
-        )
-        if docker_edge_machines:
+        if not machines.isdisjoint(label_to_machines["chameleon-edge"]):
             raise ValueError("Docker cannot be installed on Chameleon Edge devices")
 
     def __call__(self, env: Environment) -> None:
@@ -96,10 +96,9 @@ class DockerInstaller:
         console.rule("[bold green]Installing Docker[/bold green]")
 
         labels = env["labels"]
-        _labels = utils.resolve_labels(labels, self.config.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = utils.resolve_and_split_labels(labels, self.config.labels)
         if vms:
-            results = utils.run_ansible([Path(__file__).parent / "main.yml"], roles=vms)
+            results = utils.run_ansible([_PLAYBOOK], roles=vms)
             for node in vms:
                 # To each node we add a flag to identify if Docker is installed on
                 # the node
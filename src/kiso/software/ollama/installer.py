@@ -23,6 +23,12 @@ log = logging.getLogger("kiso.software.ollama")
 
 console = Console()
 
+#: Ansible playbook that installs Ollama on virtual machines
+_PLAYBOOK = Path(__file__).parent / "main.yml"
+
+#: Script that installs Ollama on Chameleon Edge containers
+_SCRIPT = Path(__file__).parent / "ollama.sh"
+
 
 class OllamaInstaller:
     """Ollama software installation."""
@@ -91,9 +97,11 @@ class OllamaInstaller:
         console.rule("[bold green]Installing Ollama[/bold green]")
         results = []
         labels = env["labels"]
+        split_labels_cache: dict[frozenset[str], tuple[Roles, Roles]] = {}
         for section in self.config:
-            _labels = utils.resolve_labels(labels, section.labels)
-            vms, containers = utils.split_labels(_labels, labels)
+            vms, containers = utils.resolve_and_split_labels(
+                labels, section.labels, split_labels_cache
+            )
             if vms:
                 extra_vars: dict = {
                     "models": section.models,
@@ -103,7 +111,7 @@ class OllamaInstaller:
 
                 results.extend(
                     utils.run_ansible(
-                        [Path(__file__).parent / "main.yml"],
+                        [_PLAYBOOK],
                         roles=vms,
                         extra_vars=extra_vars,
                     )
@@ -114,15 +122,18 @@ class OllamaInstaller:
                     node.extra[self.HAS_SOFTWARE_KEY] = True
 
             if containers:
-                for container in containers:
-                    results.append(
-                        edge.run_script(
-                            container,
-                            Path(__file__).parent / "ollama.sh",
+                with edge.get_staging_dir() as staging_dir:
+                    results.extend(
+                        edge.map_containers(
+                            edge.run_script,
+                            containers,
+                            edge.stage_script(_SCRIPT, staging_dir),
                             "--no-dry-run",
                             timeout=-1,
+                            staging_dir=staging_dir,
                         )
                     )
+                for container in containers:
                     # To each node we add a flag to identify if Ollama is installed on
                     # the node
                     container.extra[self.HAS_SOFTWARE_KEY] = True
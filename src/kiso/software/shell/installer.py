@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-import tempfile
 from pathlib import Path
 from typing import TYPE_CHECKING
 
@@ -88,6 +87,8 @@ class ShellSoftwareInstaller:
 
         self.labels = env["labels"]
         self.env = env
+        # Virtual machines and containers each set of labels resolves to
+        self._split_labels_cache: dict[frozenset[str], tuple[Roles, Roles]] = {}
 
         self._run_scripts()
 
@@ -130,37 +131,37 @@ class ShellSoftwareInstaller:
         :rtype: list[CommandResult | CustomCommandResult]
         """
         results: list[CommandResult | CustomCommandResult] = []
-        labels = self.labels
-        _labels = utils.resolve_labels(labels, setup_script.labels)
-        vms, containers = utils.split_labels(_labels, labels)
+        vms, containers = utils.resolve_and_split_labels(
+            self.labels, setup_script.labels, self._split_labels_cache
+        )
         executable = setup_script.executable
 
         kiso_state_key = "run-script"
-        with (
-            experiment_state(self.env, kiso_state_key, instance) as state,
-            tempfile.NamedTemporaryFile() as script,
-        ):
+        with experiment_state(self.env, kiso_state_key, instance) as state:
             if state.status == const.STATUS_OK:
                 return results
 
-            dst = str(Path(const.TMP_DIR) / Path(script.name).name)
-
-            script.write(f"#!{executable}\n".encode())
-            script.write(setup_script.script.encode())
-            script.seek(0)
+            # The script is built in memory and sent as the content of the copy,
+            # rather than written to a temporary file first
+            script = f"#!{executable}\n{setup_script.script}"
+            dst = str(
+                Path(const.TMP_DIR) / f"kiso-{utils.get_random_string(length=8)}-script"
+            )
 
             if vms:
                 with utils.actions(
                     roles=vms, run_as=const.KISO_USER, strategy="free"
                 ) as p:
                     p.copy(
-                        src=script.name,
+                        content=utils.ansible_raw(script),
                         dest=dst,
-                        mode="preserve",
+                        mode="0700",
                         task_name=f"Copy script {instance}",
                     )
-                    p.shell(f"{executable} {dst}", chdir=const.TMP_DIR)
-                    p.shell(f"rm -rf {dst}", chdir=const.TMP_DIR)
+                    p.shell(
+                        f"trap 'rm -f {dst}' EXIT ; {executable} {dst}",
+                        chdir=const.TMP_DIR,
+                    )
                 results.extend(p.results)
 
                 for node in vms:
@@ -169,10 +170,17 @@ class ShellSoftwareInstaller:
                     node.extra[self.HAS_SOFTWARE_KEY] = True
 
             if containers:
-                for container in containers:
-                    results.append(
-                        edge.run_script(container, Path(script.name), timeout=-1)
+                with edge.get_staging_dir() as staging_dir:
+                    results.extend(
+                        edge.map_containers(
+                            edge.run_script,
+                            containers,
+                            edge.write_script(script, staging_dir),
+                            timeout=-1,
+                            staging_dir=staging_dir,
+                        )
                     )
+                for container in containers:
                     # To each node we add a flag to identify if Ollama is installed on
                     # the node
                     container.extra[self.HAS_SOFTWARE_KEY] = True
@@ -6,18 +6,18 @@ from __future__ import annotations
 import contextlib
 import copy
 import io
+import itertools
 import logging
 import os
 import re
 import shutil
-import tempfile
 from collections import Counter, defaultdict
-from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import fields
 from datetime import datetime, timezone
-from functools import wraps
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Callable, TypeVar
+from typing import TYPE_CHECKING, Any, Callable, TypeVar, overload
 
 import enoslib as en
 import yaml
@@ -38,6 +38,7 @@ from kiso.schema import SCHEMA
 from kiso.version import __version__
 
 if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future, ProcessPoolExecutor
     from os import PathLike
 
     from enoslib.infra.provider import Provider
@@ -53,6 +54,24 @@ log = logging.getLogger("kiso")
 
 console = Console()
 
+#: Matches the ``OS_REGION_NAME`` assignment in an OpenStack RC file.
+_RC_REGION_RE = re.compile(
+    r"""^\s*(?:export\s+)?OS_REGION_NAME\s*=\s*["']?([^"'\n]+)""", re.MULTILINE
+)
+
+#: Validator for the experiment configuration. It is built once, so the references
+#: resolved, and cached, by its resolver are reused across validations.
+_VALIDATOR = validator_for(SCHEMA)(SCHEMA, resolver=RefResolver.from_schema(SCHEMA))
+
+#: Site kinds whose provider sources an RC file into ``os.environ``, so they are
+#: initialized in separate processes rather than threads.
+_PROCESS_ISOLATED_KINDS = frozenset({"chameleon", "chameleon-edge", "fabric"})
+
+#: Ansible playbook and script that install the packages Kiso needs on virtual
+#: machines and Chameleon Edge containers respectively
+_COMMONS_PLAYBOOK = Path(__file__).parent / "commons/main.yml"
+_COMMONS_SH = Path(__file__).parent / "commons/init.sh"
+
 if hasattr(en, "Vagrant"):
     log.debug("Vagrant provider is available")
     PROVIDER_MAP["vagrant"] = (en.VagrantConf.from_dictionary, en.Vagrant)
@@ -73,20 +92,44 @@ if hasattr(en, "Fabric"):
     PROVIDER_MAP["fabric"] = (en.FabricConf.from_dictionary, en.Fabric)
 
 
-def validate_config(func: Callable[..., T]) -> Callable[..., T]:
+@overload
+def validate_config(
+    func: Callable[..., T], *, verbose: bool = ...
+) -> Callable[..., T]: ...
+
+
+@overload
+def validate_config(
+    func: None = None, *, verbose: bool = ...
+) -> Callable[[Callable[..., T]], Callable[..., T]]: ...
+
+
+def validate_config(
+    func: Callable[..., T] | None = None, *, verbose: bool = True
+) -> Callable[..., T] | Callable[[Callable[..., T]], Callable[..., T]]:
     """Decorator to validate the experiment configuration against a predefined schema.
 
     Validates the experiment configuration by checking it against the Kiso experiment
     configuration schema. Supports configuration passed as a dictionary or a file path.
+    Can be used as ``@validate_config`` or ``@validate_config(verbose=False)``.
 
     :param func: The function to be decorated, which will receive the experiment
     configuration
-    :type func: Callable[..., T]
+    :type func: Callable[..., T] | None, optional
+    :param verbose: Report all schema errors, if False stop at the first one, defaults
+    to True
+    :type verbose: bool, optional
     :return: A wrapped function that validates the configuration before executing the
-    original function
-    :rtype: Callable[..., T]
+    original function, or a decorator returning one if ``func`` is not given
+    :rtype: Callable[..., T] | Callable[[Callable[..., T]], Callable[..., T]]
     :raises ValidationError: if the configuration is invalid
     """
+    if func is None:
+
+        def decorator(func: Callable[..., T]) -> Callable[..., T]:
+            return validate_config(func, verbose=verbose)
+
+        return decorator
 
     @wraps(func)
     def wrapper(experiment_config: PathLike | dict, *args: Any, **kwargs: Any) -> T:  # noqa: ANN401
@@ -100,16 +143,20 @@ def validate_config(func: Callable[..., T]) -> Callable[..., T]:
                 config = yaml.safe_load(_experiment_config)
 
         try:
-            validator_cls = validator_for(SCHEMA)
-            validator = validator_cls(SCHEMA, resolver=RefResolver.from_schema(SCHEMA))
-            errors = []
-            for error in validator.iter_errors(
-                _replace_labels_key_with_roles_key(config)
-            ):
+            errors = _VALIDATOR.iter_errors(_replace_labels_key_with_roles_key(config))
+            if verbose:
+                errors = list(errors)
+                message = "JSON Schema Validation Error"
+            else:
+                errors = list(itertools.islice(errors, 1))
+                message = (
+                    "JSON Schema Validation Error. Suggestion: Run `kiso check` to "
+                    "list all the errors."
+                )
+            for error in errors:
                 log.error(error)
-                errors.append(error)
             if errors:
-                raise ValidationError("JSON Schema Validation Error", errors)
+                raise ValidationError(message, errors)
 
             # Convert the JSON configuration to a :py:class:`dataclasses.dataclass`
             kiso_config = from_dict(Kiso, config)
@@ -331,7 +378,7 @@ def _check_experiments(
         runner.check(experiment_config, label_to_machines)
 
 
-@validate_config
+@validate_config(verbose=False)
 @enostask(new=True, symlink=False)
 def up(
     experiment_config: Kiso,
@@ -368,13 +415,13 @@ def up(
     _show_rysnc_warning(experiment_config.sites)
 
 
-def _init_sites(
+def _init_sites(  # noqa: C901
     experiment_config: Kiso, env: Environment, force: bool = False
 ) -> tuple[list[Provider], Roles, Networks]:
     """Initialize sites for an experiment.
 
-    Initializes and configures sites from the experiment configuration using parallel
-    processing.
+    Initializes and configures sites from the experiment configuration in parallel,
+    using threads, or processes for sites listed in ``_PROCESS_ISOLATED_KINDS``.
     Performs the following key tasks:
     - Initializes providers for each site concurrently
     - Aggregates labels and networks from initialized sites
@@ -397,22 +444,49 @@ def _init_sites(
     networks = Networks()
     errors = {}
 
-    with get_process_pool_executor() as executor:
-        futures_to_site = {
-            executor.submit(_init_site, site_index, site, force): (site_index, site)
-            for site_index, site in enumerate(experiment_config.sites)
-        }
+    sites = list(enumerate(experiment_config.sites))
+    with contextlib.ExitStack() as stack:
+        # Provider initialization is network bound, so threads are enough, except for
+        # providers that source an RC file into the process wide os.environ
+        thread_executor = stack.enter_context(
+            ThreadPoolExecutor(max_workers=max(len(sites), 1))
+        )
+        process_executor: ProcessPoolExecutor | None = None
+
+        futures_to_site = {}
+        for site_index, site in sites:
+            executor: Executor = thread_executor
+            if site["kind"] in _PROCESS_ISOLATED_KINDS:
+                # The process pool is only started if a site needs it
+                if process_executor is None:
+                    process_executor = stack.enter_context(get_process_pool_executor())
+                executor = process_executor
 
+            future = executor.submit(_init_site, site_index, site, force)
+            futures_to_site[future] = (site_index, site)
+
+        results = {}
         for future in as_completed(futures_to_site):
+            if future.cancelled():
+                continue
+
             site_index, _site = futures_to_site[future]
             try:
-                provider, _labels, _networks = future.result()
-
-                providers.append(provider)
-                labels.extend(_labels)
-                networks.extend(_networks)
+                results[site_index] = future.result()
             except Exception as e:
                 errors[site_index] = e
+                # Do not provision sites that have not started yet, the experiment
+                # cannot go ahead anyway
+                for pending in futures_to_site:
+                    pending.cancel()
+
+    # Sites that were initialized are still saved, so they can be destroyed by down.
+    # They are aggregated in configuration order, not completion order
+    for site_index in sorted(results):
+        provider, _labels, _networks = results[site_index]
+        providers.append(provider)
+        labels.extend(_labels)
+        networks.extend(_networks)
 
     providers = en.Providers(providers)
     env["providers"] = providers
@@ -428,10 +502,9 @@ def _init_sites(
     env.dump()
 
     for node in labels.all():
-        preferred_ip, priority = None, 1000
-        addresses = utils.get_ips(node)
-        if addresses:
-            preferred_ip, priority = addresses[0]
+        address = utils.get_preferred_ip(node)
+        if address:
+            preferred_ip, priority = address
             log.debug("Preferred IP <%s> with priority <%d>", preferred_ip, priority)
             node.extra["kiso_preferred_ip"] = str(preferred_ip)
             node.extra["is_kiso_preferred_ip_private"] = priority > 1
@@ -481,27 +554,36 @@ def _init_site(
 
     _labels, _networks = provider.init(force_deploy=force)
     _deduplicate_hosts(_labels)
-    _labels[kind] = _labels.all()
-    _networks[kind] = _networks.all()
+    # Only the configurations of providers that use an OpenStack RC file have one
+    rc_file = getattr(conf, "rc_file", None)
+    rc_file = str(Path(rc_file).expanduser().resolve()) if rc_file else None
+    nodes = _labels.all()
+    networks = _networks.all()
+    _labels[kind] = nodes
+    _networks[kind] = networks
 
     # For Chameleon site, the region name is important as each region will act like
     # a different site
     region_name = kind
     if kind.startswith("chameleon"):
-        region_name = _get_region_name(site["rc_file"])
-        _labels[region_name] = _labels.all()
-        _networks[region_name] = _networks.all()
+        region_name = _get_region_name(rc_file)
+        # Assigning a list creates a new view, so the two labels do not share a set
+        _labels[region_name] = list(nodes)
+        _networks[region_name] = list(networks)
 
     # To each node we add a tag to identify what site/region it was provisioned on
-    for node in _labels.all():
+    for node in nodes:
         # ChameleonDevice object does not have an attribute named extra
         if kind == "chameleon-edge":
             attr = "extra"
             setattr(node, attr, {})
-        elif kind == "chameleon" or kind == "fabric":
-            # Used to copy this file to Chameleon VMs, so we can use the Openstack
-            # client to get a floating IP
-            node.extra["rc_file"] = str(Path(conf.rc_file).resolve())
+        else:
+            # Reuse one SSH connection per node for all the Ansible tasks run on it
+            node.extra.setdefault("ansible_ssh_args", const.SSH_ARGS)
+            if rc_file:
+                # Used to copy this file to Chameleon VMs, so we can use the Openstack
+                # client to get a floating IP
+                node.extra["rc_file"] = rc_file
 
         node.extra["kind"] = kind
         node.extra.setdefault("site", region_name)
@@ -511,7 +593,8 @@ def _init_site(
     if kind != "chameleon-edge":
         _labels = en.sync_info(_labels, _networks)
     else:
-        # Because zunclient.v1.containers.Container is not pickleable
+        # Because zunclient.v1.containers.Container is not pickleable, and providers
+        # are pickled when the environment is saved
         provider.client.concrete_resources = []
 
     return provider, _labels, _networks
@@ -528,44 +611,38 @@ def _deduplicate_hosts(labels: Roles) -> None:
     :param labels: Label-to-host mapping to deduplicate in place
     :type labels: Roles
     """
-    dedup = {}
-    for _, nodes in labels.items():
-        update = set()
-        for node in nodes:
-            if node not in dedup:
-                dedup[node] = node
-            else:
-                update.add(dedup[node])
-
-        for node in update:
-            nodes.remove(node)
-
-        nodes.extend(update)
-
-
-def _get_region_name(rc_file: str) -> str | None:
+    canonical: dict[Host, Host] = {}
+    for nodes in labels.values():
+        duplicates = [
+            node for node in nodes if canonical.setdefault(node, node) is not node
+        ]
+        if duplicates:
+            # Adding an equal object to a set keeps the existing one, so the
+            # duplicates are removed before adding the canonical instances
+            nodes -= duplicates
+            nodes.extend(canonical[node] for node in duplicates)
+
+
+@lru_cache(maxsize=32)
+def _get_region_name(rc_file: str) -> str:
     """Extract the OpenStack region name from a given RC file.
 
     Parses the provided RC file to find the OS_REGION_NAME environment variable
     and returns its value. Raises a ValueError if the region name cannot be found.
+    Results are cached by path, so callers should pass the resolved path.
 
-    :param rc_file: Path to the OpenStack RC file containing environment variables
+    :param rc_file: Resolved path to the OpenStack RC file containing environment
+        variables
     :type rc_file: str
     :raises ValueError: If OS_REGION_NAME is not found in the RC file
     :return: The name of the OpenStack region
-    :rtype: str | None
+    :rtype: str
     """
-    region_name = None
-    with Path(rc_file).open() as env_file:
-        for env_var in env_file:
-            if "OS_REGION_NAME" in env_var:
-                parts = env_var.split("=")
-                region_name = parts[1].strip("\n\"'")
-                break
-        else:
-            raise ValueError(f"Unable to get region name from the rc_file <{rc_file}>")
+    match = _RC_REGION_RE.search(Path(rc_file).read_text())
+    if match is None:
+        raise ValueError(f"Unable to get region name from the rc_file <{rc_file}>")
 
-    return region_name
+    return match.group(1).strip()
 
 
 def _extend_labels(labels: Roles) -> None:
@@ -641,22 +718,24 @@ def _install_commons(env: Environment) -> None:
     if vms:
         results.extend(
             utils.run_ansible(
-                [Path(__file__).parent / "commons/main.yml"],
+                [_COMMONS_PLAYBOOK],
                 roles=vms,
                 extra_vars={"etc_hosts_content": etc_hosts_content},
             )
         )
 
     if containers:
-        for container in containers:
-            results.append(
-                edge.run_script(
-                    container,
-                    Path(__file__).parent / "commons/init.sh",
+        with edge.get_staging_dir() as staging_dir:
+            results.extend(
+                edge.map_containers(
+                    edge.run_script,
+                    containers,
+                    edge.stage_script(_COMMONS_SH, staging_dir),
                     "--hosts",
                     etc_hosts_content,
                     "--no-dry-run",
                     timeout=-1,
+                    staging_dir=staging_dir,
                 )
             )
 
@@ -731,12 +810,13 @@ def _install_deployed_software(experiment_config: Kiso, env: Environment) -> Non
         obj(env)
 
 
-@validate_config
+@validate_config(verbose=False)
 @enostask()
 @check_provisioned
 def run(
     experiment_config: Kiso,
     force: bool = False,
+    copy_inputs_ahead: bool = False,
     env: Environment = None,
     **kwargs: Any,  # noqa: ANN401
 ) -> None:
@@ -744,12 +824,16 @@ def run(
 
     Executes a series of experiments by performing the following steps:
     - Copies experiment directory to remote labels
-    - Executes experiment
+    - Executes experiment, optionally while copying the inputs of the next experiment
 
     :param experiment_config: Configuration dictionary containing experiment details
     :type experiment_config: Kiso
     :param force: Force rerunning of experiments, defaults to False
     :type force: bool, optional
+    :param copy_inputs_ahead: Copy the inputs of the next experiment while an
+        experiment runs. The setup and post scripts of an experiment must not remove
+        the inputs of the next one, defaults to False
+    :type copy_inputs_ahead: bool, optional
     :param env: Environment configuration containing providers, labels, and networks
     :type env: Environment, optional
     :param kwargs: Additional keyword arguments
@@ -765,9 +849,144 @@ def run(
         env["experiments"] = {}
 
     _copy_experiment_dir(env)
-    for experiment_index, experiment in enumerate(experiments):
-        env["experiments"].setdefault(experiment_index, {})
-        _run_experiments(experiment_index, experiment, variables, env)
+    with contextlib.ExitStack() as stack:
+        # While an experiment runs, the inputs of the next experiment are copied in a
+        # separate process, as Ansible can't run two plays at once in one process
+        executor = None
+        if copy_inputs_ahead and any(
+            map(_can_copy_inputs_ahead, experiments, experiments[1:])
+        ):
+            executor = stack.enter_context(get_process_pool_executor(max_workers=1))
+
+        copy_ahead = None
+        for experiment_index, experiment in enumerate(experiments):
+            if copy_ahead is not None:
+                _wait_for_inputs(
+                    experiment_index, experiment, variables, copy_ahead, env
+                )
+
+            env["experiments"].setdefault(experiment_index, {})
+            copy_ahead = None
+            next_index = experiment_index + 1
+            if executor and next_index < len(experiments):
+                next_experiment = experiments[next_index]
+                if _can_copy_inputs_ahead(experiment, next_experiment):
+                    copy_ahead = executor.submit(
+                        _copy_inputs,
+                        next_index,
+                        next_experiment,
+                        variables,
+                        env["wd"],
+                        env["remote_wd"],
+                        env["labels"],
+                        env["experiments"].setdefault(next_index, {}),
+                    )
+
+            _run_experiments(experiment_index, experiment, variables, env)
+
+
+def _can_copy_inputs_ahead(
+    experiment: ExperimentTypes, next_experiment: ExperimentTypes
+) -> bool:
+    """Check if the inputs of an experiment can be copied while the previous one runs.
+
+    Inputs are not copied ahead of time when one of them would overwrite a different
+    input of the running experiment.
+
+    :param experiment: Configuration of the running experiment
+    :type experiment: ExperimentTypes
+    :param next_experiment: Configuration of the next experiment
+    :type next_experiment: ExperimentTypes
+    :return: True if the inputs of the next experiment can be copied ahead of time
+    :rtype: bool
+    """
+    if not next_experiment.inputs:
+        return False
+
+    targets = {
+        (location.dst, Path(location.src).name): location.src
+        for location in experiment.inputs or []
+    }
+    return all(
+        targets.get((location.dst, Path(location.src).name), location.src)
+        == location.src
+        for location in next_experiment.inputs
+    )
+
+
+def _copy_inputs(
+    index: int,
+    experiment: ExperimentTypes,
+    variables: dict,
+    wd: str,
+    remote_wd: str,
+    labels: Roles,
+    state: dict,
+) -> tuple[dict, list]:
+    """Copy the inputs of an experiment ahead of running it.
+
+    Runs in a separate process while the previous experiment runs, so its console
+    output is discarded to not garble the progress of the running experiment. The
+    results of the copies are returned instead, and displayed by the parent.
+
+    :param index: The overall experiment index
+    :type index: int
+    :param experiment: Configuration of the experiment
+    :type experiment: ExperimentTypes
+    :param variables: Variables defined globally for the experiment
+    :type variables: dict
+    :param wd: Local experiment working directory
+    :type wd: str
+    :param remote_wd: Remote experiment working directory
+    :type remote_wd: str
+    :param labels: Provisioned resources
+    :type labels: Roles
+    :param state: State of the experiment
+    :type state: dict
+    :return: The updated state of the experiment, and the results of the copies
+    :rtype: tuple[dict, list]
+    """
+    runner = utils.get_runner(experiment.kind)(experiment, index, variables=variables)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return runner.copy_inputs(wd, remote_wd, labels, state)
+
+
+def _wait_for_inputs(
+    index: int,
+    experiment: ExperimentTypes,
+    variables: dict,
+    copy_ahead: Future,
+    env: Environment,
+) -> None:
+    """Wait for the inputs of an experiment copied ahead of time, and record them.
+
+    If the inputs could not be copied ahead of time, they are copied when the
+    experiment runs.
+
+    :param index: The overall experiment index
+    :type index: int
+    :param experiment: Configuration of the experiment
+    :type experiment: ExperimentTypes
+    :param variables: Variables defined globally for the experiment
+    :type variables: dict
+    :param copy_ahead: The copy of the inputs running in a separate process
+    :type copy_ahead: Future
+    :param env: Environment context containing the state of the experiments
+    :type env: Environment
+    """
+    try:
+        state, results = copy_ahead.result()
+    except Exception:
+        log.warning(
+            "Copying inputs of experiment <%d> ahead of time failed",
+            index,
+            exc_info=True,
+        )
+        return
+
+    env["experiments"][index] = state
+    runner = utils.get_runner(experiment.kind)(experiment, index, variables=variables)
+    runner.show_inputs(results)
 
 
 def _copy_experiment_dir(env: Environment) -> None:
@@ -800,38 +1019,9 @@ def _copy_experiment_dir(env: Environment) -> None:
         dst = Path(env["remote_wd"]).parent
         if vms:
             with utils.actions(roles=vms, strategy="free") as p:
-                # macOS's rsync does not work as expected when the host
-                # has an IPv6 address and a gateway host is used in between. So we
-                # create a temp SSH config file with the Host and HostName directives
-                # and use it to run rsync
-                tmpfile = tempfile.NamedTemporaryFile(delete=False)  # noqa: SIM115
-                p.copy(
-                    dest=f"{tmpfile.name}-{{{{ansible_host}}}}",
-                    content="""
-Host pegasusvm
-    HostName {{ansible_host}}
-""",
-                    delegate_to="localhost",
-                )
-                p.shell(
-                    f"rsync -auzv -e 'ssh -F {tmpfile.name}-{{{{ansible_host}}}} "
-                    "{{ansible_ssh_common_args}} "
-                    "{% if ansible_port is defined %}-p {{ansible_port}} "
-                    "{% endif %}{% if ansible_ssh_private_key_file is defined %}-i "
-                    "{{ansible_ssh_private_key_file}}{% endif %}' "
-                    f"{src} kiso@pegasusvm:{dst}",
-                    delegate_to="localhost",
-                    task_name="Copy experiment dir",
-                )
-                p.file(
-                    path=f"{tmpfile.name}-{{{{ansible_host}}}}",
-                    state="absent",
-                    delegate_to="localhost",
-                )
-                tmpfile.close()
+                utils.rsync(p, src, dst, task_name="Copy experiment dir")
         if containers:
-            for container in containers:
-                edge.upload(container, src, dst, user=const.KISO_USER)
+            edge.map_containers(edge.upload, containers, src, dst, user=const.KISO_USER)
     except Exception:
         kiso_state["copy-experiment-directory"] = const.STATUS_FAILED
         raise
@@ -877,7 +1067,7 @@ def _run_experiments(
     )
 
 
-@validate_config
+@validate_config(verbose=False)
 @enostask()
 @check_provisioned
 def down(experiment_config: Kiso, env: Environment = None, **kwargs: dict) -> None:  # noqa: C901
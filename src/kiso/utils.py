@@ -4,9 +4,11 @@ from __future__ import annotations
 
 import logging
 import secrets
+import shlex
 import string
+import tempfile
 from contextlib import ContextDecorator, suppress
-from functools import partial, reduce
+from functools import lru_cache, partial
 from importlib.metadata import EntryPoint, entry_points
 from ipaddress import (
     IPv4Address,
@@ -16,16 +18,18 @@ from ipaddress import (
     ip_address,
     ip_network,
 )
+from operator import itemgetter
 from pathlib import Path
 from typing import TYPE_CHECKING
 
 import enoslib as en
-from enoslib.objects import DefaultNetwork, Host, Roles
+from enoslib.objects import DefaultNetwork, Host, HostsView, Roles
 from enoslib.task import Environment
 
 from kiso import constants as const
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
     from types import TracebackType
 
     from enoslib.infra.enos_chameleonedge.objects import ChameleonDevice
@@ -48,6 +52,14 @@ undefined = type("undefined", (), {})
 #: https://en.wikipedia.org/wiki/IPv4_shared_address_space
 IPV4_SHARED_ADDRESS_SPACE = ip_network("100.64.0.0/10")
 
+#: Characters used by :func:`get_random_string`
+_ALPHANUM = (string.ascii_letters + string.digits).encode()
+
+#: Translation table mapping each random byte to one of the characters, and the bytes
+#: to drop because they would make some characters more likely than others
+_ALPHANUM_TABLE = bytes(_ALPHANUM[b % len(_ALPHANUM)] for b in range(256))
+_ALPHANUM_BIASED = bytes(range(256 - 256 % len(_ALPHANUM), 256))
+
 
 if hasattr(en, "Fabric"):
     from enoslib.infra.enos_fabric.configuration import Fabnetv6NetworkConfiguration
@@ -73,20 +85,12 @@ def resolve_labels(labels: Roles, label_names: list[str]) -> Roles:
     if not label_names:
         return labels
 
-    return (
-        labels[label_names[0]]
-        if len(label_names) == 1
-        else reduce(
-            lambda a, b: (
-                labels[a] | labels[b]
-                if isinstance(a, str)
-                else a | labels[b]
-                if isinstance(b, str)
-                else b
-            ),
-            label_names,
-        )
-    )
+    if len(label_names) == 1:
+        return labels[label_names[0]]
+
+    # Union all the labels in one pass, instead of copying the growing union once
+    # per label
+    return HostsView(set().union(*(labels[name] for name in label_names)))
 
 
 def get_pool_passwd_file() -> str:
@@ -128,8 +132,26 @@ def get_random_string(length: int = 64) -> str:
     if length <= 0:
         raise ValueError("Length must be a positive integer")
 
-    chars = string.ascii_letters + string.digits
-    return "".join(secrets.choice(chars) for _ in range(length))
+    result = b""
+    while len(result) < length:
+        result += secrets.token_bytes(length).translate(
+            _ALPHANUM_TABLE, _ALPHANUM_BIASED
+        )
+    return result[:length].decode()
+
+
+def ansible_raw(text: str) -> str:
+    """Protect text passed to an Ansible module from being templated.
+
+    Ansible templates module arguments, so a script passed as the copy module's
+    ``content`` would have any ``{{ }}`` or ``{% %}`` in it interpreted by Jinja.
+
+    :param text: Text to pass to the module as is
+    :type text: str
+    :return: Text wrapped in a Jinja raw block
+    :rtype: str
+    """
+    return f"{{% raw %}}{text}{{% endraw %}}"
 
 
 def split_labels(split: Roles, labels: Roles) -> tuple[Roles, Roles]:
@@ -145,12 +167,123 @@ def split_labels(split: Roles, labels: Roles) -> tuple[Roles, Roles]:
     :return: A tuple containing (non-edge VMs, edge containers)
     :rtype: tuple[Roles, Roles]
     """
-    vms = split - labels["chameleon-edge"]
-    containers = split & labels["chameleon-edge"]
+    edges = labels["chameleon-edge"]
+    # Without any edge containers, which is the common case, every machine is a
+    # virtual machine, so the labels are not copied by the set operations
+    if not edges:
+        return split, HostsView()
+
+    vms = split - edges
+    containers = split & edges
 
     return vms, containers
 
 
+def resolve_and_split_labels(
+    labels: Roles,
+    label_names: list[str],
+    cache: dict[frozenset[str], tuple[Roles, Roles]] | None = None,
+) -> tuple[Roles, Roles]:
+    """Resolve label names and split them into virtual machines and containers.
+
+    Configuration sections often reference the same labels, so callers running many
+    sections can pass a cache, keyed by the label names regardless of their order.
+    The cache must not outlive ``labels``.
+
+    :param labels: Collection of labels to resolve from
+    :type labels: Roles
+    :param label_names: List of label names to filter or combine
+    :type label_names: list[str]
+    :param cache: Results of earlier calls with the same labels, defaults to None
+    :type cache: dict[frozenset[str], tuple[Roles, Roles]] | None, optional
+    :return: A tuple containing (non-edge VMs, edge containers)
+    :rtype: tuple[Roles, Roles]
+    """
+    if cache is None:
+        return split_labels(resolve_labels(labels, label_names), labels)
+
+    key = frozenset(label_names)
+    if key not in cache:
+        cache[key] = split_labels(resolve_labels(labels, label_names), labels)
+
+    return cache[key]
+
+
+def _quote_path(path: Path | str) -> str:
+    """Quote a path for a shell, leaving a leading ``~`` for the shell to expand.
+
+    :param path: Path to quote
+    :type path: Path | str
+    :return: The quoted path
+    :rtype: str
+    """
+    path = str(path)
+    if path.startswith("~/"):
+        return f"~/{shlex.quote(path[2:])}"
+
+    return "~" if path == "~" else shlex.quote(path)
+
+
+def rsync(
+    p: en.actions,
+    src: Path | str,
+    dst: Path | str,
+    task_name: str | None = None,
+    mkdir: bool = False,
+) -> None:
+    """Add tasks to rsync a local file or directory to the virtual machines.
+
+    Ansible's copy module checksums and transfers one file at a time, which is slow
+    for large directories, so the transfer is delegated to a local rsync instead. The
+    tasks must be added to actions that do not run as another user, since they run on
+    the local machine.
+
+    :param p: Actions to add the tasks to
+    :type p: en.actions
+    :param src: Local file or directory to copy
+    :type src: Path | str
+    :param dst: Destination directory on the virtual machines
+    :type dst: Path | str
+    :param task_name: Name of the rsync task, defaults to None
+    :type task_name: str | None, optional
+    :param mkdir: Create the destination directory, and its parents, if it does not
+        exist, defaults to False
+    :type mkdir: bool, optional
+    """
+    # macOS's rsync does not work as expected when the host has an IPv6 address and
+    # a gateway host is used in between. So we create a temp SSH config file with the
+    # Host and HostName directives and use it to run rsync
+    ssh_config = (
+        f"{Path(tempfile.gettempdir()) / f'kiso-ssh-{get_random_string(8)}'}"
+        "-{{ansible_host}}"
+    )
+    remote_dst = _quote_path(dst)
+    rsync_path = (
+        f"--rsync-path={shlex.quote(f'mkdir -p {remote_dst} && rsync')} "
+        if mkdir
+        else ""
+    )
+    p.copy(
+        dest=ssh_config,
+        content="""
+Host pegasusvm
+    HostName {{ansible_host}}
+""",
+        delegate_to="localhost",
+    )
+    p.shell(
+        f"rsync -auzv {rsync_path}-e 'ssh -F {ssh_config} "
+        "{{ansible_ssh_common_args}} "
+        "{% if ansible_port is defined %}-p {{ansible_port}} "
+        "{% endif %}{% if ansible_ssh_private_key_file is defined %}-i "
+        "{{ansible_ssh_private_key_file}}{% endif %}' "
+        f"{shlex.quote(str(src))} {const.KISO_USER}@pegasusvm:{remote_dst}",
+        delegate_to="localhost",
+        task_name=task_name,
+    )
+    p.file(path=ssh_config, state="absent", delegate_to="localhost")
+
+
 def get_runner(kind: str) -> EntryPoint:
     """Retrieve and load a workflow runner class by its kind.
 
@@ -255,7 +388,39 @@ def get_ips(
     :rtype: list[tuple[IPv4Address | IPv6Address, int]]
     :raises ValueError: If a public IP is required but not available
     """
-    addresses = []
+    addresses = sorted(_iter_ips(machine), key=itemgetter(1))
+    log.debug("Addresses <%s>", addresses)
+
+    return addresses
+
+
+def get_preferred_ip(
+    machine: Host | ChameleonDevice,
+) -> tuple[IPv4Address | IPv6Address, int] | None:
+    """Get the highest priority IP address for a given machine.
+
+    Same as the first entry returned by :func:`get_ips`, but found in a single pass
+    over the addresses without sorting them.
+
+    :param machine: The machine to get an IP address for
+    :type machine: Host | ChameleonDevice
+    :return: Tuple of the IP address and it's priority, or None if the machine has
+        no usable IP address
+    :rtype: tuple[IPv4Address | IPv6Address, int] | None
+    """
+    return min(_iter_ips(machine), key=itemgetter(1), default=None)
+
+
+def _iter_ips(
+    machine: Host | ChameleonDevice,
+) -> Iterator[tuple[IPv4Address | IPv6Address, int]]:
+    """Iterate over the usable IP addresses of a machine and their priorities.
+
+    :param machine: The machine to get the IP addresses for
+    :type machine: Host | ChameleonDevice
+    :yield: Tuples of an IP address and it's priority, see :func:`get_ips`
+    :rtype: Iterator[tuple[IPv4Address | IPv6Address, int]]
+    """
     # Vagrant Host
     # net_devices={
     #   NetDevice(
@@ -333,65 +498,52 @@ def get_ips(
                     address.ip, (IPv4Interface, IPv6Interface)
                 ):
                     ip = address.ip.ip
-                    if (
-                        ip.is_multicast
-                        or ip.is_reserved
-                        or ip.is_loopback
-                        or ip.is_link_local
-                    ):
+                    is_special, priority = _classify_ip(ip)
+                    if is_special:
                         continue
 
                     # FABRIC uses the same IPRange (2602:FCFB::/36) for both IPv6
                     # and IPv6External networks, so we check if the IPv6 address
                     # assigned by FABRIC is public or private.
-                    is_private = (
-                        ip.is_private
-                        or (
-                            has_fabric
-                            and isinstance(
-                                address.network.config, Fabnetv6NetworkConfiguration
-                            )
-                        )
-                        or ip in IPV4_SHARED_ADDRESS_SPACE
-                    )
-
-                    # Prioritize public over private IPs and prioritize IPv4 over IPv6
-                    priority = (
-                        (2 if is_private else 0)
-                        if isinstance(address.ip, IPv4Interface)
-                        else (3 if is_private else 1)
-                    )
-
-                    addresses.append((ip, priority))
+                    if has_fabric and isinstance(
+                        address.network.config, Fabnetv6NetworkConfiguration
+                    ):
+                        priority |= 2
+
+                    yield ip, priority
     else:
         address = ip_address(machine.address)
-        is_private = address.is_private or address in IPV4_SHARED_ADDRESS_SPACE
-        # Prioritize public over private IPs and prioritize IPv4 over IPv6
-        priority = (
-            (2 if is_private else 0)
-            if isinstance(address, IPv4Address)
-            else (3 if is_private else 1)
-        )
-        addresses.append((address, priority))
+        yield address, _classify_ip(address)[1]
 
     for address in machine.extra.get("floating-ips", []):
         ip = ip_address(address)
-        if ip.is_multicast or ip.is_reserved or ip.is_loopback or ip.is_link_local:
+        is_special, priority = _classify_ip(ip)
+        if is_special:
             continue
 
-        is_private = ip.is_private or ip in IPV4_SHARED_ADDRESS_SPACE
-        # Prioritize public over private IPs and prioritize IPv4 over IPv6
-        priority = (
-            (2 if is_private else 0)
-            if isinstance(address, IPv4Address)
-            else (3 if is_private else 1)
-        )
-        addresses.append((ip, priority))
+        yield ip, priority
 
-    addresses = sorted(addresses, key=lambda v: v[1])
-    log.debug("Addresses <%s>", addresses)
 
-    return addresses
+@lru_cache(maxsize=1024)
+def _classify_ip(ip: IPv4Address | IPv6Address) -> tuple[bool, int]:
+    """Classify an IP address for :func:`get_ips`.
+
+    The ``ipaddress`` properties used here are recomputed on every access, so the
+    result is cached, as the same addresses are looked at for every node and on
+    every run.
+
+    :param ip: The IP address to classify
+    :type ip: IPv4Address | IPv6Address
+    :return: Whether the address is multicast, reserved, loopback, or link-local,
+        and its priority. Public IPv4 addresses are prioritized over public IPv6
+        addresses, followed by private IPv4 and private IPv6 addresses.
+    :rtype: tuple[bool, int]
+    """
+    is_special = ip.is_multicast or ip.is_reserved or ip.is_loopback or ip.is_link_local
+    is_private = ip.is_private or ip in IPV4_SHARED_ADDRESS_SPACE
+    # Prioritize public over private IPs and prioritize IPv4 over IPv6
+    priority = (2 if is_private else 0) + (0 if ip.version == 4 else 1)
+    return is_special, priority
 
 
 class experiment_state(ContextDecorator):
@@ -423,19 +575,14 @@ class experiment_state(ContextDecorator):
             exit (default). Set to ``False`` to let exceptions propagate.
         :type on_error_continue: bool, optional
         """
-        self.env = env
-        self.arg = args[-1]
+        *path, self.arg = args
         self.status = None
         self.on_error_continue = on_error_continue
 
-        for index, arg in enumerate(args):
-            if index == len(args) - 1:
-                break
+        for arg in path:
+            env = env.setdefault(arg, {})
 
-            if arg not in self.env:
-                self.env[arg] = {}
-
-            self.env = self.env[arg]
+        self.env = env
 
     def __enter__(self) -> experiment_state:
         """Enter the context, initialising the state key to ``STATUS_STARTED``.
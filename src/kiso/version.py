@@ -1,9 +1,6 @@
 """Kiso version information."""
 
-from pathlib import Path
-
-THIS_DIR = Path(__file__).parent
-__version__ = (THIS_DIR / "version.txt").read_text().strip()
+__version__ = "0.1.0b0"
 __homepage__ = "https://pegasus.isi.edu"
 __source__ = "https://github.com/pegasus-isi/kiso.git"
 __issues__ = "https://github.com/pegasus-isi/kiso/issues"
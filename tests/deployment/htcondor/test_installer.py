@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from collections import defaultdict
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pytest
@@ -10,12 +11,19 @@ from enoslib.infra.enos_chameleonedge.objects import ChameleonDevice
 from enoslib.objects import Host, Roles
 
 if TYPE_CHECKING:
-    from pathlib import Path
+    from unittest.mock import MagicMock
 
     from pytest_mock import MockerFixture
 
 from kiso.deployment.htcondor.configuration import HTCondorDaemon
-from kiso.deployment.htcondor.installer import HTCondorInstaller
+from kiso.deployment.htcondor.installer import (
+    CENTRAL_MANAGER,
+    DAEMON_FLAGS_KEY,
+    EXECUTE,
+    SUBMIT,
+    HTCondorInstaller,
+    _last_result_per_host,
+)
 
 # ---------------------------------------------------------------------------
 # __init__ / check
@@ -299,6 +307,69 @@ def test_htcondor_call_with_chameleon_device_submits_edge_install(
     assert mock_container.extra[installer.HAS_SOFTWARE_KEY] is True
 
 
+def test_htcondor_call_runs_ansible_once_per_group(mocker: MockerFixture) -> None:
+    """VMs share one Ansible run per group, configured through host variables."""
+    cm = HTCondorDaemon(kind="central-manager", labels=["cm"])
+    execute = HTCondorDaemon(kind="execute", labels=["worker"])
+    installer = HTCondorInstaller([cm, execute])
+
+    hosts = [Host(f"vm{i}") for i in range(3)]
+    for host in hosts:
+        host.extra = {"kiso_preferred_ip": host.alias}
+
+    mocker.patch.object(
+        installer,
+        "_get_label_daemon_machine_map",
+        return_value={hosts[0]: {cm}, hosts[1]: {execute}, hosts[2]: {execute}},
+    )
+    mocker.patch.object(
+        installer,
+        "_get_condor_config",
+        side_effect=lambda _, __, machine, ___: ([machine.alias], {}),
+    )
+    mocker.patch(
+        "kiso.deployment.htcondor.installer.utils.get_pool_passwd_file",
+        return_value="/fake/pool_passwd",
+    )
+    mocker.patch(
+        "kiso.deployment.htcondor.installer.utils.resolve_labels",
+        return_value=[hosts[0]],
+    )
+
+    mock_executor = mocker.MagicMock()
+    mock_cm = mocker.MagicMock()
+    mock_cm.__enter__ = mocker.MagicMock(return_value=mock_executor)
+    mock_cm.__exit__ = mocker.MagicMock(return_value=False)
+    mocker.patch(
+        "kiso.deployment.htcondor.installer.get_process_pool_executor",
+        return_value=mock_cm,
+    )
+    mocker.patch("kiso.deployment.htcondor.installer.as_completed", side_effect=iter)
+    mocker.patch("kiso.deployment.htcondor.installer.display._render")
+    mocker.patch("kiso.deployment.htcondor.installer.console.rule")
+
+    env = {"labels": mocker.MagicMock(), "is_public_ip_required": False}
+    installer(env)
+
+    first, second = mock_executor.submit.call_args_list
+    assert first.kwargs["roles"] == [hosts[0]]
+    assert second.kwargs["roles"] == [hosts[1], hosts[2]]
+    assert "htcondor_config" not in second.kwargs["extra_vars"]
+    assert [host.extra["htcondor_config"] for host in hosts] == [
+        ["vm0"],
+        ["vm1"],
+        ["vm2"],
+    ]
+
+
+def test_last_result_per_host_keeps_one_result_per_host(
+    mocker: MockerFixture,
+) -> None:
+    a1, b1, a2, b2 = (mocker.MagicMock(host=host) for host in ["a", "b", "a", "b"])
+
+    assert _last_result_per_host([a1, b1, a2, b2]) == [a2, b2]
+
+
 # ---------------------------------------------------------------------------
 # _get_label_daemon_machine_map
 # ---------------------------------------------------------------------------
@@ -377,8 +448,6 @@ def test_htcondor_get_condor_config_execute() -> None:
     h = Host("vm1")
     h.extra = {
         "kind": "vagrant",
-        "is_central_manager": False,
-        "is_submit": False,
         "kiso_preferred_ip": "10.0.0.1",
     }
     env = {"is_public_ip_required": False}
@@ -396,8 +465,7 @@ def test_htcondor_get_condor_config_submit() -> None:
     h = Host("vm1")
     h.extra = {
         "kind": "vagrant",
-        "is_central_manager": False,
-        "is_submit": True,
+        DAEMON_FLAGS_KEY: SUBMIT,
         "kiso_preferred_ip": "10.0.0.1",
     }
     env = {"is_public_ip_required": False}
@@ -414,8 +482,6 @@ def test_htcondor_get_condor_config_personal() -> None:
     h = Host("vm1")
     h.extra = {
         "kind": "vagrant",
-        "is_central_manager": False,
-        "is_submit": False,
         "kiso_preferred_ip": "10.0.0.1",
     }
     env = {"is_public_ip_required": False}
@@ -435,8 +501,6 @@ def test_htcondor_get_condor_config_with_config_file(tmp_path: Path) -> None:
     h = Host("vm1")
     h.extra = {
         "kind": "vagrant",
-        "is_central_manager": False,
-        "is_submit": False,
         "kiso_preferred_ip": "10.0.0.1",
     }
     env = {"is_public_ip_required": False}
@@ -457,8 +521,7 @@ def test_htcondor_get_condor_config_tcp_forwarding_host() -> None:
     h = Host("vm1")
     h.extra = {
         "kind": "chameleon-edge",
-        "is_central_manager": False,
-        "is_submit": True,
+        DAEMON_FLAGS_KEY: SUBMIT,
         "kiso_preferred_ip": "203.0.113.1",
     }
     env = {"is_public_ip_required": True}
@@ -488,6 +551,15 @@ def test_htcondor_get_condor_daemon_labels_personal() -> None:
     assert "all" in personal_labels
 
 
+def test_htcondor_get_condor_daemon_labels_is_cached() -> None:
+    """Label sets are computed once and returned as frozensets."""
+    installer = HTCondorInstaller([HTCondorDaemon(kind="execute", labels=["worker"])])
+    first = installer._get_condor_daemon_labels()
+    installer.config = []
+    assert installer._get_condor_daemon_labels() is first
+    assert first[2] == frozenset({"worker"})
+
+
 # ---------------------------------------------------------------------------
 # _is_public_ip_required
 # ---------------------------------------------------------------------------
@@ -515,6 +587,24 @@ def test_htcondor_is_public_ip_required_true_execute_and_submit_differ() -> None
     assert installer._is_public_ip_required(daemon_to_site) is True
 
 
+def test_htcondor_is_public_ip_required_true_submit_off_cm_site() -> None:
+    """Submit and execute on one site, central manager on another → required."""
+    installer = HTCondorInstaller([])
+    daemon_to_site = {
+        "execute": {"site-a"},
+        "submit": {"site-a"},
+        "central-manager": {"site-b"},
+    }
+    assert installer._is_public_ip_required(daemon_to_site) is True
+
+
+def test_htcondor_is_public_ip_required_false_no_daemons() -> None:
+    """No HTCondor daemons → public IP not required."""
+    installer = HTCondorInstaller([])
+    daemon_to_site = {"execute": set(), "submit": set(), "central-manager": set()}
+    assert installer._is_public_ip_required(daemon_to_site) is False
+
+
 def test_htcondor_is_public_ip_required_false_same_site() -> None:
     """All daemons on the same site → public IP not required."""
     installer = HTCondorInstaller([])
@@ -532,7 +622,7 @@ def test_htcondor_is_public_ip_required_false_same_site() -> None:
 
 
 def test_htcondor_map_daemon_to_sites_flags_nodes() -> None:
-    """_map_daemon_to_sites sets is_central_manager, is_execute on nodes."""
+    """_map_daemon_to_sites sets the central-manager and execute flags on nodes."""
     installer = HTCondorInstaller(
         [
             HTCondorDaemon(kind="central-manager", labels=["cm"]),
@@ -547,8 +637,8 @@ def test_htcondor_map_daemon_to_sites_flags_nodes() -> None:
     labels = Roles({"cm": [h_cm], "worker": [h_worker]})
     daemon_to_site = installer._map_daemon_to_sites(labels)
 
-    assert h_cm.extra["is_central_manager"] is True
-    assert h_worker.extra["is_execute"] is True
+    assert h_cm.extra[DAEMON_FLAGS_KEY] == CENTRAL_MANAGER
+    assert h_worker.extra[DAEMON_FLAGS_KEY] == EXECUTE
     assert "central-manager" in daemon_to_site
     assert "execute" in daemon_to_site
 
@@ -562,10 +652,30 @@ def test_htcondor_map_daemon_to_sites_with_submit() -> None:
 
     daemon_to_site = installer._map_daemon_to_sites(labels)
 
-    assert h.extra["is_submit"] is True
+    assert h.extra[DAEMON_FLAGS_KEY] == SUBMIT
     assert "submit" in daemon_to_site
 
 
+def test_htcondor_map_daemon_to_sites_combines_flags() -> None:
+    """A node in several daemon labels gets all their flags."""
+    installer = HTCondorInstaller(
+        [
+            HTCondorDaemon(kind="central-manager", labels=["cm"]),
+            HTCondorDaemon(kind="submit", labels=["sub"]),
+        ]
+    )
+    h = Host("10.0.0.1")
+    h.extra = {"kind": "vagrant", "site": "vagrant"}
+    h_other = Host("10.0.0.2")
+    h_other.extra = {"kind": "vagrant", "site": "vagrant"}
+    labels = Roles({"cm": [h], "sub": [h], "other": [h_other]})
+
+    installer._map_daemon_to_sites(labels)
+
+    assert h.extra[DAEMON_FLAGS_KEY] == CENTRAL_MANAGER | SUBMIT
+    assert DAEMON_FLAGS_KEY not in h_other.extra
+
+
 def test_htcondor_map_daemon_to_sites_fabric_node() -> None:
     """Nodes with kind=fabric use 'fabric' as the site label."""
     installer = HTCondorInstaller([HTCondorDaemon(kind="execute", labels=["compute"])])
@@ -575,3 +685,96 @@ def test_htcondor_map_daemon_to_sites_fabric_node() -> None:
 
     daemon_to_site = installer._map_daemon_to_sites(labels)
     assert "fabric" in daemon_to_site["execute"]
+
+
+# ---------------------------------------------------------------------------
+# _install_condor_on_edge
+# ---------------------------------------------------------------------------
+
+
+def _mock_edge(mocker: MockerFixture, stdout: str) -> tuple[MagicMock, MagicMock]:
+    ok = mocker.MagicMock(rc=0, stdout=stdout)
+    mocker.patch("kiso.deployment.htcondor.installer.edge.run_script", return_value=ok)
+    execute = mocker.patch(
+        "kiso.deployment.htcondor.installer.edge._execute", return_value=ok
+    )
+    upload = mocker.patch("kiso.deployment.htcondor.installer.edge._upload_file")
+    return execute, upload
+
+
+def test_htcondor_install_condor_on_edge_batches_commands(
+    mocker: MockerFixture,
+) -> None:
+    execute, upload = _mock_edge(mocker, "/etc/condor\n/etc/condor/pw\n/etc/tokens\n")
+    uploaded = {}
+    upload.side_effect = lambda _, src, __: uploaded.setdefault(
+        Path(src).name, Path(src).read_text() if Path(src).exists() else None
+    )
+    installer = HTCondorInstaller([HTCondorDaemon(kind="execute", labels=["edge"])])
+    extra_vars = {
+        "htcondor_daemons": {HTCondorDaemon(kind="execute", labels=["edge"])},
+        "pool_passwd_file": "/local/pool_passwd",
+        "token_identity": "condor_pool@kiso",
+    }
+
+    installer._install_condor_on_edge(
+        mocker.MagicMock(), ["CONDOR_HOST = $(IP_ADDRESS)"], extra_vars
+    )
+
+    assert execute.call_count == 2
+    assert execute.call_args_list[0].args[1] == (
+        "condor_config_val CONFIG_ROOT SEC_PASSWORD_DIRECTORY "
+        "SEC_TOKEN_SYSTEM_DIRECTORY"
+    )
+    script = execute.call_args_list[1].args[1]
+    assert "chmod 644 /etc/condor/config.d/01-kiso" in script
+    assert "mv /etc/condor/pw/pool_passwd /etc/condor/pw/POOL" in script
+    assert "-file /etc/tokens/POOL.token" in script
+    assert script.rstrip().endswith("condor_restart")
+    assert upload.call_args_list[0].args[1:] == (
+        "/local/pool_passwd",
+        "/etc/condor/pw/",
+    )
+    assert upload.call_args_list[1].args[2] == "/etc/condor/config.d"
+    assert uploaded["01-kiso"] == "CONDOR_HOST = $(IP_ADDRESS)\n"
+
+
+def test_htcondor_install_condor_on_edge_personal_skips_security(
+    mocker: MockerFixture,
+) -> None:
+    execute, upload = _mock_edge(mocker, "/etc/condor\n")
+    installer = HTCondorInstaller([HTCondorDaemon(kind="personal", labels=["edge"])])
+    extra_vars = {
+        "htcondor_daemons": {HTCondorDaemon(kind="personal", labels=["edge"])},
+        "htcondor_config_files": {"kiso-personal-config-file": "/local/a.conf"},
+    }
+
+    installer._install_condor_on_edge(mocker.MagicMock(), [], extra_vars)
+
+    assert [c.args[1] for c in execute.call_args_list] == [
+        "condor_config_val CONFIG_ROOT",
+        "rm -rf  /etc/condor/config.d/kiso-*-config-file",
+        (
+            "mv /etc/condor/config.d/a.conf "
+            "/etc/condor/config.d/kiso-personal-config-file && "
+            "chown root:root /etc/condor/config.d/* ; chmod 644 /etc/condor/config.d/*"
+        ),
+    ]
+    upload.assert_called_once_with(mocker.ANY, "/local/a.conf", "/etc/condor/config.d")
+
+
+def test_htcondor_install_condor_on_edge_personal_without_config_files(
+    mocker: MockerFixture,
+) -> None:
+    execute, upload = _mock_edge(mocker, "/etc/condor\n")
+    installer = HTCondorInstaller([HTCondorDaemon(kind="personal", labels=["edge"])])
+    extra_vars = {
+        "htcondor_daemons": {HTCondorDaemon(kind="personal", labels=["edge"])},
+        "htcondor_config_files": {},
+    }
+
+    results = installer._install_condor_on_edge(mocker.MagicMock(), [], extra_vars)
+
+    assert len(results) == 2
+    execute.assert_not_called()
+    upload.assert_not_called()
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime
 from pathlib import Path
 from typing import TYPE_CHECKING, Any
 from unittest.mock import MagicMock
@@ -12,6 +11,7 @@ import pytest
 from enoslib.objects import Host
 
 from kiso import constants as const
+from kiso import edge
 from kiso.configuration import Deployment, Kiso
 from kiso.deployment.htcondor.configuration import HTCondorDaemon
 from kiso.errors import KisoTimeoutError, KisoValueError
@@ -160,6 +160,19 @@ def test_check_undefined_labels_raises_for_missing_post_script_label() -> None:
         runner._check_undefined_labels(kiso_config, {})
 
 
+def test_check_undefined_labels_reports_section_and_label() -> None:
+    setup = [Script(labels=["submit", "missing"], script="echo hi")]
+    outputs = [Location(labels=["gone"], src="/r", dst="/l")]
+    runner, exp = _make_runner(setup=setup, outputs=outputs)
+    kiso_config = _make_kiso(experiments=[exp])
+    with pytest.raises(ValueError, match="Undefined labels") as exc_info:
+        runner._check_undefined_labels(kiso_config, {"submit": {"m1"}})
+
+    assert exc_info.value.args[1] == {
+        exp.name: {("setup[0]", "missing"), ("outputs[0]", "gone")}
+    }
+
+
 def test_check_undefined_labels_skips_non_pegasus_experiments() -> None:
     shell_exp = ShellConfiguration(
         kind="shell", name="sh", scripts=[Script(labels=["other"], script="echo ok")]
@@ -212,6 +225,23 @@ def test_check_missing_input_files_missing_file_raises(tmp_path: Path) -> None:
         runner._check_missing_input_files(kiso_config)
 
 
+def test_check_missing_input_files_reports_only_missing(tmp_path: Path) -> None:
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "dir").mkdir()
+    inputs = [
+        Location(labels=["submit"], src=str(tmp_path / "a.txt"), dst="/remote/"),
+        Location(labels=["submit"], src=str(tmp_path / "dir"), dst="/remote/"),
+        Location(labels=["submit"], src=str(tmp_path / "b.txt"), dst="/remote/"),
+        Location(labels=["submit"], src=".", dst="/remote/"),
+    ]
+    runner, exp = _make_runner(inputs=inputs)
+    kiso_config = _make_kiso(experiments=[exp])
+    with pytest.raises(ValueError, match="Input file") as e:
+        runner._check_missing_input_files(kiso_config)
+
+    assert e.value.args[1] == [("wf", tmp_path / "b.txt")]
+
+
 # ---------------------------------------------------------------------------
 # __call__ — orchestration
 # ---------------------------------------------------------------------------
@@ -364,7 +394,7 @@ def test_check_submit_labels_raises_when_no_intersection() -> None:
 
 
 # ---------------------------------------------------------------------------
-# _run_setup_scripts — non-empty calls _run_setup_script
+# _run_setup_scripts — non-empty calls _run_setup_script_batch
 # ---------------------------------------------------------------------------
 
 
@@ -375,12 +405,56 @@ def test_run_setup_scripts_non_empty_calls_run_setup_script(
     runner, _ = _make_runner(setup=setup)
     runner.env = {}
     runner.labels = {}
-    mock_run = mocker.patch.object(runner, "_run_setup_script", return_value=[])
+    mock_run = mocker.patch.object(runner, "_run_setup_script_batch", return_value=[])
     runner._run_setup_scripts()
-    mock_run.assert_called_once_with(0, setup[0])
+    mock_run.assert_called_once_with([(0, setup[0])])
     assert "run-setup-script" in runner.env
 
 
+def test_run_setup_scripts_batches_consecutive_scripts_with_same_labels(
+    mocker: MockerFixture,
+) -> None:
+    setup = [
+        Script(labels=["submit"], script="echo 1"),
+        Script(labels=["submit"], script="echo 2"),
+        Script(labels=["compute"], script="echo 3"),
+        Script(labels=["submit"], script="echo 4"),
+    ]
+    runner, _ = _make_runner(setup=setup)
+    runner.env = {}
+    mocker.patch("kiso.experiments.pegasus.runner.display.setup_scripts")
+    mock_run = mocker.patch.object(runner, "_run_setup_script_batch", return_value=[])
+
+    runner._run_setup_scripts()
+
+    assert [call.args[0] for call in mock_run.call_args_list] == [
+        [(0, setup[0]), (1, setup[1])],
+        [(2, setup[2])],
+        [(3, setup[3])],
+    ]
+
+
+# ---------------------------------------------------------------------------
+# _split_labels
+# ---------------------------------------------------------------------------
+
+
+def test_split_labels_is_cached_per_set_of_labels(mocker: MockerFixture) -> None:
+    runner, _ = _make_runner()
+    runner.labels = mocker.MagicMock()
+    resolve = mocker.patch("kiso.experiments.pegasus.runner.utils.resolve_labels")
+    split = mocker.patch(
+        "kiso.experiments.pegasus.runner.utils.split_labels",
+        side_effect=lambda *_: (mocker.MagicMock(), mocker.MagicMock()),
+    )
+
+    first = runner._split_labels(["submit", "compute"])
+    assert runner._split_labels(["compute", "submit"]) is first
+    assert runner._split_labels(["submit"]) is not first
+
+    assert resolve.call_count == split.call_count == 2
+
+
 # ---------------------------------------------------------------------------
 # _copy_input — internal paths
 # ---------------------------------------------------------------------------
@@ -521,15 +595,21 @@ def test_run_post_script_with_containers_uses_run_script(mocker: MockerFixture)
         "kiso.experiments.pegasus.runner.utils.split_labels",
         return_value=(mock_vms, [mock_container]),
     )
+    scripts = []
     mock_run_script = mocker.patch(
         "kiso.experiments.pegasus.runner.edge.run_script",
-        return_value=mocker.MagicMock(),
+        side_effect=lambda _, script, **kwargs: scripts.append(
+            (script.read_text(), script.parent == kwargs["staging_dir"])
+        ),
     )
 
     runner.env = {}
     results = runner._run_post_script(0, post_script)
     assert len(results) == 1
     mock_run_script.assert_called_once()
+    assert scripts == [("#!/bin/bash\necho hi", True)]
+    # The staging directory is removed once the script has run on all containers
+    assert not mock_run_script.call_args.kwargs["staging_dir"].exists()
 
 
 # ---------------------------------------------------------------------------
@@ -654,6 +734,28 @@ def test_pegasus_fetch_output_with_containers_uses_edge(
     mock_download.assert_called_once()
 
 
+def test_pegasus_fetch_output_downloads_from_containers_in_parallel(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    outputs = [Location(labels=["submit"], src="/remote/out", dst=str(tmp_path))]
+    runner, _ = _make_runner(outputs=outputs)
+    runner.labels = mocker.MagicMock()
+    containers = [mocker.MagicMock(), mocker.MagicMock()]
+    mocker.patch.object(runner, "_split_labels", return_value=([], containers))
+    map_containers = mocker.patch(
+        "kiso.experiments.pegasus.runner.edge.map_containers",
+        return_value=["r1", "r2"],
+    )
+
+    runner.env = {}
+    results = runner._fetch_output(0, outputs[0])
+
+    assert results == ["r1", "r2"]
+    map_containers.assert_called_once_with(
+        edge.download, containers, Path("/remote/out"), tmp_path
+    )
+
+
 # ---------------------------------------------------------------------------
 # _run_experiment — orchestration with mocked sub-methods
 # ---------------------------------------------------------------------------
@@ -703,12 +805,12 @@ def test_run_experiment_handles_kiso_value_error(mocker: MockerFixture) -> None:
 
 
 # ---------------------------------------------------------------------------
-# _run_setup_script — vms path
+# _run_setup_script_batch
 # ---------------------------------------------------------------------------
 
 
 def test_run_setup_script_containers_uses_run_script(mocker: MockerFixture) -> None:
-    """_run_setup_script calls edge.run_script for containers (lines 464-473)."""
+    """_run_setup_script_batch calls edge.run_script for containers (lines 464-473)."""
     setup_script = Script(labels=["submit"], script="echo hi")
     runner, _ = _make_runner(setup=[setup_script])
     runner.labels = mocker.MagicMock()
@@ -731,25 +833,25 @@ def test_run_setup_script_containers_uses_run_script(mocker: MockerFixture) -> N
     )
 
     runner.env = {}
-    results = runner._run_setup_script(0, setup_script)
+    ((_, _, results),) = runner._run_setup_script_batch([(0, setup_script)])
     assert len(results) == 1
     mock_run_script.assert_called_once()
 
 
 def test_run_setup_script_already_ok_returns_empty(mocker: MockerFixture) -> None:
-    """_run_setup_script returns early when STATUS_OK (line 440)."""
+    """_run_setup_script_batch skips scripts when STATUS_OK (line 440)."""
     setup_script = Script(labels=["submit"], script="echo hi")
     runner, _ = _make_runner(setup=[setup_script])
     runner.labels = mocker.MagicMock()
     runner.remote_wd = "/remote"
     _mock_pegasus_roles(mocker)
     runner.env = {"run-setup-script": {0: const.STATUS_OK}}
-    result = runner._run_setup_script(0, setup_script)
-    assert result == []
+    result = runner._run_setup_script_batch([(0, setup_script)])
+    assert result == [(0, setup_script, [])]
 
 
 def test_run_setup_script_with_vms_uses_actions(mocker: MockerFixture) -> None:
-    """_run_setup_script calls utils.actions when vms are truthy (lines 448-463)."""
+    """_run_setup_script_batch uses utils.actions when vms are truthy."""
     setup_script = Script(labels=["submit"], script="echo hi")
     runner, _ = _make_runner(
         setup=setup_script if isinstance(setup_script, list) else [setup_script]
@@ -771,17 +873,181 @@ def test_run_setup_script_with_vms_uses_actions(mocker: MockerFixture) -> None:
     )
 
     mock_p = mocker.MagicMock()
-    mock_p.results = [mocker.MagicMock()]
+    mock_p.results = [mocker.MagicMock(task="Run script 0")]
     mock_cm = mocker.MagicMock()
     mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
     mock_cm.__exit__ = mocker.MagicMock(return_value=False)
     mocker.patch("kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm)
 
     runner.env = {}
-    results = runner._run_setup_script(0, setup_script)
+    ((_, _, results),) = runner._run_setup_script_batch([(0, setup_script)])
     assert len(results) == 1
 
 
+def test_run_setup_script_batch_uses_one_play(mocker: MockerFixture) -> None:
+    setup = [
+        Script(labels=["submit"], script="echo 1"),
+        Script(labels=["submit"], script="echo 2"),
+        Script(labels=["submit"], script="echo 3"),
+    ]
+    runner, _ = _make_runner(setup=setup)
+    runner.labels = mocker.MagicMock()
+    runner.remote_wd = "/remote"
+    _mock_pegasus_roles(mocker, vms_truthy=True)
+
+    mock_p = mocker.MagicMock()
+    mock_p.results = [
+        mocker.MagicMock(task="Run script 0", status=const.STATUS_OK),
+        mocker.MagicMock(task="Copy script 2", status=const.STATUS_OK),
+    ]
+    mock_cm = mocker.MagicMock()
+    mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
+    actions = mocker.patch(
+        "kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm
+    )
+
+    runner.env = {"run-setup-script": {1: const.STATUS_OK}}
+    results = runner._run_setup_script_batch(list(enumerate(setup)))
+
+    actions.assert_called_once()
+    assert mock_p.copy.call_count == 2
+    assert mock_p.copy.call_args.kwargs["content"] == (
+        "{% raw %}#!/bin/bash\necho 3{% endraw %}"
+    )
+    assert mock_p.shell.call_count == 2
+    assert mock_p.shell.call_args.args[0].startswith("trap 'rm -f /tmp/kiso-")
+    assert [instance for instance, _, _ in results] == [0, 1, 2]
+    assert [len(result) for _, _, result in results] == [1, 0, 1]
+    assert runner.env["run-setup-script"] == {
+        0: const.STATUS_OK,
+        1: const.STATUS_OK,
+        2: const.STATUS_OK,
+    }
+
+
+def test_run_setup_script_batch_vms_error_fails_pending_scripts(
+    mocker: MockerFixture,
+) -> None:
+    setup = [
+        Script(labels=["submit"], script="echo 1"),
+        Script(labels=["submit"], script="echo 2"),
+    ]
+    runner, _ = _make_runner(setup=setup)
+    runner.labels = mocker.MagicMock()
+    runner.remote_wd = "/remote"
+    _mock_pegasus_roles(mocker, vms_truthy=True)
+    mocker.patch(
+        "kiso.experiments.pegasus.runner.utils.actions",
+        side_effect=RuntimeError("unreachable"),
+    )
+
+    runner.env = {"run-setup-script": {0: const.STATUS_OK}}
+    runner._run_setup_script_batch(list(enumerate(setup)))
+
+    assert runner.env["run-setup-script"] == {
+        0: const.STATUS_OK,
+        1: const.STATUS_FAILED,
+    }
+
+
+def test_run_setup_script_batch_records_status_per_script(
+    mocker: MockerFixture,
+) -> None:
+    setup = [
+        Script(labels=["submit"], script="echo 1"),
+        Script(labels=["submit"], script="echo 2"),
+        Script(labels=["submit"], script="echo 3"),
+    ]
+    runner, _ = _make_runner(setup=setup)
+    runner.labels = mocker.MagicMock()
+    runner.remote_wd = "/remote"
+    _mock_pegasus_roles(mocker, vms_truthy=True)
+
+    # vm-2 fails the second setup script, so Ansible does not run the third on it
+    mock_p = mocker.MagicMock()
+    mock_p.results = [
+        mocker.MagicMock(task="Run script 0", host="vm-1", status=const.STATUS_OK),
+        mocker.MagicMock(task="Run script 0", host="vm-2", status=const.STATUS_OK),
+        mocker.MagicMock(task="Run script 1", host="vm-1", status=const.STATUS_OK),
+        mocker.MagicMock(task="Run script 1", host="vm-2", status=const.STATUS_FAILED),
+        mocker.MagicMock(task="Run script 2", host="vm-1", status=const.STATUS_OK),
+    ]
+    mock_cm = mocker.MagicMock()
+    mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
+    mocker.patch("kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm)
+
+    runner.env = {}
+    results = runner._run_setup_script_batch(list(enumerate(setup)))
+
+    assert [len(result) for _, _, result in results] == [2, 2, 1]
+    assert runner.env["run-setup-script"] == {
+        0: const.STATUS_OK,
+        1: const.STATUS_FAILED,
+        2: const.STATUS_FAILED,
+    }
+
+
+def test_run_setup_script_batch_stops_only_failed_containers(
+    mocker: MockerFixture,
+) -> None:
+    setup = [
+        Script(labels=["submit"], script="echo 1"),
+        Script(labels=["submit"], script="echo 2"),
+    ]
+    runner, _ = _make_runner(setup=setup)
+    runner.labels = mocker.MagicMock()
+    runner.remote_wd = "/remote"
+
+    container_1 = mocker.MagicMock(address="c-1")
+    container_2 = mocker.MagicMock(address="c-2")
+    mocker.patch(
+        "kiso.experiments.pegasus.runner.utils.resolve_labels",
+        return_value=mocker.MagicMock(),
+    )
+    mocker.patch(
+        "kiso.experiments.pegasus.runner.utils.split_labels",
+        return_value=([], [container_1, container_2]),
+    )
+    statuses = {
+        ("c-1", "echo 1"): const.STATUS_OK,
+        ("c-2", "echo 1"): const.STATUS_FAILED,
+        ("c-1", "echo 2"): const.STATUS_OK,
+    }
+
+    def run_script(
+        container: MagicMock,
+        script: Path,
+        **kwargs: object,  # noqa: ARG001
+    ) -> MagicMock:
+        return mocker.MagicMock(
+            host=container.address,
+            status=statuses[container.address, script.read_text().splitlines()[-1]],
+        )
+
+    map_containers = mocker.patch(
+        "kiso.experiments.pegasus.runner.edge.map_containers",
+        side_effect=lambda func, containers, *args, **kwargs: [
+            func(container, *args, **kwargs) for container in containers
+        ],
+    )
+    mocker.patch(
+        "kiso.experiments.pegasus.runner.edge.run_script", side_effect=run_script
+    )
+
+    runner.env = {}
+    results = runner._run_setup_script_batch(list(enumerate(setup)))
+
+    assert [call.args[1] for call in map_containers.call_args_list] == [
+        [container_1, container_2],
+        [container_1],
+    ]
+    assert [len(result) for _, _, result in results] == [2, 1]
+    assert runner.env["run-setup-script"] == {
+        0: const.STATUS_FAILED,
+        1: const.STATUS_FAILED,
+    }
+
+
 # ---------------------------------------------------------------------------
 # _run_post_script — vms path
 # ---------------------------------------------------------------------------
@@ -817,6 +1083,9 @@ def test_run_post_script_with_vms_uses_actions(mocker: MockerFixture) -> None:
     runner.env = {}
     results = runner._run_post_script(0, post_script)
     assert len(results) == 1
+    copy = mock_p.copy.call_args.kwargs
+    assert copy["content"] == "{% raw %}#!/bin/bash\necho hi{% endraw %}"
+    assert copy["mode"] == "0700"
 
 
 # ---------------------------------------------------------------------------
@@ -847,6 +1116,36 @@ def test_pegasus_copy_input_with_vms_uses_actions(
     assert len(results) == 1
 
 
+def test_pegasus_copy_input_directory_to_vms_uses_rsync(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "data"
+    src.mkdir()
+    inputs = [Location(labels=["submit"], src=str(src), dst="/remote/data")]
+    runner, _ = _make_runner(inputs=inputs)
+    runner.labels = mocker.MagicMock()
+    _mock_pegasus_roles(mocker, vms_truthy=True)
+
+    mock_cm = mocker.MagicMock()
+    actions = mocker.patch(
+        "kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm
+    )
+    rsync = mocker.patch("kiso.experiments.pegasus.runner.utils.rsync")
+
+    runner.env = {}
+    runner._copy_input(0, inputs[0])
+
+    assert actions.call_args.kwargs["run_as"] is None
+    rsync.assert_called_once_with(
+        mock_cm.__enter__.return_value,
+        src,
+        Path("/remote/data"),
+        task_name="Copy input file 0",
+        mkdir=True,
+    )
+    mock_cm.__enter__.return_value.copy.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # _get_submit_dir — various paths
 # ---------------------------------------------------------------------------
@@ -878,6 +1177,32 @@ def test_get_submit_dir_with_submit_dir_pattern(mocker: MockerFixture) -> None:
     assert str(path) == "/home/kiso/run/wf"
 
 
+def test_get_submit_dir_uses_last_match_without_quotes(mocker: MockerFixture) -> None:
+    runner, _ = _make_runner()
+    result = MagicMock()
+    result.rc = 0
+    result.stdout = (
+        '2025-01-01 INFO  submit_dir: "/home/kiso/run/wf1"\n'
+        + "x" * 100_000
+        + '\n2025-01-01 INFO  submit_dir: "/home/kiso/run/wf2"  \n'
+    )
+    result.stderr = ""
+
+    path = runner._get_submit_dir(result, MagicMock(), mocker.MagicMock())
+    assert str(path) == "/home/kiso/run/wf2"
+
+
+def test_get_submit_dir_prefers_last_match_in_stderr(mocker: MockerFixture) -> None:
+    runner, _ = _make_runner()
+    result = MagicMock()
+    result.rc = 0
+    result.stdout = 'submit_dir: "/home/kiso/run/wf1"\n'
+    result.stderr = 'submit_dir: "/home/kiso/run/wf2"\n'
+
+    path = runner._get_submit_dir(result, MagicMock(), mocker.MagicMock())
+    assert str(path) == "/home/kiso/run/wf2"
+
+
 def test_get_submit_dir_with_pegasus_run_pattern(mocker: MockerFixture) -> None:
     """_get_submit_dir calls pegasus_run when pegasus-run found in output."""
     runner, _ = _make_runner()
@@ -911,84 +1236,103 @@ def test_wait_for_workflow_already_ok(mocker: MockerFixture) -> None:
 
 
 # ---------------------------------------------------------------------------
-# _render_status
+# _parse_status / _wait_for_workflow_2
 # ---------------------------------------------------------------------------
 
 
-def test_render_status_non_ok_returns_immediately(mocker: MockerFixture) -> None:
-    """_render_status returns early when status is not OK (lines 1022-1023)."""
+def _status(stdout: str, status: str = const.STATUS_OK) -> MagicMock:
+    result = MagicMock()
+    result.status = status
+    result.payload = {"stdout": stdout}
+    return result
+
+
+def test_parse_status_non_ok_returns_nothing() -> None:
     runner, _ = _make_runner()
-    status = mocker.MagicMock()
-    status.status = const.STATUS_FAILED
-    progress = mocker.MagicMock()
 
-    runner._render_status(progress, status)
-    progress.update_table.assert_not_called()
+    assert runner._parse_status(_status("", const.STATUS_FAILED)) == (None, False)
 
 
-def test_render_status_ok_parses_json(mocker: MockerFixture) -> None:
-    """_render_status parses JSON output when status is OK (lines 1025-1026)."""
+def test_parse_status_ok_returns_json() -> None:
     runner, _ = _make_runner()
-    output = {"State": "Running", "Total": 10}
-    status = mocker.MagicMock()
-    status.status = const.STATUS_OK
-    status.payload = {"stdout": json.dumps(output)}
-    progress = mocker.MagicMock()
+    output = json.dumps({"State": "Running", "Total": 10})
 
-    runner._render_status(progress, status)
-    progress.update_table.assert_called_once_with(output)
+    status = _status(f"{output}\n\n--kiso-status-- 0\n")
 
+    assert runner._parse_status(status) == (output, False)
 
-# ---------------------------------------------------------------------------
-# pegasus_remove, pegasus_statistics, pegasus_analyzer — Host path
-# ---------------------------------------------------------------------------
 
+def test_parse_status_done_without_pegasus_status() -> None:
+    runner, _ = _make_runner()
 
-def test_pegasus_remove_host_path(mocker: MockerFixture) -> None:
-    """pegasus_remove with Host uses utils.actions (lines 1064-1067)."""
+    assert runner._parse_status(_status("\n--kiso-status-- 1\ndone\n")) == (
+        None,
+        True,
+    )
+
+
+def test_wait_for_workflow_2_polls_once_per_interval_with_backoff(
+    mocker: MockerFixture,
+) -> None:
     runner, _ = _make_runner()
-    h = Host("10.0.0.1")
-    h.extra = {}
+    running = '{"State": "Running", "Total": 1}\n\n--kiso-status-- 0\n'
+    done = '{"State": "Success", "Total": 1}\n\n--kiso-status-- 0\ndone\n'
+    execute = mocker.patch(
+        "kiso.experiments.pegasus.runner.edge._execute",
+        side_effect=[_status(running)] * 4 + [_status(done)],
+    )
+    sleep = mocker.patch("kiso.experiments.pegasus.runner.time.sleep")
+    mocker.patch("kiso.experiments.pegasus.runner.PegasusWorkflowProgress")
 
-    mock_p = mocker.MagicMock()
-    mock_p.results = [mocker.MagicMock()]
-    mock_cm = mocker.MagicMock()
-    mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
-    mock_cm.__exit__ = mocker.MagicMock(return_value=False)
-    mocker.patch("kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm)
+    runner._wait_for_workflow_2(mocker.MagicMock(), "/submit", poll_interval=2)
 
-    result = runner.pegasus_remove(h, "/submit/dir")
-    assert result is mock_p.results[0]
+    assert execute.call_count == 5
+    assert "monitord.done" in execute.call_args.args[1]
+    assert [call.args[0] for call in sleep.call_args_list] == [2, 3, 4.5, 6.75]
 
 
-def test_pegasus_statistics_host_path(mocker: MockerFixture) -> None:
-    """pegasus_statistics with Host uses utils.actions (lines 1109-1114)."""
+def test_wait_for_workflow_2_parses_unchanged_status_once(
+    mocker: MockerFixture,
+) -> None:
     runner, _ = _make_runner()
-    h = Host("10.0.0.1")
-    h.extra = {}
+    running = '{"State": "Running", "Total": 1}\n\n--kiso-status-- 0\n'
+    done = '{"State": "Success", "Total": 1}\n\n--kiso-status-- 0\ndone\n'
+    mocker.patch(
+        "kiso.experiments.pegasus.runner.edge._execute",
+        side_effect=[_status(running)] * 3 + [_status(done)],
+    )
+    mocker.patch("kiso.experiments.pegasus.runner.time.sleep")
+    progress = mocker.patch("kiso.experiments.pegasus.runner.PegasusWorkflowProgress")
+
+    runner._wait_for_workflow_2(mocker.MagicMock(), "/submit", poll_interval=2)
+
+    update_table = progress.return_value.__enter__.return_value.update_table
+    assert [call.args[0]["State"] for call in update_table.call_args_list] == [
+        "Running",
+        "Success",
+    ]
 
-    mock_p = mocker.MagicMock()
-    mock_cm = mocker.MagicMock()
-    mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
-    mock_cm.__exit__ = mocker.MagicMock(return_value=False)
-    mocker.patch("kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm)
 
-    runner.pegasus_statistics(h, "/submit/dir")  # must not raise
+# ---------------------------------------------------------------------------
+# pegasus_remove — Host path
+# ---------------------------------------------------------------------------
 
 
-def test_pegasus_analyzer_host_path(mocker: MockerFixture) -> None:
-    """pegasus_analyzer with Host uses utils.actions (lines 1152-1157)."""
+def test_pegasus_remove_host_path(mocker: MockerFixture) -> None:
+    """pegasus_remove with Host uses utils.actions (lines 1064-1067)."""
     runner, _ = _make_runner()
     h = Host("10.0.0.1")
     h.extra = {}
 
     mock_p = mocker.MagicMock()
+    mock_p.results = [mocker.MagicMock()]
     mock_cm = mocker.MagicMock()
     mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
     mock_cm.__exit__ = mocker.MagicMock(return_value=False)
     mocker.patch("kiso.experiments.pegasus.runner.utils.actions", return_value=mock_cm)
 
-    runner.pegasus_analyzer(h, "/submit/dir")  # must not raise
+    result = runner.pegasus_remove(h, "/submit/dir")
+    assert result is mock_p.results[0]
 
 
 # ---------------------------------------------------------------------------
@@ -1141,7 +1485,7 @@ def test_get_submit_dir_no_match_host_invalid_state(mocker: MockerFixture) -> No
 
 
 # ---------------------------------------------------------------------------
-# pegasus_remove, pegasus_statistics, pegasus_analyzer — container path
+# pegasus_remove — container path
 # ---------------------------------------------------------------------------
 
 
@@ -1158,30 +1502,6 @@ def test_pegasus_remove_container_path(mocker: MockerFixture) -> None:
     mock_remove.assert_called_once()
 
 
-def test_pegasus_statistics_container_path(mocker: MockerFixture) -> None:
-    """pegasus_statistics with non-Host uses _pegasus_statistics (line 1116)."""
-    runner, _ = _make_runner()
-    mock_container = mocker.MagicMock()
-    mock_stats = mocker.patch.object(
-        runner, "_pegasus_statistics", return_value=mocker.MagicMock()
-    )
-
-    runner.pegasus_statistics(mock_container, "/submit/dir")
-    mock_stats.assert_called_once()
-
-
-def test_pegasus_analyzer_container_path(mocker: MockerFixture) -> None:
-    """pegasus_analyzer with non-Host uses _pegasus_analyzer (line 1159)."""
-    runner, _ = _make_runner()
-    mock_container = mocker.MagicMock()
-    mock_analyze = mocker.patch.object(
-        runner, "_pegasus_analyzer", return_value=mocker.MagicMock()
-    )
-
-    runner.pegasus_analyzer(mock_container, "/submit/dir")
-    mock_analyze.assert_called_once()
-
-
 def test_get_submit_dir_pegasus_run_pattern_fails(mocker: MockerFixture) -> None:
     """_get_submit_dir raises ValueError when pegasus_run fails (lines 836-838)."""
     runner, _ = _make_runner()
@@ -1197,7 +1517,7 @@ def test_get_submit_dir_pegasus_run_pattern_fails(mocker: MockerFixture) -> None
 
 
 def test_wait_for_workflow_calls_sub_methods(mocker: MockerFixture) -> None:
-    """_wait_for_workflow calls _wait_for_workflow_2, pegasus_statistics, analyzer."""
+    """_wait_for_workflow calls _wait_for_workflow_2 and _analyze_workflow."""
     runner, _ = _make_runner()
     mock_vm = mocker.MagicMock()
     runner.vms = [mock_vm]
@@ -1207,15 +1527,44 @@ def test_wait_for_workflow_calls_sub_methods(mocker: MockerFixture) -> None:
     runner.env = {0: {"submit-dir": "/submit/dir"}}
 
     mock_wait2 = mocker.patch.object(runner, "_wait_for_workflow_2")
-    mock_stats = mocker.patch.object(runner, "pegasus_statistics")
-    mock_analyze = mocker.patch.object(runner, "pegasus_analyzer")
+    mock_analyze = mocker.patch.object(runner, "_analyze_workflow")
     mocker.patch("kiso.experiments.pegasus.runner.console.print")
 
     runner._wait_for_workflow(0)
 
     mock_wait2.assert_called_once()
-    mock_stats.assert_called_once()
-    mock_analyze.assert_called_once()
+    mock_analyze.assert_called_once_with(mock_vm, "/submit/dir")
+
+
+def test_analyze_workflow_host_path_runs_single_play(mocker: MockerFixture) -> None:
+    runner, _ = _make_runner()
+    actions = mocker.patch("kiso.experiments.pegasus.runner.utils.actions")
+    p = actions.return_value.__enter__.return_value
+
+    runner._analyze_workflow(Host("10.0.0.1"), "/submit/dir")
+
+    actions.assert_called_once()
+    assert [call.args[0] for call in p.shell.call_args_list] == [
+        "pegasus-statistics -s all /submit/dir",
+        "pegasus-analyzer /submit/dir >/submit/dir/analyzer.log",
+    ]
+
+
+def test_analyze_workflow_container_path_runs_single_command(
+    mocker: MockerFixture,
+) -> None:
+    runner, _ = _make_runner()
+    execute = mocker.patch("kiso.experiments.pegasus.runner.edge._execute")
+    container = mocker.MagicMock()
+
+    runner._analyze_workflow(container, "/submit/dir")
+
+    execute.assert_called_once_with(
+        container,
+        "pegasus-statistics -s all /submit/dir ; "
+        "pegasus-analyzer /submit/dir > /submit/dir/analyzer.log",
+        user=const.KISO_USER,
+    )
 
 
 def test_pegasus_run_container_path(mocker: MockerFixture) -> None:
@@ -1235,18 +1584,6 @@ def test_pegasus_run_container_path(mocker: MockerFixture) -> None:
     mock_gsd.assert_called_once()
 
 
-def test_pegasus_status_calls_edge_execute(mocker: MockerFixture) -> None:
-    """pegasus_status calls edge._execute (lines 1045-1046)."""
-    runner, _ = _make_runner()
-    mock_container = mocker.MagicMock()
-    mock_execute = mocker.patch(
-        "kiso.experiments.pegasus.runner.edge._execute", return_value=mocker.MagicMock()
-    )
-
-    runner.pegasus_status(mock_container, "/submit/dir", user="kiso")
-    mock_execute.assert_called_once()
-
-
 def test_pegasus_remove_edge_execute(mocker: MockerFixture) -> None:
     """_pegasus_remove calls edge._execute (lines 1092-1093)."""
     runner, _ = _make_runner()
@@ -1259,18 +1596,6 @@ def test_pegasus_remove_edge_execute(mocker: MockerFixture) -> None:
     mock_execute.assert_called_once()
 
 
-def test_pegasus_statistics_edge_execute(mocker: MockerFixture) -> None:
-    """_pegasus_statistics calls edge._execute (lines 1135-1136)."""
-    runner, _ = _make_runner()
-    mock_container = mocker.MagicMock()
-    mock_execute = mocker.patch(
-        "kiso.experiments.pegasus.runner.edge._execute", return_value=mocker.MagicMock()
-    )
-
-    runner._pegasus_statistics(mock_container, "/submit/dir", user="kiso")
-    mock_execute.assert_called_once()
-
-
 def test_pegasus_run_host_path(mocker: MockerFixture) -> None:
     """pegasus_run with Host uses utils.actions (lines 758-763)."""
     runner, _ = _make_runner()
@@ -1302,18 +1627,6 @@ def test_pegasus_run_edge_execute(mocker: MockerFixture) -> None:
     mock_execute.assert_called_once()
 
 
-def test_pegasus_analyzer_edge_execute(mocker: MockerFixture) -> None:
-    """_pegasus_analyzer calls edge._execute (lines 1178-1185)."""
-    runner, _ = _make_runner()
-    mock_container = mocker.MagicMock()
-    mock_execute = mocker.patch(
-        "kiso.experiments.pegasus.runner.edge._execute", return_value=mocker.MagicMock()
-    )
-
-    runner._pegasus_analyzer(mock_container, Path("/submit/dir"), user="kiso")
-    mock_execute.assert_called_once()
-
-
 def test_wait_for_workflow_timeout_sets_failed(mocker: MockerFixture) -> None:
     """KisoTimeoutError in _wait_for_workflow sets STATUS_FAILED (lines 914-918).
 
@@ -1331,8 +1644,7 @@ def test_wait_for_workflow_timeout_sets_failed(mocker: MockerFixture) -> None:
     mocker.patch.object(
         runner, "_wait_for_workflow_2", side_effect=KisoTimeoutError("timeout")
     )
-    mocker.patch.object(runner, "pegasus_statistics")
-    mocker.patch.object(runner, "pegasus_analyzer")
+    mocker.patch.object(runner, "_analyze_workflow")
     mocker.patch("kiso.experiments.pegasus.runner.console.print")
 
     runner._wait_for_workflow(0)
@@ -1360,15 +1672,33 @@ def test_get_submit_dir_container_sqlite_path(mocker: MockerFixture) -> None:
     mock_sqlite_result.rc = 0
     mock_sqlite_result.stdout = "WORKFLOW_STARTED|/workflow/dir|extra"
 
-    mocker.patch(
+    execute = mocker.patch(
         "kiso.experiments.pegasus.runner.edge._execute",
         return_value=mock_sqlite_result,
     )
 
-    ts = datetime.now()
-    result = runner._get_submit_dir(mock_gen_result, mock_container, ts)
+    result = runner._get_submit_dir(mock_gen_result, mock_container, 1700000000.5)
     assert str(result) == "/workflow/dir"
 
+    cmd = execute.call_args.args[1]
+    assert cmd.startswith("sqlite3 -list ~kiso/.pegasus/workflow.db 'SELECT ")
+    assert "WHERE timestamp >= 1700000000.500000" in cmd
+    assert "echo" not in cmd
+
+
+@pytest.mark.parametrize("ts", [float("nan"), float("inf"), "0 OR 1=1"])
+def test_get_submit_dir_rejects_invalid_timestamps(
+    mocker: MockerFixture, ts: float | str
+) -> None:
+    runner, _ = _make_runner()
+    result = mocker.MagicMock(rc=0, stdout="no submit dir here", stderr="")
+    execute = mocker.patch("kiso.experiments.pegasus.runner.edge._execute")
+
+    with pytest.raises(ValueError, match="timestamp|convert"):
+        runner._get_submit_dir(result, mocker.MagicMock(), ts)  # type: ignore[arg-type]
+
+    execute.assert_not_called()
+
 
 def test_generate_workflow_already_ok_returns_none(mocker: MockerFixture) -> None:
     """_generate_workflow with STATUS_OK state returns None early (line 699-700)."""
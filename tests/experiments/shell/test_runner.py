@@ -496,3 +496,38 @@ def test_call_sets_attributes_and_calls_steps(mocker: MockerFixture) -> None:
     cp.assert_called_once()
     run.assert_called_once()
     fetch.assert_called_once()
+
+
+def test_copy_inputs_only_copies_inputs(mocker: MockerFixture) -> None:
+    inputs = [Location(["vm"], "a.txt", "/data"), Location(["vm"], "b.txt", "/data")]
+    runner, _ = _make_runner(inputs=inputs)
+    ok = mocker.MagicMock(status=const.STATUS_OK)
+    failed = mocker.MagicMock(status=const.STATUS_FAILED)
+
+    def _copy_input(instance: int, _: Location) -> list:
+        runner.env["copy-input"][instance] = const.STATUS_OK
+        return [ok] if instance == 0 else [ok, failed]
+
+    mocker.patch.object(runner, "_copy_input", side_effect=_copy_input)
+    run = mocker.patch.object(runner, "_run_scripts")
+    state: dict = {}
+
+    assert runner.copy_inputs("/wd", "/remote", {}, state) == (
+        state,
+        [(0, inputs[0], [ok]), (1, inputs[1], [ok, failed])],
+    )
+
+    assert runner.remote_wd == "/remote"
+    # Inputs that failed to copy are copied again when the experiment runs
+    assert state["copy-input"] == {0: const.STATUS_OK, 1: const.STATUS_FAILED}
+    run.assert_not_called()
+
+
+def test_show_inputs_displays_results(mocker: MockerFixture) -> None:
+    runner, _ = _make_runner()
+    mocker.patch("kiso.experiments.shell.runner.console.print")
+    inputs = mocker.patch("kiso.experiments.shell.runner.display.inputs")
+
+    runner.show_inputs([(0, mocker.MagicMock(), [])])
+
+    inputs.assert_called_once()
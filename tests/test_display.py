@@ -321,3 +321,27 @@ def test_progress_get_renderable() -> None:
     p = PegasusWorkflowProgress(_COLS)
     renderable = p.get_renderable()
     assert renderable is not None
+
+
+def test_progress_update_table_updates_cells_in_place() -> None:
+    p = PegasusWorkflowProgress(_COLS)
+    p.update_table(_make_status("Running", succeeded=3, percent=50))
+    table = p.table
+    spinner = p._spinner
+
+    p.update_table(_make_status("Running", succeeded=4, failed=1, percent=60))
+    assert p.table is table
+    assert len(table.rows) == 1
+    assert [cell.renderable for cell in p._cells][1:] == [
+        "[bold green]4[/bold green]",
+        "[bold red]1[/bold red]",
+        "[bold red]60[/bold red]",
+    ]
+    assert p._cells[0].renderable is spinner
+    assert spinner.text.plain == "Running..."
+
+    p.update_table(_make_status("Success", succeeded=5, percent=100))
+    assert p._cells[0].renderable == "[bold green]Success[/bold green]"
+    console = Console(width=80, record=True)
+    console.print(table)
+    assert "Success" in console.export_text()
@@ -0,0 +1,540 @@
+"""Unit tests for kiso.edge."""
+
+from __future__ import annotations
+
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
+
+import pytest
+from enoslib.api import CommandResult
+
+from kiso import constants as const
+from kiso import edge
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from pytest_mock import MockerFixture
+
+
+def _result(rc: int | None, stdout: str = "") -> CommandResult:
+    return CommandResult(
+        "edge", "container-task", "OK", {"stdout": stdout, "stderr": "", "rc": rc}
+    )
+
+
+# ---------------------------------------------------------------------------
+# map_containers
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def _thread_pool(max_workers: int) -> Iterator[ThreadPoolExecutor]:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield executor
+
+
+def test_map_containers_runs_single_container_in_process(
+    mocker: MockerFixture,
+) -> None:
+    pool = mocker.patch("kiso.edge.get_process_pool_executor")
+    func = mocker.MagicMock(return_value="ok")
+
+    assert edge.map_containers(func, ["c1"], "src", user="kiso") == ["ok"]
+
+    func.assert_called_once_with("c1", "src", user="kiso")
+    pool.assert_not_called()
+
+
+def test_map_containers_fans_out_in_container_order(mocker: MockerFixture) -> None:
+    pool = mocker.patch("kiso.edge.get_process_pool_executor", side_effect=_thread_pool)
+    containers = [f"c{i}" for i in range(8)]
+
+    results = edge.map_containers(lambda c, suffix: c + suffix, containers, "-ok")
+
+    assert results == [f"c{i}-ok" for i in range(8)]
+    pool.assert_called_once_with(max_workers=const.MAX_PROCESSES)
+
+
+def test_map_containers_shares_homes_with_workers(mocker: MockerFixture) -> None:
+    mocker.patch("kiso.edge.get_process_pool_executor", side_effect=_thread_pool)
+    mocker.patch.dict(edge._homes, {("c1", "~"): "/root"}, clear=True)
+    handed = []
+
+    def _call(homes: dict, _: object, container: str) -> tuple[str, dict]:
+        handed.append(homes)
+        return f"{container}-ok", {(container, "~kiso"): "/home/kiso"}
+
+    mocker.patch("kiso.edge._call_with_homes", side_effect=_call)
+
+    assert edge.map_containers(mocker.MagicMock(), ["c1", "c2"]) == [
+        "c1-ok",
+        "c2-ok",
+    ]
+
+    assert handed == [{("c1", "~"): "/root"}] * 2
+    assert edge._homes == {
+        ("c1", "~"): "/root",
+        ("c1", "~kiso"): "/home/kiso",
+        ("c2", "~kiso"): "/home/kiso",
+    }
+
+
+def test_call_with_homes_returns_homes_known_to_the_worker(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch.dict(edge._homes, clear=True)
+
+    def _lookup(container: str, prefix: str) -> str:
+        edge._homes[container, prefix] = "/home/kiso"
+        return "ok"
+
+    assert edge._call_with_homes({("c1", "~"): "/root"}, _lookup, "c1", "~kiso") == (
+        "ok",
+        {("c1", "~"): "/root", ("c1", "~kiso"): "/home/kiso"},
+    )
+
+
+def test_map_containers_propagates_errors(mocker: MockerFixture) -> None:
+    mocker.patch("kiso.edge.get_process_pool_executor", side_effect=_thread_pool)
+
+    with pytest.raises(ValueError, match="boom"):
+        edge.map_containers(mocker.MagicMock(side_effect=ValueError("boom")), "ab")
+
+
+# ---------------------------------------------------------------------------
+# execute
+# ---------------------------------------------------------------------------
+
+
+def test_execute_fetches_output_and_cleans_up_in_one_call(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("kiso.edge._resolve_remotely", return_value="/tmp")  # noqa: S108
+    mocker.patch("kiso.utils.get_random_string", return_value="abcde")
+    execute = mocker.patch(
+        "kiso.edge._execute",
+        side_effect=[_result(0), _result(0, "out\n--abcde--\nerr")],
+    )
+
+    result = edge.execute(mocker.MagicMock(), "echo")
+
+    assert (result.rc, result.status) == (0, const.STATUS_OK)
+    assert (result.stdout, result.stderr) == ("out", "err")
+    assert execute.call_count == 2
+    assert "rm -f" in execute.call_args.args[1]
+
+
+def test_execute_waits_for_command_on_the_container(mocker: MockerFixture) -> None:
+    mocker.patch("kiso.edge._resolve_remotely", return_value="/tmp")  # noqa: S108
+    execute = mocker.patch(
+        "kiso.edge._execute",
+        side_effect=[_result(None), _result(1), _result(0, "3"), _result(0)],
+    )
+
+    result = edge.execute(mocker.MagicMock(), "false", poll_interval=1)
+
+    assert (result.rc, result.status) == (3, const.STATUS_FAILED)
+    wait = execute.call_args_list[1].args[1]
+    assert f"-lt {const.EDGE_WAIT_TIMEOUT} ]" in wait
+    assert "sleep 1" in wait
+
+
+def test_execute_times_out(mocker: MockerFixture) -> None:
+    mocker.patch("kiso.edge._resolve_remotely", return_value="/tmp")  # noqa: S108
+    execute = mocker.patch(
+        "kiso.edge._execute", side_effect=[_result(None), _result(0)]
+    )
+
+    result = edge.execute(mocker.MagicMock(), "sleep", "60", timeout=0)
+
+    assert (result.rc, result.status) == (-1, const.STATUS_FAILED)
+    assert execute.call_count == 2
+
+
+def test_execute_runs_shell_command_as_user(mocker: MockerFixture) -> None:
+    container = mocker.MagicMock()
+    container.execute.return_value = {"exit_code": 0, "output": "ok"}
+    edge._shell_command.cache_clear()
+
+    edge._execute(container, "echo 'a b'", user="kiso")
+    edge._execute(container, "echo 'a b'", user="kiso")
+
+    container.execute.assert_called_with("sudo -u kiso sh -c 'echo '\"'\"'a b'\"'\"''")
+    assert edge._shell_command.cache_info().hits == 1
+    edge._shell_command.cache_clear()
+
+
+# ---------------------------------------------------------------------------
+# run_script
+# ---------------------------------------------------------------------------
+
+
+def _mock_upload(mocker: MockerFixture) -> list[tuple[Path, str]]:
+    uploads: list[tuple[Path, str]] = []
+    mocker.patch("kiso.edge.expanduser", return_value="/home/kiso")
+    mocker.patch("kiso.edge._ch_perms_remotely")
+    mocker.patch("kiso.edge._rm_remotely")
+    mocker.patch(
+        "kiso.edge._upload_file",
+        side_effect=lambda _, src, __: uploads.append((src, src.read_text())),
+    )
+    return uploads
+
+
+def test_run_script_stages_script_in_a_temporary_directory(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    script = tmp_path / "setup.sh"
+    script.write_text("echo hello\n")
+    uploads = _mock_upload(mocker)
+    execute = mocker.patch("kiso.edge.execute", return_value=_result(0))
+
+    edge.run_script(mocker.MagicMock(), script)
+
+    ((staged, content),) = uploads
+    assert staged.name.endswith("-setup.sh")
+    assert content == "echo hello\n"
+    assert execute.call_args.args[1] == f"/home/kiso/{staged.name}"
+    # The staging directory is removed explicitly, as worker processes exit without
+    # running finalizers
+    assert not staged.parent.exists()
+
+
+def test_run_script_does_not_restage_scripts_in_the_staging_dir(
+    mocker: MockerFixture,
+) -> None:
+    uploads = _mock_upload(mocker)
+    mocker.patch("kiso.edge.execute", return_value=_result(0))
+
+    with edge.get_staging_dir() as staging_dir:
+        script = edge.write_script("echo {{ hello }}\n", staging_dir)
+        edge.run_script(mocker.MagicMock(), script, staging_dir=staging_dir)
+        edge.run_script(mocker.MagicMock(), script, staging_dir=staging_dir)
+
+        assert uploads == [(script, "echo {{ hello }}\n")] * 2
+        assert list(staging_dir.iterdir()) == [script]
+
+    assert not staging_dir.exists()
+
+
+def test_stage_script_copies_script_under_a_unique_name(tmp_path: Path) -> None:
+    script = tmp_path / "setup.sh"
+    script.write_text("echo hello\n")
+    staging_dir = tmp_path / "staging"
+    staging_dir.mkdir()
+
+    first = edge.stage_script(script, staging_dir)
+    second = edge.stage_script(script, staging_dir)
+
+    assert first != second
+    assert first.parent == second.parent == staging_dir
+    assert first.read_text() == second.read_text() == "echo hello\n"
+
+
+# ---------------------------------------------------------------------------
+# upload
+# ---------------------------------------------------------------------------
+
+
+def test_upload_resolves_destination_in_one_call(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "input.txt"
+    src.write_text("x")
+    execute = mocker.patch(
+        "kiso.edge._execute", return_value=_result(0, "/home/kiso/in")
+    )
+    upload_file = mocker.patch("kiso.edge._upload_file")
+    mocker.patch("kiso.edge._ch_perms_remotely")
+
+    edge.upload(mocker.MagicMock(), src, "~kiso/my inputs")
+
+    execute.assert_called_once_with(mocker.ANY, "cd ~kiso/'my inputs' && pwd")
+    upload_file.assert_called_once_with(mocker.ANY, src, Path("/home/kiso/in"))
+
+
+def test_upload_rejects_destination_that_is_not_a_directory(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "input.txt"
+    src.write_text("x")
+    execute = mocker.patch("kiso.edge._execute", return_value=_result(1))
+    upload_file = mocker.patch("kiso.edge._upload_file")
+
+    with pytest.raises(ValueError, match="not a directory"):
+        edge.upload(mocker.MagicMock(), src, "/home/kiso/input.txt")
+
+    execute.assert_called_once_with(mocker.ANY, "cd /home/kiso/input.txt && pwd")
+    upload_file.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# download
+# ---------------------------------------------------------------------------
+
+
+def test_download_resolves_and_checks_source_in_one_call(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    execute = mocker.patch(
+        "kiso.edge._execute", return_value=_result(0, "/home/kiso/out.txt")
+    )
+    download_file = mocker.patch("kiso.edge._download_file")
+
+    result = edge.download(mocker.MagicMock(), "~kiso/out.txt", tmp_path)
+
+    assert result.rc == 0
+    execute.assert_called_once_with(
+        mocker.ANY,
+        'p=~kiso/out.txt ; echo "$p" ; [ -e "$p" ] || exit 2 ; [ -f "$p" ]',
+    )
+    download_file.assert_called_once_with(
+        mocker.ANY, Path("/home/kiso/out.txt"), tmp_path, mktemp=True
+    )
+
+
+def test_download_raises_when_source_does_not_exist(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    mocker.patch("kiso.edge._execute", return_value=_result(2, "/home/kiso/out"))
+    download_file = mocker.patch("kiso.edge._download_file")
+
+    with pytest.raises(ValueError, match="does not exist"):
+        edge.download(mocker.MagicMock(), "/home/kiso/out", tmp_path)
+
+    download_file.assert_not_called()
+
+
+def test_download_falls_back_to_directory(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    mocker.patch("kiso.edge._execute", return_value=_result(1, "/home/kiso/out"))
+    mocker.patch("kiso.edge._download_file", side_effect=RuntimeError("timeout"))
+    download_directory = mocker.patch("kiso.edge._download_directory")
+
+    edge.download(mocker.MagicMock(), "/home/kiso/out", tmp_path)
+
+    download_directory.assert_called_once_with(
+        mocker.ANY, Path("/home/kiso/out"), tmp_path
+    )
+
+
+def test_download_directory_fetches_a_single_tarball(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    content = tmp_path / "content"
+    (content / "sub").mkdir(parents=True)
+    (content / "sub" / "a.txt").write_text("a")
+    execute = mocker.patch("kiso.edge._execute", return_value=_result(0))
+    mocker.patch("kiso.utils.get_random_string", return_value="abcde")
+
+    def download_file(_: object, __: Path, dst: Path, **___: bool) -> None:
+        with tarfile.open(dst / "kiso-abcde.tar.gz", "w:gz") as tar:
+            tar.add(content, arcname=".")
+
+    download = mocker.patch("kiso.edge._download_file", side_effect=download_file)
+    dst = tmp_path / "dst"
+    dst.mkdir()
+
+    edge._download_directory(mocker.MagicMock(), Path("/home/kiso/out"), dst)
+
+    assert (dst / "sub" / "a.txt").read_text() == "a"
+    download.assert_called_once()
+    commands = [call.args[1] for call in execute.call_args_list]
+    tarball = f"{const.TMP_DIR}/abcde/kiso-abcde.tar.gz"
+    assert commands[1] == f"tar -czf {tarball} -C /home/kiso/out ."
+    assert not any(command.startswith("find") for command in commands)
+
+
+def test_download_directory_falls_back_to_individual_files(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    execute = mocker.patch(
+        "kiso.edge._execute",
+        side_effect=[
+            _result(0),  # mkdir
+            _result(2),  # tar
+            _result(0),  # rm tarball
+            _result(0, "/home/kiso/out/a.txt\n/home/kiso/out/sub/b.txt"),  # find
+        ]
+        + [_result(0)] * 5,
+    )
+    download = mocker.patch("kiso.edge._download_file")
+
+    edge._download_directory(mocker.MagicMock(), Path("/home/kiso/out"), tmp_path)
+
+    assert [call.args[2] for call in download.call_args_list] == [
+        tmp_path,
+        tmp_path / "sub",
+    ]
+    assert execute.call_args_list[3].args[1] == "find /home/kiso/out -type f"
+
+
+# ---------------------------------------------------------------------------
+# expanduser
+# ---------------------------------------------------------------------------
+
+
+def test_expanduser_looks_up_home_once_per_container(mocker: MockerFixture) -> None:
+    execute = mocker.patch("kiso.edge._execute", return_value=_result(0, "/home/kiso"))
+    containers = [mocker.MagicMock(uuid="c1"), mocker.MagicMock(uuid="c2")]
+    mocker.patch.dict(edge._homes, clear=True)
+
+    for container in containers:
+        assert edge.expanduser(container, "~kiso/a") == "/home/kiso/a"
+        assert edge.expanduser(container, Path("~kiso/b")) == Path("/home/kiso/b")
+        assert edge._resolve_remotely(container, Path("~kiso")) == Path("/home/kiso")
+
+    assert execute.call_count == 2
+    assert execute.call_args.args[1] == "echo ~kiso"
+
+
+def test_expanduser_does_not_cache_failures(mocker: MockerFixture) -> None:
+    execute = mocker.patch(
+        "kiso.edge._execute", side_effect=[_result(1), _result(0, "/root")]
+    )
+    container = mocker.MagicMock(uuid="c1")
+    mocker.patch.dict(edge._homes, clear=True)
+
+    assert edge.expanduser(container, "~/a") == "~/a"
+    assert edge.expanduser(container, "~/a") == "/root/a"
+
+    assert execute.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# _upload_directory
+# ---------------------------------------------------------------------------
+
+
+def _capture_tarballs(mocker: MockerFixture) -> list[list[str]]:
+    tarballs = []
+
+    def _upload(_: object, src: Path, __: object) -> None:
+        with tarfile.open(src) as tar:
+            tarballs.append(sorted(tar.getnames()))
+
+    mocker.patch("kiso.edge._upload_file", side_effect=_upload)
+    return tarballs
+
+
+def test_upload_directory_sends_one_tarball(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "inputs"
+    (src / "empty").mkdir(parents=True)
+    (src / "data").mkdir()
+    (src / "a.txt").write_text("a")
+    (src / "data" / "b.txt").write_text("b")
+    tarballs = _capture_tarballs(mocker)
+    execute = mocker.patch("kiso.edge._execute")
+
+    edge._upload_directory(mocker.MagicMock(), src, PurePosixPath("/home/kiso"))
+
+    assert tarballs == [
+        ["inputs", "inputs/a.txt", "inputs/data", "inputs/data/b.txt", "inputs/empty"]
+    ]
+    command = execute.call_args.args[1]
+    assert command.startswith("tar -xpf /home/kiso/kiso-")
+    assert "-C /home/kiso ;" in command
+
+
+def test_upload_directory_follows_symlinks(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    outside = tmp_path / "outside"
+    (outside / "dir").mkdir(parents=True)
+    (outside / "file.txt").write_text("file")
+    (outside / "dir" / "b.txt").write_text("b")
+    src = tmp_path / "inputs"
+    src.mkdir()
+    (src / "file.txt").symlink_to(outside / "file.txt")
+    (src / "dir").symlink_to(outside / "dir", target_is_directory=True)
+    (src / "loop").symlink_to(src, target_is_directory=True)
+    (src / "broken").symlink_to(tmp_path / "missing")
+    members = {}
+
+    def _upload(_: object, tarball: Path, __: object) -> None:
+        with tarfile.open(tarball) as tar:
+            for member in tar.getmembers():
+                data = tar.extractfile(member) if member.isfile() else None
+                members[member.name] = data.read() if data else member.type
+
+    mocker.patch("kiso.edge._upload_file", side_effect=_upload)
+    mocker.patch("kiso.edge._execute")
+
+    edge._upload_directory(mocker.MagicMock(), src, PurePosixPath("/home/kiso"))
+
+    assert members == {
+        "inputs": tarfile.DIRTYPE,
+        "inputs/file.txt": b"file",
+        "inputs/dir": tarfile.DIRTYPE,
+        "inputs/dir/b.txt": b"b",
+    }
+
+
+def test_upload_directory_splits_large_directories(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "inputs"
+    src.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        (src / name).write_text("x" * 10)
+    mocker.patch("kiso.edge.const.EDGE_UPLOAD_CHUNK_SIZE", 15)
+    tarballs = _capture_tarballs(mocker)
+    execute = mocker.patch("kiso.edge._execute")
+
+    edge._upload_directory(mocker.MagicMock(), src, PurePosixPath("/home/kiso"))
+
+    assert len(tarballs) == 3
+    assert sorted(name for names in tarballs for name in names) == [
+        "inputs",
+        "inputs/a.txt",
+        "inputs/b.txt",
+        "inputs/c.txt",
+    ]
+    assert execute.call_count == 3
+
+
+def test_upload_directory_sets_owner_with_last_tarball(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "inputs"
+    src.mkdir()
+    for name in ("a.txt", "b.txt"):
+        (src / name).write_text("x" * 10)
+    mocker.patch("kiso.edge.const.EDGE_UPLOAD_CHUNK_SIZE", 15)
+    _capture_tarballs(mocker)
+    execute = mocker.patch("kiso.edge._execute")
+
+    edge._upload_directory(
+        mocker.MagicMock(), src, PurePosixPath("/home/kiso"), user="kiso"
+    )
+
+    first, last = (call.args[1] for call in execute.call_args_list)
+    assert "chown" not in first
+    assert last.startswith("tar -xpf ")
+    assert last.endswith(" ; chown -R kiso:kiso /home/kiso")
+
+
+def test_upload_falls_back_to_tarballs_without_separate_chown(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    src = tmp_path / "inputs"
+    src.mkdir()
+    mocker.patch("kiso.edge._resolve_dir_remotely", return_value=Path("/home/kiso"))
+    mocker.patch("kiso.edge._upload_file", side_effect=RuntimeError("timeout"))
+    upload_directory = mocker.patch("kiso.edge._upload_directory")
+    ch_perms = mocker.patch("kiso.edge._ch_perms_remotely")
+
+    result = edge.upload(mocker.MagicMock(), src, "/home/kiso", user="kiso")
+
+    assert result.rc == 0
+    upload_directory.assert_called_once_with(
+        mocker.ANY, src, Path("/home/kiso"), user="kiso"
+    )
+    ch_perms.assert_not_called()
@@ -0,0 +1,257 @@
+"""Unit tests for kiso.ip floating IP helpers."""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from ipaddress import ip_address
+from typing import TYPE_CHECKING
+from unittest.mock import MagicMock
+
+import pytest
+from enoslib.objects import Host
+
+from kiso import ip
+from kiso.errors import KisoError
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches() -> None:
+    ip._free_floating_ips.clear()
+    ip._openstack_connections.clear()
+
+
+def _chameleon_node(alias: str = "vm1") -> Host:
+    node = Host(alias)
+    node.extra = {"kind": "chameleon", "rc_file": "app-cred-openrc.sh"}
+    return node
+
+
+def _connection(mocker: MockerFixture, addresses: dict | None = None) -> MagicMock:
+    conn = MagicMock()
+    conn.compute.find_server.return_value = MagicMock(
+        id="server-id",
+        addresses=addresses or {"sharednet1": [{"addr": "10.140.0.5"}]},
+    )
+    conn.network.ports.return_value = iter([MagicMock(id="port-id")])
+    mocker.patch("kiso.ip._get_openstack_connection", return_value=conn)
+    return conn
+
+
+# ---------------------------------------------------------------------------
+# associate_floating_ip
+# ---------------------------------------------------------------------------
+
+
+def test_associate_floating_ip_unknown_kind_raises() -> None:
+    node = Host("vm1")
+    node.extra = {"kind": "unknown"}
+    with pytest.raises(ValueError, match="Unknown site type"):
+        ip.associate_floating_ip(node)
+
+
+# ---------------------------------------------------------------------------
+# associate_floating_ips
+# ---------------------------------------------------------------------------
+
+
+def test_associate_floating_ips_returns_ip_per_node(mocker: MockerFixture) -> None:
+    mocker.patch("kiso.ip._get_openstack_connection")
+    nodes = [_chameleon_node("vm1"), _chameleon_node("vm2")]
+    addresses = {"vm1": "192.5.87.1", "vm2": "192.5.87.2"}
+    mocker.patch(
+        "kiso.ip.associate_floating_ip",
+        side_effect=lambda node: ip_address(addresses[node.alias]),
+    )
+
+    ips = ip.associate_floating_ips(nodes)
+
+    assert ips == {node: ip_address(addresses[node.alias]) for node in nodes}
+
+
+def test_associate_floating_ips_creates_connection_once_per_rc_file(
+    mocker: MockerFixture,
+) -> None:
+    get_connection = mocker.patch("kiso.ip._get_openstack_connection")
+    mocker.patch("kiso.ip.associate_floating_ip", return_value=ip_address("192.5.87.1"))
+
+    ip.associate_floating_ips([_chameleon_node("vm1"), _chameleon_node("vm2")])
+
+    get_connection.assert_called_once_with("app-cred-openrc.sh")
+
+
+def test_associate_floating_ips_reports_all_failures(mocker: MockerFixture) -> None:
+    mocker.patch("kiso.ip._get_openstack_connection")
+    associate = mocker.patch(
+        "kiso.ip.associate_floating_ip", side_effect=ValueError("boom")
+    )
+    vagrant = Host("vm3")
+    vagrant.extra = {"kind": "vagrant"}
+
+    with pytest.raises(KisoError, match="2 node"):
+        ip.associate_floating_ips([_chameleon_node("vm1"), vagrant])
+
+    assert associate.call_count == 2
+
+
+def test_associate_floating_ips_lists_unused_floating_ips_per_call(
+    mocker: MockerFixture,
+) -> None:
+    conn = _connection(mocker)
+    conn.network.ports.side_effect = lambda **_: iter([MagicMock(id="port-id")])
+    conn.network.ips.side_effect = lambda: [
+        MagicMock(fixed_ip_address=None, port_id=None, floating_ip_address=address)
+        for address in ("192.5.87.11", "192.5.87.12")
+    ]
+
+    ip.associate_floating_ips([_chameleon_node("vm1")])
+    ip.associate_floating_ips([_chameleon_node("vm2")])
+
+    assert conn.network.ips.call_count == 2
+    assert not ip._free_floating_ips
+
+
+# ---------------------------------------------------------------------------
+# _get_openstack_connection
+# ---------------------------------------------------------------------------
+
+
+def test_get_openstack_connection_is_shared_across_threads(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch("kiso.ip.source_credentials_from_rc_file", create=True)
+    connect = mocker.patch("kiso.ip.openstack.connect", create=True)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        connections = set(
+            executor.map(ip._get_openstack_connection, ["app-cred-openrc.sh"] * 32)
+        )
+
+    assert connections == {connect.return_value}
+    connect.assert_called_once_with(load_yaml_config=False, load_envvars=True)
+
+
+# ---------------------------------------------------------------------------
+# _associate_floating_ip_chameleon
+# ---------------------------------------------------------------------------
+
+
+def test_chameleon_returns_existing_public_ip(mocker: MockerFixture) -> None:
+    conn = _connection(
+        mocker,
+        {"sharednet1": [{"addr": "10.140.0.5"}, {"addr": "192.5.87.10"}]},
+    )
+    node = _chameleon_node()
+
+    assert ip._associate_floating_ip_chameleon(node) == ip_address("192.5.87.10")
+    conn.network.update_ip.assert_not_called()
+    assert "floating-ips" not in node.extra
+
+
+def test_chameleon_reuses_unused_floating_ip(mocker: MockerFixture) -> None:
+    conn = _connection(mocker)
+    used = MagicMock(fixed_ip_address="10.140.0.9", port_id="other-port")
+    free = MagicMock(
+        fixed_ip_address=None, port_id=None, floating_ip_address="192.5.87.11"
+    )
+    conn.network.ips.return_value = [used, free]
+    node = _chameleon_node()
+
+    assert ip._associate_floating_ip_chameleon(node) == ip_address("192.5.87.11")
+    conn.network.create_ip.assert_not_called()
+    conn.network.update_ip.assert_called_once_with(free, port_id="port-id")
+    assert node.extra["floating-ips"] == ["192.5.87.11"]
+
+
+def test_chameleon_creates_floating_ip_when_none_free(mocker: MockerFixture) -> None:
+    conn = _connection(mocker)
+    conn.network.ips.return_value = []
+    conn.network.find_network.return_value = MagicMock(id="public-id")
+    created = MagicMock(floating_ip_address="192.5.87.12")
+    conn.network.create_ip.return_value = created
+    node = _chameleon_node()
+
+    assert ip._associate_floating_ip_chameleon(node) == ip_address("192.5.87.12")
+    conn.network.create_ip.assert_called_once_with(floating_network_id="public-id")
+    conn.network.update_ip.assert_called_once_with(created, port_id="port-id")
+
+
+def test_chameleon_lists_floating_ips_once_and_hands_out_distinct_ones(
+    mocker: MockerFixture,
+) -> None:
+    conn = _connection(mocker)
+    conn.network.ports.side_effect = lambda **_: iter([MagicMock(id="port-id")])
+    free = [
+        MagicMock(fixed_ip_address=None, port_id=None, floating_ip_address=address)
+        for address in ("192.5.87.11", "192.5.87.12")
+    ]
+    conn.network.ips.return_value = free
+
+    ips = {
+        ip._associate_floating_ip_chameleon(_chameleon_node(alias))
+        for alias in ("vm1", "vm2")
+    }
+
+    assert ips == {ip_address("192.5.87.11"), ip_address("192.5.87.12")}
+    conn.network.ips.assert_called_once()
+    conn.network.create_ip.assert_not_called()
+
+
+def test_chameleon_returns_floating_ip_to_the_pool_when_association_fails(
+    mocker: MockerFixture,
+) -> None:
+    conn = _connection(mocker)
+    conn.network.ports.side_effect = lambda **_: iter([MagicMock(id="port-id")])
+    free = MagicMock(
+        fixed_ip_address=None, port_id=None, floating_ip_address="192.5.87.11"
+    )
+    conn.network.ips.return_value = [free]
+    conn.network.update_ip.side_effect = [RuntimeError("boom"), None]
+
+    with pytest.raises(ValueError, match="Server <vm1> not found"):
+        ip._associate_floating_ip_chameleon(_chameleon_node("vm1"))
+
+    node = _chameleon_node("vm2")
+    assert ip._associate_floating_ip_chameleon(node) == ip_address("192.5.87.11")
+    conn.network.create_ip.assert_not_called()
+
+
+def test_chameleon_reuses_server_id_on_later_calls(mocker: MockerFixture) -> None:
+    conn = _connection(
+        mocker, {"sharednet1": [{"addr": "10.140.0.5"}, {"addr": "192.5.87.10"}]}
+    )
+    conn.compute.get_server.return_value = conn.compute.find_server.return_value
+    node = _chameleon_node()
+
+    ip._associate_floating_ip_chameleon(node)
+    ip._associate_floating_ip_chameleon(node)
+
+    assert node.extra["server_id"] == "server-id"
+    conn.compute.find_server.assert_called_once()
+    conn.compute.get_server.assert_called_once_with("server-id")
+
+
+def test_chameleon_wraps_errors(mocker: MockerFixture) -> None:
+    conn = _connection(mocker)
+    conn.compute.find_server.side_effect = RuntimeError("boom")
+
+    with pytest.raises(ValueError, match="Server <vm1> not found"):
+        ip._associate_floating_ip_chameleon(_chameleon_node())
+
+
+# ---------------------------------------------------------------------------
+# _get_fablib_manager
+# ---------------------------------------------------------------------------
+
+
+def test_get_fablib_manager_is_cached_per_rc_file(mocker: MockerFixture) -> None:
+    manager = mocker.patch("kiso.ip.fablib_manager", create=True)
+    ip._get_fablib_manager.cache_clear()
+
+    first = ip._get_fablib_manager("fabric_rc")
+    assert ip._get_fablib_manager("fabric_rc") is first
+
+    manager.assert_called_once_with(fabric_rc="fabric_rc", log_propagate=True)
+    ip._get_fablib_manager.cache_clear()
@@ -9,6 +9,7 @@ from multiprocessing import Queue
 from typing import cast
 from unittest.mock import patch
 
+import kiso.constants as const
 import kiso.log as kiso_log
 from kiso.log import init_logging
 
@@ -27,6 +28,17 @@ def test_init_logging_info_level() -> None:
         mock_init.assert_called_once_with(level=logging.INFO)
 
 
+def test_init_logging_configures_ansible() -> None:
+    with (
+        patch("kiso.log.en.init_logging"),
+        patch("kiso.log.en.set_config") as mock_set_config,
+    ):
+        init_logging(level=logging.INFO)
+        mock_set_config.assert_called_once_with(
+            ansible_stdout="noop", ansible_forks=const.ANSIBLE_FORKS
+        )
+
+
 def test_init_logging_filter_applied() -> None:
     """Filter added to root logger handlers after init_logging."""
     handler = logging.StreamHandler()
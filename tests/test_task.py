@@ -9,13 +9,14 @@ from typing import TYPE_CHECKING, Any
 from unittest.mock import MagicMock, patch
 
 import pytest
-from enoslib.objects import Host, Roles
+from enoslib.objects import Host, Networks, Roles
 from jsonschema.exceptions import ValidationError
 
+from kiso import constants as const
 from kiso import task
 from kiso.configuration import Deployment, Kiso, Software
 from kiso.deployment.htcondor.configuration import HTCondorDaemon
-from kiso.errors import KisoError
+from kiso.errors import KisoError, KisoUpError
 from kiso.experiments.shell.configuration import ShellConfiguration
 from kiso.objects import Script
 from kiso.software.docker.configuration import Docker
@@ -351,6 +352,25 @@ def test_get_region_name_single_quotes(tmp_path: Path) -> None:
     assert _get_region_name(str(rc_file)) == "CHI@TACC"
 
 
+def test_get_region_name_skips_commented_lines(tmp_path: Path) -> None:
+    rc_file = tmp_path / "openrc.sh"
+    rc_file.write_text(
+        "# export OS_REGION_NAME=KVM@TACC\nOS_AUTH_TYPE=v3oidc\n"
+        "  export  OS_REGION_NAME = CHI@UC \n"
+    )
+    assert _get_region_name(str(rc_file)) == "CHI@UC"
+
+
+def test_get_region_name_is_cached_by_path(tmp_path: Path) -> None:
+    rc_file = tmp_path / "rc.sh"
+    rc_file.write_text('export OS_REGION_NAME="CHI@UC"\n')
+    _get_region_name.cache_clear()
+    assert _get_region_name(str(rc_file)) == "CHI@UC"
+    rc_file.unlink()
+    assert _get_region_name(str(rc_file)) == "CHI@UC"
+    _get_region_name.cache_clear()
+
+
 def test_get_region_name_not_found_raises(tmp_path: Path) -> None:
     rc_file = tmp_path / "openrc.sh"
     rc_file.write_text("export OS_PROJECT_NAME=my-project\n")
@@ -467,6 +487,158 @@ def test_deduplicate_hosts_deduplicates_same_object() -> None:
     assert h in labels["b"]
 
 
+def test_deduplicate_hosts_replaces_equal_objects_with_canonical() -> None:
+    h1, h1_copy, h2 = Host("vm1"), Host("vm1"), Host("vm2")
+    labels = Roles({"a": [h1], "b": [h1_copy, h2]})
+    _deduplicate_hosts(labels)
+    assert len(labels["b"]) == 2
+    assert any(node is h1 for node in labels["b"])
+    assert not any(node is h1_copy for node in labels["b"])
+
+
+# ---------------------------------------------------------------------------
+# _init_site
+# ---------------------------------------------------------------------------
+
+
+def test_init_site_tags_nodes_with_resolved_rc_file(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    rc_file = tmp_path / "app-cred-openrc.sh"
+    rc_file.touch()
+    h1, h2 = Host("vm1"), Host("vm2")
+    provider = MagicMock()
+    provider.return_value = provider
+    provider.init.return_value = (Roles({"a": [h1, h2]}), Networks())
+    conf = MagicMock(rc_file=str(rc_file))
+    mocker.patch.dict(
+        task.PROVIDER_MAP, {"fabric": (MagicMock(return_value=conf), provider)}
+    )
+    mocker.patch("kiso.task.en.sync_info", side_effect=lambda labels, _: labels)
+
+    task._init_site(0, {"kind": "fabric"})
+
+    assert h1.extra["rc_file"] == h2.extra["rc_file"] == str(rc_file.resolve())
+    assert h1.extra["kind"] == "fabric"
+    assert h1.extra["ansible_ssh_args"] == const.SSH_ARGS
+
+
+def test_init_site_without_rc_file_does_not_tag_nodes(mocker: MockerFixture) -> None:
+    h1 = Host("vm1")
+    provider = MagicMock()
+    provider.return_value = provider
+    provider.init.return_value = (Roles({"a": [h1]}), Networks())
+    conf = MagicMock(spec=[])
+    mocker.patch.dict(
+        task.PROVIDER_MAP, {"vagrant": (MagicMock(return_value=conf), provider)}
+    )
+    mocker.patch("kiso.task.en.sync_info", side_effect=lambda labels, _: labels)
+
+    task._init_site(0, {"kind": "vagrant"})
+
+    assert "rc_file" not in h1.extra
+    assert h1.extra["kind"] == "vagrant"
+
+
+def test_init_site_chameleon_region_label_is_independent(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    rc_file = tmp_path / "app-cred-openrc.sh"
+    rc_file.write_text('export OS_REGION_NAME="CHI@UC"\n')
+    h1, h2 = Host("vm1"), Host("vm2")
+    provider = MagicMock()
+    provider.return_value = provider
+    provider.init.return_value = (Roles({"a": [h1], "b": [h2]}), Networks())
+    conf = MagicMock(rc_file=str(rc_file))
+    mocker.patch.dict(
+        task.PROVIDER_MAP, {"chameleon": (MagicMock(return_value=conf), provider)}
+    )
+    mocker.patch("kiso.task.en.sync_info", side_effect=lambda labels, _: labels)
+
+    _, labels, _ = task._init_site(0, {"kind": "chameleon", "rc_file": str(rc_file)})
+
+    assert set(labels["chameleon"]) == set(labels["CHI@UC"]) == {h1, h2}
+    assert labels["chameleon"] is not labels["CHI@UC"]
+    assert h1.extra["site"] == h2.extra["site"] == "CHI@UC"
+
+
+# ---------------------------------------------------------------------------
+# _init_sites
+# ---------------------------------------------------------------------------
+
+
+def test_init_sites_uses_threads_for_vagrant(mocker: MockerFixture) -> None:
+    init_site = mocker.patch(
+        "kiso.task._init_site", return_value=(MagicMock(), Roles(), Networks())
+    )
+    process_pool = mocker.patch("kiso.task.get_process_pool_executor")
+    mocker.patch("kiso.task.en.Providers")
+    config = MagicMock(sites=[{"kind": "vagrant"}])
+
+    task._init_sites(config, MagicMock())
+
+    init_site.assert_called_once_with(0, {"kind": "vagrant"}, False)
+    process_pool.assert_not_called()
+
+
+def test_init_sites_isolates_rc_file_providers_in_processes(
+    mocker: MockerFixture,
+) -> None:
+    executor = MagicMock()
+    future = MagicMock()
+    future.result.return_value = (MagicMock(), Roles(), Networks())
+    executor.submit.return_value = future
+    process_pool = mocker.patch("kiso.task.get_process_pool_executor")
+    process_pool.return_value.__enter__.return_value = executor
+    mocker.patch("kiso.task.as_completed", side_effect=lambda futures: list(futures))
+    mocker.patch("kiso.task.en.Providers")
+    config = MagicMock(sites=[{"kind": "chameleon"}])
+
+    task._init_sites(config, MagicMock())
+
+    executor.submit.assert_called_once_with(
+        task._init_site, 0, {"kind": "chameleon"}, False
+    )
+
+
+def test_init_sites_aggregates_in_configuration_order(mocker: MockerFixture) -> None:
+    providers = [MagicMock(name="p0"), MagicMock(name="p1")]
+    mocker.patch(
+        "kiso.task._init_site",
+        side_effect=lambda index, *_: (providers[index], Roles(), Networks()),
+    )
+    mocker.patch(
+        "kiso.task.as_completed", side_effect=lambda futures: reversed(list(futures))
+    )
+    en_providers = mocker.patch("kiso.task.en.Providers")
+    config = MagicMock(sites=[{"kind": "vagrant"}, {"kind": "vagrant"}])
+
+    task._init_sites(config, MagicMock())
+
+    en_providers.assert_called_once_with(providers)
+
+
+def test_init_sites_failure_keeps_initialized_sites(mocker: MockerFixture) -> None:
+    provider = MagicMock()
+
+    def init_site(index: int, *_: object) -> tuple[Any, Roles, Networks]:
+        if index == 1:
+            raise RuntimeError("boom")
+        return provider, Roles(), Networks()
+
+    mocker.patch("kiso.task._init_site", side_effect=init_site)
+    en_providers = mocker.patch("kiso.task.en.Providers")
+    config = MagicMock(sites=[{"kind": "vagrant"}, {"kind": "vagrant"}])
+    env = MagicMock()
+
+    with pytest.raises(KisoUpError) as exc_info:
+        task._init_sites(config, env)
+
+    assert list(exc_info.value.errors) == [1]
+    en_providers.assert_called_once_with([provider])
+    env.dump.assert_not_called()
+
+
 # ---------------------------------------------------------------------------
 # _check_deployed_software with None htcondor (line 296 coverage)
 # ---------------------------------------------------------------------------
@@ -513,6 +685,18 @@ def test_validate_config_schema_error_logs_and_raises() -> None:
         task.check(invalid_config)
 
 
+@pytest.mark.parametrize(("verbose", "count"), [(True, 3), (False, 1)])
+def test_validate_config_verbose_reports_all_errors(verbose: bool, count: int) -> None:
+    """verbose=False stops at the first schema error."""
+    invalid_config = {"name": 42, "sites": [], "experiments": 42}
+    wrapped = task.validate_config(verbose=verbose)(lambda *_, **__: None)
+
+    with pytest.raises(ValidationError) as exc_info:
+        wrapped(invalid_config)
+
+    assert len(exc_info.value.args[1]) == count
+
+
 # ---------------------------------------------------------------------------
 # _extend_labels
 # ---------------------------------------------------------------------------
@@ -717,6 +901,20 @@ def test_ssh_user_prefix_overrides_node_user(mocker: MockerFixture) -> None:
     assert "ubuntu@" not in " ".join(cmd)
 
 
+def test_validate_config_reuses_module_validator(mocker: MockerFixture) -> None:
+    """validate_config validates with the prebuilt module level validator."""
+    iter_errors = mocker.patch.object(
+        task._VALIDATOR, "iter_errors", return_value=iter(())
+    )
+    mocker.patch("kiso.task.from_dict", side_effect=RuntimeError("stop"))
+    wrapped = task.validate_config(lambda *_, **__: None)
+
+    with pytest.raises(RuntimeError, match="stop"):
+        wrapped({"name": "exp", "sites": []})
+
+    iter_errors.assert_called_once()
+
+
 def test_validate_config_accepts_dict_config() -> None:
     """validate_config wrapper handles dict input without a file path."""
     # A fully valid config (same as test-1.yml) passed as a dict
@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from ipaddress import IPv4Interface, IPv6Interface
 from typing import TYPE_CHECKING, Any
 from unittest.mock import MagicMock
@@ -11,17 +14,21 @@ import pytest
 from enoslib.objects import DefaultNetwork, Host, IPAddress, NetDevice
 
 from kiso import constants as const
-from kiso import schema
+from kiso import schema, utils
+from kiso.objects import Location
 from kiso.task import (
+    _can_copy_inputs_ahead,
     _copy_experiment_dir,
     _install_commons,
     _run_experiments,
+    _wait_for_inputs,
     down,
     run,
 )
-from kiso.utils import get_ips
+from kiso.utils import get_ips, get_preferred_ip
 
 if TYPE_CHECKING:
+    from collections.abc import Iterator
     from pathlib import Path
 
     from pytest_mock import MockerFixture
@@ -163,6 +170,45 @@ def test_get_ips_host_shared_address_space_ip(mocker: MockerFixture) -> None:
     assert priority == 2  # treated as private
 
 
+def test_get_ips_public_ipv4_floating_ip_preferred() -> None:
+    """Public IPv4 floating IP → priority 0, ahead of the private address."""
+    machine = MagicMock()
+    machine.address = "10.140.0.5"
+    machine.extra = {"floating-ips": ["192.5.87.10"]}
+
+    result = get_ips(machine)
+    assert [(str(ip), priority) for ip, priority in result] == [
+        ("192.5.87.10", 0),
+        ("10.140.0.5", 2),
+    ]
+
+
+def test_get_ips_classifies_each_address_once() -> None:
+    """Addresses seen on several nodes are classified once."""
+    utils._classify_ip.cache_clear()
+    for _ in range(3):
+        machine = MagicMock()
+        machine.address = "10.140.0.5"
+        machine.extra = {}
+        get_ips(machine)
+
+    assert utils._classify_ip.cache_info().misses == 1
+
+
+def test_get_preferred_ip_matches_first_of_get_ips() -> None:
+    machine = MagicMock()
+    machine.address = "10.140.0.5"
+    machine.extra = {"floating-ips": ["2001:db8::1", "192.5.87.10", "192.5.87.11"]}
+
+    assert get_preferred_ip(machine) == get_ips(machine)[0]
+
+
+def test_get_preferred_ip_no_usable_address() -> None:
+    h = Host("1.2.3.4")
+    h.extra = {}
+    assert get_preferred_ip(h) is None
+
+
 # ---------------------------------------------------------------------------
 # _install_commons — standalone function
 # ---------------------------------------------------------------------------
@@ -355,7 +401,6 @@ def test_copy_experiment_dir_with_vms_uses_actions(
     mock_cm.__enter__ = mocker.MagicMock(return_value=mock_p)
     mock_cm.__exit__ = mocker.MagicMock(return_value=False)
     mocker.patch("kiso.task.utils.actions", return_value=mock_cm)
-    mocker.patch("kiso.task.tempfile.NamedTemporaryFile", return_value=MagicMock())
 
     env: dict[str, Any] = {
         "labels": mock_labels,
@@ -519,6 +564,96 @@ def test_run_body_with_force_clears_experiments(mocker: MockerFixture) -> None:
     assert env["experiments"] == {}
 
 
+@contextmanager
+def _thread_pool(max_workers: int) -> Iterator[ThreadPoolExecutor]:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        yield executor
+
+
+def test_run_body_copies_next_inputs_while_experiment_runs(
+    mocker: MockerFixture,
+) -> None:
+    raw_run = run.__wrapped__.__wrapped__.__wrapped__
+    mocker.patch("kiso.task.console.rule")
+    mocker.patch("kiso.task._copy_experiment_dir")
+    pool = mocker.patch("kiso.task.get_process_pool_executor", side_effect=_thread_pool)
+    results = [(0, MagicMock(), [])]
+    copy_inputs = mocker.patch(
+        "kiso.task._copy_inputs",
+        return_value=({"copy-input": {0: const.STATUS_OK}}, results),
+    )
+    get_runner = mocker.patch("kiso.task.utils.get_runner")
+    states = []
+    mocker.patch(
+        "kiso.task._run_experiments",
+        side_effect=lambda index, *_: states.append(
+            copy.deepcopy(env["experiments"][index])
+        ),
+    )
+
+    first = MagicMock(inputs=[Location(["vm"], "a.txt", "/data")])
+    second = MagicMock(inputs=[Location(["vm"], "b.txt", "/data")])
+    mock_config = MagicMock(experiments=[first, second], variables={})
+
+    env = {"wd": "/wd", "remote_wd": "/remote", "labels": MagicMock()}
+    raw_run(mock_config, copy_inputs_ahead=True, env=env)
+
+    pool.assert_called_once_with(max_workers=1)
+    copy_inputs.assert_called_once_with(
+        1, second, {}, "/wd", "/remote", env["labels"], {}
+    )
+    assert states == [{}, {"copy-input": {0: const.STATUS_OK}}]
+    get_runner.assert_called_once_with(second.kind)
+    get_runner.return_value.return_value.show_inputs.assert_called_once_with(results)
+
+
+def test_run_body_does_not_copy_inputs_ahead_by_default(
+    mocker: MockerFixture,
+) -> None:
+    raw_run = run.__wrapped__.__wrapped__.__wrapped__
+    mocker.patch("kiso.task.console.rule")
+    mocker.patch("kiso.task._copy_experiment_dir")
+    pool = mocker.patch("kiso.task.get_process_pool_executor")
+    run_experiments = mocker.patch("kiso.task._run_experiments")
+
+    first = MagicMock(inputs=[Location(["vm"], "a.txt", "/data")])
+    second = MagicMock(inputs=[Location(["vm"], "b.txt", "/data")])
+    mock_config = MagicMock(experiments=[first, second], variables={})
+
+    raw_run(mock_config, env={"wd": "/wd", "labels": MagicMock()})
+
+    pool.assert_not_called()
+    assert run_experiments.call_count == 2
+
+
+def test_can_copy_inputs_ahead() -> None:
+    running = MagicMock(inputs=[Location(["vm"], "v1/input.txt", "/data")])
+
+    assert not _can_copy_inputs_ahead(running, MagicMock(inputs=None))
+    assert _can_copy_inputs_ahead(
+        MagicMock(inputs=None), MagicMock(inputs=[Location(["vm"], "a", "/data")])
+    )
+    assert _can_copy_inputs_ahead(
+        running, MagicMock(inputs=[Location(["vm"], "v1/input.txt", "/data")])
+    )
+    assert _can_copy_inputs_ahead(
+        running, MagicMock(inputs=[Location(["vm"], "v2/input.txt", "/other")])
+    )
+    assert not _can_copy_inputs_ahead(
+        running, MagicMock(inputs=[Location(["vm"], "v2/input.txt", "/data")])
+    )
+
+
+def test_wait_for_inputs_keeps_state_when_copy_fails() -> None:
+    copy_ahead: Future = Future()
+    copy_ahead.set_exception(RuntimeError("boom"))
+    env = {"experiments": {1: {}}}
+
+    _wait_for_inputs(1, MagicMock(), {}, copy_ahead, env)
+
+    assert env["experiments"] == {1: {}}
+
+
 def test_down_with_vagrant_provider_cleans_up(
     mocker: MockerFixture, tmp_path: Path
 ) -> None:
@@ -6,6 +6,7 @@ from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
+from enoslib.objects import Host, HostsView, Roles
 from pytest_mock import MockerFixture
 
 from kiso import constants as const
@@ -53,6 +54,15 @@ def test_uniqueness() -> None:
     assert get_random_string() != get_random_string()
 
 
+def test_skips_bytes_that_would_bias_the_charset(mocker: MockerFixture) -> None:
+    token_bytes = mocker.patch(
+        "kiso.utils.secrets.token_bytes", side_effect=[b"\xff\xf8a", b"\x00\x01\x02"]
+    )
+
+    assert get_random_string(3) == "Jab"
+    assert token_bytes.call_count == 2
+
+
 # ---------------------------------------------------------------------------
 # get_pool_passwd_file
 # ---------------------------------------------------------------------------
@@ -203,14 +213,11 @@ def test_resolve_labels_single_name() -> None:
 
 
 def test_resolve_labels_multiple_names() -> None:
-    role_a = MagicMock()
-    role_b = MagicMock()
-    union_result = MagicMock()
-    role_a.__or__ = MagicMock(return_value=union_result)
-    labels = MagicMock()
-    labels.__getitem__ = MagicMock(side_effect=lambda k: {"a": role_a, "b": role_b}[k])
-    result = resolve_labels(labels, ["a", "b"])
-    assert result is union_result
+    a, b, c = Host("a"), Host("b"), Host("c")
+    labels = Roles(x=[a, b], y=[b, c], z=[c])
+    result = resolve_labels(labels, ["x", "y", "z"])
+    assert isinstance(result, HostsView)
+    assert set(result) == {a, b, c}
 
 
 # ---------------------------------------------------------------------------
@@ -236,6 +243,104 @@ def test_split_labels_returns_vms_and_containers() -> None:
     labels.__getitem__.assert_called_with("chameleon-edge")
 
 
+def test_split_labels_without_containers_returns_split() -> None:
+    split = HostsView([Host("10.0.0.1"), Host("10.0.0.2")])
+    labels = Roles(compute=split)
+
+    vms, containers = split_labels(split, labels)
+
+    assert vms is split
+    assert not containers
+
+
+# ---------------------------------------------------------------------------
+# resolve_and_split_labels
+# ---------------------------------------------------------------------------
+
+
+def test_resolve_and_split_labels_caches_by_label_set(mocker: MockerFixture) -> None:
+    vm, container = Host("10.0.0.1"), Host("10.0.0.2")
+    labels = Roles(
+        compute=HostsView([vm]),
+        edge=HostsView([container]),
+        **{"chameleon-edge": HostsView([container])},
+    )
+    resolve = mocker.spy(utils, "resolve_labels")
+    cache: dict = {}
+
+    first = utils.resolve_and_split_labels(labels, ["compute", "edge"], cache)
+    second = utils.resolve_and_split_labels(labels, ["edge", "compute"], cache)
+
+    assert second is first
+    assert list(first[0]) == [vm]
+    assert list(first[1]) == [container]
+    resolve.assert_called_once()
+
+
+def test_resolve_and_split_labels_without_cache(mocker: MockerFixture) -> None:
+    labels = Roles(compute=HostsView([Host("10.0.0.1")]))
+    resolve = mocker.spy(utils, "resolve_labels")
+
+    utils.resolve_and_split_labels(labels, ["compute"])
+    utils.resolve_and_split_labels(labels, ["compute"])
+
+    assert resolve.call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# ansible_raw
+# ---------------------------------------------------------------------------
+
+
+def test_ansible_raw_wraps_text_in_raw_block() -> None:
+    assert utils.ansible_raw("echo {{ x }}\n") == (
+        "{% raw %}echo {{ x }}\n{% endraw %}"
+    )
+
+
+# ---------------------------------------------------------------------------
+# rsync
+# ---------------------------------------------------------------------------
+
+
+def test_rsync_copies_with_local_rsync_and_cleans_up() -> None:
+    p = MagicMock()
+
+    utils.rsync(p, Path("/local/wd"), "/remote", task_name="Copy")
+
+    ssh_config = p.copy.call_args.kwargs["dest"]
+    assert ssh_config.endswith("-{{ansible_host}}")
+    command = p.shell.call_args.args[0]
+    assert command.startswith(f"rsync -auzv -e 'ssh -F {ssh_config} ")
+    assert command.endswith(f"/local/wd {const.KISO_USER}@pegasusvm:/remote")
+    assert p.shell.call_args.kwargs == {"delegate_to": "localhost", "task_name": "Copy"}
+    p.file.assert_called_once_with(
+        path=ssh_config, state="absent", delegate_to="localhost"
+    )
+
+
+def test_rsync_creates_destination() -> None:
+    p = MagicMock()
+
+    utils.rsync(p, "/local/data", "~/data", mkdir=True)
+
+    assert "--rsync-path='mkdir -p ~/data && rsync' " in p.shell.call_args.args[0]
+
+
+def test_rsync_quotes_paths() -> None:
+    p = MagicMock()
+
+    utils.rsync(p, "/local/my data", "~/in put; rm -rf ~", mkdir=True)
+
+    command = p.shell.call_args.args[0]
+    assert (
+        "--rsync-path='mkdir -p ~/'\"'\"'in put; rm -rf ~'\"'\"' && rsync' " in command
+    )
+    assert command.endswith(
+        f"'/local/my data' {const.KISO_USER}@pegasusvm:~/'in put; rm -rf ~'"
+    )
+
+
 # ---------------------------------------------------------------------------
 # get_runner / get_software / get_deployment — ModuleNotFoundError → ValueError
 # ---------------------------------------------------------------------------